@@ -0,0 +1,171 @@
+import base64
+import heapq
+from datetime import datetime
+from itertools import islice
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+
+from movies.models import Review
+from movies.pagination import CreatedAtCursorPagination
+from .models import Follow, MovieLike
+
+
+def actor_data(user):
+    return {
+        'id': user.id,
+        'nickname': user.nickname,
+        'profile_image': user.profile_image.url if user.profile_image else None,
+    }
+
+
+def review_activity(review):
+    return {
+        'id': f"review_{review.id}",
+        'type': 'review',
+        'action': 'created',
+        'user': actor_data(review.user),
+        'text': f'"{review.movie.title}"에 리뷰를 작성했습니다',
+        'detail': {
+            'movie_id': review.movie.id,
+            'movie_title': review.movie.title,
+            'movie_poster': review.movie.poster_path,
+            'rating': review.rating,
+            'content': review.comment[:100] + '...' if len(review.comment or '') > 100 else review.comment
+        },
+        'created_at': review.created_at,
+        'timestamp': review.created_at.isoformat()
+    }
+
+
+def follow_activity(follow):
+    return {
+        'id': f"follow_{follow.id}",
+        'type': 'follow',
+        'action': 'followed',
+        'user': actor_data(follow.follower),
+        'text': f'{follow.following.nickname}님을 팔로우했습니다',
+        'detail': {
+            'user_id': follow.following.id,
+            'user_nickname': follow.following.nickname,
+            'user_profile_image': follow.following.profile_image.url if follow.following.profile_image else None
+        },
+        'created_at': follow.created_at,
+        'timestamp': follow.created_at.isoformat()
+    }
+
+
+def like_activity(like):
+    return {
+        'id': f"like_{like.id}",
+        'type': 'like',
+        'action': 'liked',
+        'user': actor_data(like.user),
+        'text': f'"{like.movie.title}"을 좋아요했습니다',
+        'detail': {
+            'movie_id': like.movie.id,
+            'movie_title': like.movie.title,
+            'movie_poster': like.movie.poster_path,
+            'movie_rating': like.movie.vote_average
+        },
+        'created_at': like.created_at,
+        'timestamp': like.created_at.isoformat()
+    }
+
+
+# (활동 종류, 활동한 사용자 필드, 쿼리셋, 응답 변환 함수)
+# 각 테이블에 (사용자, created_at) 인덱스가 있어서 사용자별 최신순 조회가 인덱스 범위 스캔이다.
+ACTIVITY_SOURCES = (
+    ('follow', 'follower', lambda: Follow.objects.select_related('follower', 'following'), follow_activity),
+    ('like', 'user', lambda: MovieLike.objects.select_related('user', 'movie'), like_activity),
+    ('review', 'user', lambda: Review.objects.select_related('user', 'movie'), review_activity),
+)
+
+
+def cursor_filter(activity_type, cursor):
+    """(created_at, 종류, id) 내림차순에서 cursor 다음에 오는 행만 남기는 조건"""
+    created_at, cursor_type, pk = cursor
+    older = Q(created_at__lt=created_at)
+    if activity_type < cursor_type:
+        return older | Q(created_at=created_at)
+    if activity_type == cursor_type:
+        return older | Q(created_at=created_at, pk__lt=pk)
+    return older
+
+
+def merged_activities(actor_lookup, limit, cursor=None, types=None):
+    """
+    리뷰 / 팔로우 / 영화 좋아요를 (created_at, 종류, id) 내림차순으로 합친 활동 limit개
+
+    actor_lookup은 활동한 사용자 조건 ('', user) 또는 ('__in', id 목록/서브쿼리).
+    types를 주면 그 종류만 합친다.
+    테이블마다 정렬된 limit개만 읽고 (쿼리 3번) heapq.merge로 k-way 병합하므로,
+    활동이 아무리 많아도 한 페이지에 읽는 행은 최대 3 * limit개다.
+    """
+    suffix, actors = actor_lookup
+    streams = []
+    for activity_type, actor_field, queryset, to_activity in ACTIVITY_SOURCES:
+        if types is not None and activity_type not in types:
+            continue
+        rows = queryset().filter(**{actor_field + suffix: actors})
+        if cursor is not None:
+            rows = rows.filter(cursor_filter(activity_type, cursor))
+        streams.append(activity_stream(activity_type, rows.order_by('-created_at', '-id')[:limit], to_activity))
+    merged = heapq.merge(*streams, key=lambda item: item[0], reverse=True)
+    return list(islice(merged, limit))
+
+
+def activity_stream(activity_type, rows, to_activity):
+    for row in rows:
+        yield (row.created_at, activity_type, row.pk), to_activity(row)
+
+
+def user_activity_lookup(user):
+    return ('', user)
+
+
+def following_activity_lookup(user):
+    """user가 팔로우하는 사람들의 활동 (팔로잉 id 목록은 서브쿼리라 팔로잉이 수천 명이어도 쿼리 수는 같다)"""
+    return ('__in', Follow.objects.filter(follower=user).values('following_id'))
+
+
+def user_activities(user, limit):
+    """사용자의 최근 활동 limit개 (최신순)"""
+    return [activity for _, activity in merged_activities(user_activity_lookup(user), limit)]
+
+
+class ActivityCursorPagination(CreatedAtCursorPagination):
+    """
+    병합된 활동 피드용 (created_at, 종류, id) 키셋 커서 페이지네이션 (최신순)
+
+    종류가 다른 활동은 id가 겹칠 수 있어서 커서에 종류를 함께 넣는다.
+    """
+
+    def encode_cursor(self, key):
+        created_at, activity_type, pk = key
+        raw = f"{created_at.isoformat()}|{activity_type}|{pk}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            created_at, activity_type, pk = base64.urlsafe_b64decode(encoded.encode()).decode().split('|')
+            return datetime.fromisoformat(created_at), activity_type, int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_activities(self, actor_lookup, request):
+        return self.paginate_merged(lambda limit, cursor: merged_activities(actor_lookup, limit, cursor), request)
+
+    def paginate_merged(self, fetch, request):
+        """fetch(limit, cursor)가 돌려준 (정렬 키, 활동) 목록으로 한 페이지 만들기"""
+        self.request = request
+        page_size = self.get_page_size(request)
+        # 한 개 더 읽어서 다음 페이지가 있는지 확인
+        items = fetch(page_size + 1, self.decode_cursor(request))
+        self.has_next = len(items) > page_size
+        items = items[:page_size]
+        self.next_cursor = self.encode_cursor(items[-1][0]) if self.has_next else None
+        return [activity for _, activity in items]
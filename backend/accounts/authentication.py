@@ -0,0 +1,93 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.permissions import SAFE_METHODS
+
+
+TOKEN_USER_CACHE_KEY_PREFIX = 'auth:token-user:'
+
+
+class TokenUserCache:
+    """
+    토큰 → 사용자 캐시 (API, 채팅 HTTP, WebSocket 인증이 함께 사용)
+
+    TOKEN_USER_CACHE_ALIAS(기본 'default')의 Django 캐시에 TOKEN_USER_CACHE_TTL초 동안 저장한다.
+    배포 환경의 default 캐시는 Redis라 로그아웃/비활성화 무효화가 모든 워커 프로세스에 바로 보인다.
+    프로세스 내 캐시(LocMemCache)면 다른 프로세스의 무효화를 못 보므로 TOKEN_USER_CACHE_LOCAL_TTL초만 둔다.
+    캐시는 값을 pickle로 저장하므로 꺼낼 때마다 새 인스턴스다.
+    """
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'TOKEN_USER_CACHE_ALIAS', 'default')]
+
+    @property
+    def ttl(self):
+        ttl = getattr(settings, 'TOKEN_USER_CACHE_TTL', 300)
+        if isinstance(self.cache, LocMemCache):
+            return min(ttl, getattr(settings, 'TOKEN_USER_CACHE_LOCAL_TTL', 5))
+        return ttl
+
+    def get_user(self, key):
+        """토큰의 사용자 (없는 토큰이면 None). 캐시에 없을 때만 쿼리 한 번"""
+        user = self.cache.get(TOKEN_USER_CACHE_KEY_PREFIX + key)
+        if user is not None:
+            return user
+
+        token = Token.objects.select_related('user').filter(key=key).first()
+        if token is None:
+            return None
+        self.cache.set(TOKEN_USER_CACHE_KEY_PREFIX + key, token.user, self.ttl)
+        return token.user
+
+    def invalidate(self, key):
+        self.cache.delete(TOKEN_USER_CACHE_KEY_PREFIX + key)
+
+    def invalidate_user(self, user_id):
+        """사용자 정보가 바뀌면 그 사용자의 토큰 캐시 삭제"""
+        keys = Token.objects.filter(user_id=user_id).values_list('key', flat=True)
+        self.cache.delete_many([TOKEN_USER_CACHE_KEY_PREFIX + key for key in keys])
+
+    def clear(self):
+        """캐시 전체를 비운다 (테스트용)"""
+        self.cache.clear()
+
+
+token_user_cache = TokenUserCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication과 같지만 토큰 → 사용자를 token_user_cache에서 찾는다
+
+    캐시 적중 시 인증 쿼리 0번 (기본 TokenAuthentication은 토큰, 사용자 2번).
+    캐시된 사용자는 최대 TTL만큼 오래됐을 수 있으므로, 쓰기 요청(POST/PUT/PATCH/DELETE)에는
+    DB에서 다시 읽은 사용자를 넘긴다 (오래된 필드를 save()로 되돌려 쓰지 않도록).
+    request.auth는 Token 인스턴스 대신 토큰 문자열이다.
+    """
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is None or request.method in SAFE_METHODS:
+            return result
+
+        user, key = result
+        try:
+            user.refresh_from_db()
+        except user.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return user, key
+
+    def authenticate_credentials(self, key):
+        user = token_user_cache.get_user(key)
+        if user is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return (user, key)
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from accounts import timeline
+from accounts.models import Follow, TimelineEntry
+
+
+class Command(BaseCommand):
+    help = "팔로우 관계로 홈 타임라인을 다시 채우고, 사용자당 보관 개수(TIMELINE_MAX_ENTRIES)를 넘는 항목을 정리합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trim-only', action='store_true', help="채우지 않고 보관 개수를 넘는 항목만 정리")
+
+    def handle(self, *args, **options):
+        if not options['trim_only']:
+            follows = Follow.objects.values_list('follower_id', 'following_id')
+            for count, (owner_id, actor_id) in enumerate(follows.iterator(), start=1):
+                timeline.backfill(owner_id, actor_id)
+                if count % 1000 == 0:
+                    self.stdout.write(f"팔로우 {count}건 처리")
+
+        owners = (
+            TimelineEntry.objects.values('owner_id').annotate(entries=Count('id'))
+            .filter(entries__gt=timeline.timeline_max_entries()).values_list('owner_id', flat=True)
+        )
+        trimmed = sum(timeline.trim(owner_id) for owner_id in list(owners))
+        self.stdout.write(self.style.SUCCESS(f"오래된 타임라인 항목 {trimmed}개 정리"))
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.21 on 2026-10-18 12:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['follower', 'created_at'], name='follow_follower_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movielike',
+            index=models.Index(fields=['user', 'created_at'], name='movielike_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.21 on 2026-10-18 12:14
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_activity_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('activity_type', models.CharField(choices=[('review', '리뷰 작성'), ('like', '영화 좋아요')], max_length=10)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('created_at', models.DateTimeField()),
+                ('actor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': '타임라인 항목',
+                'verbose_name_plural': '타임라인 항목 목록',
+                'indexes': [models.Index(fields=['owner', 'created_at'], name='timeline_owner_created_idx'), models.Index(fields=['activity_type', 'object_id'], name='timeline_object_idx')],
+                'unique_together': {('owner', 'activity_type', 'object_id')},
+            },
+        ),
+    ]
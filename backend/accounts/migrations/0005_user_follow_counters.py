@@ -0,0 +1,47 @@
+# Generated by Django 4.2.21 on 2026-10-18 12:16
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _count(queryset, fk_name):
+    subquery = (
+        queryset
+        .filter(**{fk_name: OuterRef('pk')})
+        .order_by()
+        .values(fk_name)
+        .annotate(value=Count('id'))
+        .values('value')
+    )
+    return Coalesce(Subquery(subquery, output_field=IntegerField()), Value(0), output_field=IntegerField())
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    Follow = apps.get_model('accounts', 'Follow')
+    User.objects.update(
+        followers_count=_count(Follow.objects.all(), 'following'),
+        following_count=_count(Follow.objects.all(), 'follower'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -11,6 +11,10 @@ class User(AbstractUser):
     gender = models.BooleanField(default=False)
     profile_image = models.ImageField(upload_to='profile/', blank=True, default='profile/default.png')
 
+    # 팔로우 뷰에서 F()로 함께 갱신하는 집계 컬럼 (reconcile_counters 커맨드로 보정)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
     following = models.ManyToManyField(
         "self", 
         through='Follow',
@@ -28,7 +32,7 @@ class User(AbstractUser):
     
     def __str__(self):
         return self.nickname or self.username
-    
+
     class Meta:
         verbose_name = '사용자'
         verbose_name_plural = '사용자 목록'
@@ -41,6 +45,8 @@ class Follow(models.Model):
     
     class Meta:
         unique_together = ['follower', 'following']
+        # 활동 피드: 사용자별 최신순 조회
+        indexes = [models.Index(fields=['follower', 'created_at'], name='follow_follower_created_idx')]
         verbose_name = '팔로우'
         verbose_name_plural = '팔로우 목록'
     
@@ -55,6 +61,7 @@ class MovieLike(models.Model):
     
     class Meta:
         unique_together = ['user', 'movie']
+        indexes = [models.Index(fields=['user', 'created_at'], name='movielike_user_created_idx')]
         verbose_name = '영화 좋아요'
         verbose_name_plural = '영화 좋아요 목록'
     
@@ -82,3 +89,30 @@ class ReviewLike(models.Model):
 
     def __str__(self):
         return f'{self.user.username} likes {self.review.id}'
+
+
+class TimelineEntry(models.Model):
+    """
+    홈 타임라인 항목 (팔로우한 사람의 리뷰 작성 / 영화 좋아요)
+
+    활동이 생길 때 작성자의 팔로워마다 한 행씩 넣어 두고 (fan-out-on-write, accounts.timeline),
+    읽을 때는 자기 행만 최신순으로 읽는다. 팔로워가 아주 많은 사용자의 활동은 넣지 않고 읽을 때 가져온다.
+    """
+    REVIEW = 'review'
+    LIKE = 'like'
+    ACTIVITY_TYPE_CHOICES = [(REVIEW, '리뷰 작성'), (LIKE, '영화 좋아요')]
+
+    owner = models.ForeignKey('User', related_name='timeline_entries', on_delete=models.CASCADE)
+    actor = models.ForeignKey('User', related_name='+', on_delete=models.CASCADE)
+    activity_type = models.CharField(max_length=10, choices=ACTIVITY_TYPE_CHOICES)
+    object_id = models.PositiveBigIntegerField()  # Review / MovieLike id
+    created_at = models.DateTimeField()  # 원래 활동 시각
+
+    class Meta:
+        unique_together = ['owner', 'activity_type', 'object_id']
+        indexes = [
+            models.Index(fields=['owner', 'created_at'], name='timeline_owner_created_idx'),
+            models.Index(fields=['activity_type', 'object_id'], name='timeline_object_idx'),
+        ]
+        verbose_name = '타임라인 항목'
+        verbose_name_plural = '타임라인 항목 목록'
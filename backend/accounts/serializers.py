@@ -1,10 +1,12 @@
+from django.db.models import Exists, F, Func, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from rest_framework import serializers
 from .models import User
 from movies.models import Movie, Review, Genre
 from accounts.models import Follow, MovieLike
+from .activity import user_activities
 # from movies.serializers import MovieListSerializer  # 이 import 제거
 from dj_rest_auth.registration.serializers import RegisterSerializer
-from django.db import models
 
 # 독립적인 MovieListSerializer 정의
 class MovieListSerializer(serializers.ModelSerializer):
@@ -30,10 +32,7 @@ class MovieListSerializer(serializers.ModelSerializer):
         return False
     
     def get_average_rating(self, obj):
-        reviews = obj.review_set.all()
-        if reviews.exists():
-            return round(reviews.aggregate(avg=models.Avg('rating'))['avg'], 2)
-        return None
+        return obj.average_rating
 
 
 class ReviewSimpleSerializer(serializers.ModelSerializer):
@@ -71,9 +70,131 @@ class CustomRegisterSerializer(RegisterSerializer):
         return user
 
 
-class UserProfileSerializer(serializers.ModelSerializer):
+# 프로필 응답에 미리 넣는 팔로워/팔로잉 수 (전체 목록은 /auth/<pk>/followers/, /following/)
+PROFILE_FOLLOW_PREVIEW_SIZE = 20
+
+
+def follow_list_queryset(user, direction):
+    """
+    user의 팔로워(direction='followers') 또는 팔로잉('following') 목록용 Follow 쿼리셋
+
+    목록에 보이는 사용자를 select_related로 붙인다. 그 사용자의 팔로워/팔로잉 수는
+    집계 컬럼(followers_count, following_count)에서 읽으므로 COUNT나 JOIN이 없다.
+    """
+    if direction == 'followers':
+        follows, listed = Follow.objects.filter(following=user), 'follower'
+    else:
+        follows, listed = Follow.objects.filter(follower=user), 'following'
+    return follows.select_related(listed)
+
+
+def viewer_followed_ids(context):
+    """요청한 사용자가 팔로우 중인 사용자 id 집합 (요청당 쿼리 한 번, context에 보관)"""
+    if 'followed_ids' not in context:
+        request = context.get('request')
+        if request and request.user.is_authenticated:
+            context['followed_ids'] = set(
+                Follow.objects.filter(follower=request.user).values_list('following_id', flat=True)
+            )
+        else:
+            context['followed_ids'] = set()
+    return context['followed_ids']
+
+
+def follow_list_data(follows, direction, context):
+    """follow_list_queryset 결과를 팔로우 목록 응답 형태로 변환"""
+    request = context.get('request')
+    viewer_id = request.user.id if request and request.user.is_authenticated else None
+    followed_ids = viewer_followed_ids(context)
+    listed = 'follower' if direction == 'followers' else 'following'
+
+    data = []
+    for follow in follows:
+        user = getattr(follow, listed)
+        data.append({
+            'id': user.id,
+            'username': user.username,
+            'nickname': user.nickname,
+            'profile_image': user.profile_image.url if user.profile_image else None,
+            'profile_bio': user.profile_bio,
+            'followers_count': user.followers_count,
+            'following_count': user.following_count,
+            'is_following': user.id != viewer_id and user.id in followed_ids
+        })
+    return data
+
+
+# 프로필 헤더에 필요한 필드 (?fields=로 이것만 요청하면 annotate된 쿼리 한 번으로 끝난다)
+PROFILE_HEADER_FIELDS = (
+    'id', 'username', 'email', 'profile_image', 'last_login', 'nickname', 'birth', 'profile_bio', 'gender',
+    'followers_count', 'following_count', 'reviews_count', 'like_movies_count', 'is_following',
+)
+# 프로필 응답에 미리 넣는 최근 활동 수 (전체는 /auth/<pk>/activities/)
+PROFILE_ACTIVITY_PREVIEW_SIZE = 30
+
+
+def count_subquery(queryset):
+    """OuterRef로 거른 queryset의 행 수 서브쿼리 (JOIN이 아니라서 여러 개를 붙여도 행이 곱해지지 않는다)"""
+    counts = queryset.order_by().annotate(row_count=Func(F('pk'), function='COUNT')).values('row_count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def profile_queryset(request=None):
+    """
+    프로필 조회용 User 쿼리셋
+
+    리뷰/좋아요 수와 요청한 사용자의 팔로우 여부를 서브쿼리로 어노테이트해서
+    프로필 헤더를 사용자 조회 한 번으로 만든다. 팔로워/팔로잉 수는 집계 컬럼에서 읽는다.
+    """
+    queryset = User.objects.annotate(
+        profile_reviews_count=count_subquery(Review.objects.filter(user=OuterRef('pk'))),
+        profile_like_movies_count=count_subquery(MovieLike.objects.filter(user=OuterRef('pk'))),
+    )
+    if request and request.user.is_authenticated:
+        queryset = queryset.annotate(profile_is_following=Exists(
+            Follow.objects.filter(follower=request.user, following=OuterRef('pk'))
+        ))
+    return queryset
+
+
+def requested_fields(request):
+    """GET ?fields=a,b,c 로 요청한 필드 이름 집합 (지정하지 않았으면 None)"""
+    if request is None or request.method != 'GET':
+        return None
+    fields = request.query_params.get('fields')
+    if not fields:
+        return None
+    return {name.strip() for name in fields.split(',') if name.strip()}
+
+
+class SparseFieldsMixin:
+    """
+    fields 인자 또는 GET ?fields= 로 요청한 필드만 직렬화 (sparse fieldset)
+
+    빠진 SerializerMethodField는 호출되지 않으므로 그 필드를 만드는 쿼리도 실행되지 않는다.
+    모르는 필드 이름은 무시한다.
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is None:
+            fields = requested_fields(self.context.get('request'))
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class UserProfileSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    프로필 전체 (헤더 + 팔로워/팔로잉 미리보기 + 리뷰 + 좋아요 영화 + 활동)
+
+    프로필 화면은 ?fields=로 헤더(PROFILE_HEADER_FIELDS)만 받고, 무거운 목록은
+    /auth/<pk>/reviews/, liked-movies/, followers/, following/, activities/ 에서 필요할 때 나눠 받는다.
+    """
     followers_count = serializers.SerializerMethodField()
     following_count = serializers.SerializerMethodField()
+    reviews_count = serializers.SerializerMethodField()
+    like_movies_count = serializers.SerializerMethodField()
     followers = serializers.SerializerMethodField()
     following = serializers.SerializerMethodField()
     reviews = serializers.SerializerMethodField()
@@ -86,67 +207,42 @@ class UserProfileSerializer(serializers.ModelSerializer):
         model = User
         fields = [
             'id', 'username', 'email', 'profile_image', "last_login",
-            'followers_count', 'following_count', 'followers', 'following',
+            'followers_count', 'following_count', 'reviews_count', 'like_movies_count', 'followers', 'following',
             'reviews', 'like_movies', 'nickname', "birth", "profile_bio", "gender", "is_following", "activities"
         ]
 
+    # 팔로워/팔로잉 수는 집계 컬럼, 나머지 카운트는 profile_queryset()의 어노테이션이 있으면 그 값을, 없으면 COUNT 쿼리
     def get_followers_count(self, obj):
-        return obj.followers.count()
+        return obj.followers_count
 
     def get_following_count(self, obj):
-        return obj.following.count()
+        return obj.following_count
+
+    def get_reviews_count(self, obj):
+        count = getattr(obj, 'profile_reviews_count', None)
+        return Review.objects.filter(user=obj).count() if count is None else count
+
+    def get_like_movies_count(self, obj):
+        count = getattr(obj, 'profile_like_movies_count', None)
+        return MovieLike.objects.filter(user=obj).count() if count is None else count
 
     def get_followers(self, obj):
-        followers_data = []
-        for follower in obj.followers.all():
-            followers_data.append({
-                'id': follower.id,
-                'username': follower.username,
-                'nickname': follower.nickname,
-                'profile_image': follower.profile_image.url if follower.profile_image else None,
-                'profile_bio': follower.profile_bio,
-                'followers_count': follower.followers.count(),
-                'following_count': follower.following.count(),
-                'is_following': self._check_is_following(follower)
-            })
-        return followers_data
+        # 처음 PROFILE_FOLLOW_PREVIEW_SIZE명만 (쿼리 한 번), 나머지는 /auth/<pk>/followers/
+        follows = follow_list_queryset(obj, 'followers').order_by('created_at', 'id')[:PROFILE_FOLLOW_PREVIEW_SIZE]
+        return follow_list_data(follows, 'followers', self.context)
 
     def get_following(self, obj):
-        following_data = []
-        for following in obj.following.all():
-            following_data.append({
-                'id': following.id,
-                'username': following.username,
-                'nickname': following.nickname,
-                'profile_image': following.profile_image.url if following.profile_image else None,
-                'profile_bio': following.profile_bio,
-                'followers_count': following.followers.count(),
-                'following_count': following.following.count(),
-                'is_following': self._check_is_following(following)
-            })
-        return following_data
-
-    def _check_is_following(self, target_user):
-        """팔로우 상태 확인 헬퍼 메서드"""
-        request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
-            return False
-        if request.user == target_user:
-            return False
-        return Follow.objects.filter(follower=request.user, following=target_user).exists()
+        follows = follow_list_queryset(obj, 'following').order_by('created_at', 'id')[:PROFILE_FOLLOW_PREVIEW_SIZE]
+        return follow_list_data(follows, 'following', self.context)
 
     def get_reviews(self, obj):
         reviews = Review.objects.filter(user=obj).select_related('movie')
         return ReviewSimpleSerializer(reviews, many=True, context=self.context).data
     
     def get_like_movies(self, obj):
-        # 프로필 소유자를 context에 추가하여 전달
-        context_with_owner = self.context.copy()
-        context_with_owner['profile_owner'] = obj
-        
         # prefetch_related로 성능 최적화
-        liked_movies = obj.like_movie.all().prefetch_related('genres', 'review_set')
-        serializer = ProfileMovieSerializer(liked_movies, many=True, context=context_with_owner)
+        liked_movies = obj.like_movie.all().prefetch_related('genres')
+        serializer = ProfileMovieSerializer(liked_movies, many=True, context=self.context)
         return serializer.data
 
     def get_is_following(self, obj):
@@ -156,79 +252,14 @@ class UserProfileSerializer(serializers.ModelSerializer):
         
         if request.user == obj:
             return False  # 자기 자신은 팔로우할 수 없음
-        
-        return Follow.objects.filter(follower=request.user, following=obj).exists()
 
-    def get_activities(self, obj):
-    # 활동 제한 개수 (기본 30개)
-        limit = 30
-        activities = []
-        
-        try:
-            # 1. 리뷰 작성 내역
-            reviews = Review.objects.filter(user=obj).select_related('movie')[:limit]
-            for review in reviews:
-                activities.append({
-                    'id': f"review_{review.id}",
-                    'type': 'review',
-                    'action': 'created',
-                    'text': f'"{review.movie.title}"에 리뷰를 작성했습니다',
-                    'detail': {
-                        'movie_id': review.movie.id,
-                        'movie_title': review.movie.title,
-                        'movie_poster': review.movie.poster_path,
-                        'rating': review.rating,
-                        'content': review.comment[:100] + '...' if len(review.comment or '') > 100 else review.comment
-                    },
-                    'created_at': review.created_at,
-                    'timestamp': review.created_at.isoformat()
-                })
-            
-            # 2. 팔로우 내역
-            follows = Follow.objects.filter(follower=obj).select_related('following')[:limit]
-            for follow in follows:
-                activities.append({
-                    'id': f"follow_{follow.id}",
-                    'type': 'follow',
-                    'action': 'followed',
-                    'text': f'{follow.following.nickname}님을 팔로우했습니다',
-                    'detail': {
-                        'user_id': follow.following.id,
-                        'user_nickname': follow.following.nickname,
-                        'user_profile_image': follow.following.profile_image.url if follow.following.profile_image else None
-                    },
-                    'created_at': follow.created_at,
-                    'timestamp': follow.created_at.isoformat()
-                })
-            
-            # 3. 영화 좋아요 내역
-            movie_likes = MovieLike.objects.filter(user=obj).select_related('movie')[:limit]
-            for like in movie_likes:
-                activities.append({
-                    'id': f"like_{like.id}",
-                    'type': 'like',
-                    'action': 'liked',
-                    'text': f'"{like.movie.title}"을 좋아요했습니다',
-                    'detail': {
-                        'movie_id': like.movie.id,
-                        'movie_title': like.movie.title,
-                        'movie_poster': like.movie.poster_path,
-                        'movie_rating': like.movie.vote_average
-                    },
-                    'created_at': like.created_at,
-                    'timestamp': like.created_at.isoformat()
-                })
-            
-            # 모든 활동을 시간순으로 정렬 (최신순)
-            activities.sort(key=lambda x: x['created_at'], reverse=True)
-            
-            # 제한된 개수만 반환
-            return activities[:limit]
-            
-        except Exception as e:
-            print(f"활동 로그 생성 중 오류: {e}")
-            return []
+        is_following = getattr(obj, 'profile_is_following', None)
+        if is_following is not None:
+            return is_following
+        return obj.id in viewer_followed_ids(self.context)
 
+    def get_activities(self, obj):
+        return user_activities(obj, PROFILE_ACTIVITY_PREVIEW_SIZE)
 
 
 class ProfileMovieSerializer(serializers.ModelSerializer):
@@ -247,20 +278,21 @@ class ProfileMovieSerializer(serializers.ModelSerializer):
         read_only_fields = ("genres", "is_liked")
 
     def get_is_liked(self, obj):
-        # context에서 프로필 소유자 정보 가져오기
-        profile_owner = self.context.get('profile_owner')
-        if profile_owner:
-            return obj.liked_user.filter(id=profile_owner.id).exists()
-        return False
+        # 프로필 소유자가 좋아요한 영화 목록이므로 항상 True (영화마다 확인 쿼리를 하지 않는다)
+        return True
     
     def get_average_rating(self, obj):
-        reviews = obj.review_set.all()
-        if reviews.exists():
-            return round(reviews.aggregate(avg=models.Avg('rating'))['avg'], 2)
-        return None
+        return obj.average_rating
 
 class UserUpdateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = User
-        fields = ('nickname', 'profile_bio', 'profile_image')
\ No newline at end of file
+        fields = ('nickname', 'profile_bio', 'profile_image')
+
+    def update(self, instance, validated_data):
+        # 바뀐 프로필 필드만 저장 (그 사이 팔로우 뷰가 F()로 올린 집계 컬럼을 덮어쓰지 않도록)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=list(validated_data))
+        return instance
\ No newline at end of file
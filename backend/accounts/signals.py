@@ -0,0 +1,65 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from movies.models import Review
+from . import timeline
+from .authentication import token_user_cache
+from .models import Follow, MovieLike, TimelineEntry, User
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    # 로그아웃 / 토큰 삭제 시 캐시된 사용자도 바로 버린다
+    key = instance.key
+    transaction.on_commit(lambda: token_user_cache.invalidate(key))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    # 닉네임, 프로필 이미지, is_active 등이 바뀌면 다음 요청부터 새 정보로 인증
+    if created:
+        return
+    user_id = instance.pk
+    transaction.on_commit(lambda: token_user_cache.invalidate_user(user_id))
+
+
+# 홈 타임라인 (accounts.timeline): 커밋된 뒤에 팔로워 타임라인에 넣고 / 지운다
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    if created:
+        args = (TimelineEntry.REVIEW, instance.pk, instance.user_id, instance.created_at)
+        transaction.on_commit(lambda: timeline.fan_out(*args))
+
+
+@receiver(post_save, sender=MovieLike)
+def movie_like_saved(sender, instance, created, **kwargs):
+    if created:
+        args = (TimelineEntry.LIKE, instance.pk, instance.user_id, instance.created_at)
+        transaction.on_commit(lambda: timeline.fan_out(*args))
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: timeline.remove_activity(TimelineEntry.REVIEW, pk))
+
+
+@receiver(post_delete, sender=MovieLike)
+def movie_like_deleted(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: timeline.remove_activity(TimelineEntry.LIKE, pk))
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        owner_id, actor_id = instance.follower_id, instance.following_id
+        transaction.on_commit(lambda: timeline.backfill(owner_id, actor_id))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    owner_id, actor_id = instance.follower_id, instance.following_id
+    transaction.on_commit(lambda: timeline.unfollow(owner_id, actor_id))
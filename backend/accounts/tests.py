@@ -1,3 +1,469 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIRequestFactory
+
+from chat.middleware import get_user_from_token
+from .authentication import CachedTokenAuthentication, token_user_cache
+from movies.counters import reconcile_counters
+from movies.models import Genre, Review
+from movies.tests import create_movie
+from .models import Follow, MovieLike, TimelineEntry, User
+
+
+# database_sync_to_async가 요청 전후로 DB 연결을 닫으므로 TestCase의 트랜잭션 대신 TransactionTestCase
+class CachedTokenAuthenticationTest(TransactionTestCase):
+    def setUp(self):
+        token_user_cache.clear()
+        self.user = User.objects.create_user(username="me", password="pw", nickname="me")
+        self.token = Token.objects.create(user=self.user)
+        self.factory = APIRequestFactory()
+
+    def tearDown(self):
+        token_user_cache.clear()
+
+    def authenticate(self, method="get"):
+        request = getattr(self.factory, method)("/", HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        return CachedTokenAuthentication().authenticate(request)
+
+    def test_second_request_does_not_query(self):
+        with self.assertNumQueries(1):  # 토큰 + 사용자 join 한 번
+            user, _ = self.authenticate()
+        with self.assertNumQueries(0):
+            cached, key = self.authenticate()
+        self.assertEqual(cached, user)
+        self.assertEqual(key, self.token.key)
+        # 요청마다 다른 인스턴스라 한 요청에서 바꿔도 다른 요청에 새지 않는다
+        self.assertIsNot(cached, user)
+
+    def test_chat_paths_share_the_cache(self):
+        self.authenticate()
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                "/api/user/me/", HTTP_AUTHORIZATION=f"Token {self.token.key}", HTTP_HOST="localhost"
+            )
+        self.assertEqual(response.json()["nickname"], "me")
+        with self.assertNumQueries(0):
+            self.assertEqual(async_to_sync(get_user_from_token)(self.token.key), self.user)
+        self.assertFalse(async_to_sync(get_user_from_token)("missing").is_authenticated)
+
+    def test_token_delete_and_user_change_invalidate(self):
+        self.authenticate()
+        # 자동 커밋이라 on_commit 콜백(캐시 무효화)은 저장 직후 실행된다
+        self.user.nickname = "new"
+        self.user.save()
+        with self.assertNumQueries(1):
+            user, _ = self.authenticate()
+        self.assertEqual(user.nickname, "new")
+
+        self.token.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_write_requests_get_a_fresh_user(self):
+        self.authenticate()
+        # 시그널 없이 바뀐 값은 캐시에 남아 있지만, 쓰기 요청은 DB에서 다시 읽는다
+        User.objects.filter(pk=self.user.pk).update(nickname="changed")
+        self.assertEqual(self.authenticate()[0].nickname, "me")
+        with self.assertNumQueries(1):
+            user, _ = self.authenticate("post")
+        self.assertEqual(user.nickname, "changed")
+
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate("patch")
+
+    def test_process_local_cache_has_short_ttl(self):
+        self.assertEqual(token_user_cache.ttl, 5)
+        with override_settings(TOKEN_USER_CACHE_LOCAL_TTL=1):
+            self.assertEqual(token_user_cache.ttl, 1)
+
+    @override_settings(TOKEN_USER_CACHE_TTL=0)
+    def test_expired_entries_are_reloaded(self):
+        self.authenticate()
+        with self.assertNumQueries(1):
+            self.authenticate()
+
+    @override_settings(
+        TOKEN_USER_CACHE_ALIAS="tokens",
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "tokens": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "tokens"},
+        },
+    )
+    def test_cache_alias(self):
+        self.authenticate()
+        self.assertEqual(token_user_cache.cache.get(f"auth:token-user:{self.token.key}"), self.user)
+        with self.assertNumQueries(0):
+            self.authenticate()
+        self.token.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+
+# 쿼리 수를 세는 테스트는 토큰 캐시를 채운 뒤 측정하므로, 사이에 사용자를 만드는 시간 동안 캐시가 만료되지 않게 한다
+@override_settings(TOKEN_USER_CACHE_LOCAL_TTL=300)
+class FollowListTest(TestCase):
+    def setUp(self):
+        self.viewer = User.objects.create_user(username="viewer", password="pw", nickname="viewer")
+        self.star = User.objects.create_user(username="star", password="pw", nickname="star")
+        self.fans = [
+            User.objects.create_user(username=f"fan{i}", password="pw", nickname=f"fan{i}") for i in range(30)
+        ]
+        Follow.objects.bulk_create([Follow(follower=fan, following=self.star) for fan in self.fans])
+        Follow.objects.bulk_create([Follow(follower=self.star, following=fan) for fan in self.fans[:5]])
+        # 보는 사람은 일부 팬을 팔로우하고, 팬 한 명은 팔로워가 둘
+        Follow.objects.bulk_create([Follow(follower=self.viewer, following=fan) for fan in self.fans[:3]])
+        reconcile_counters()  # 팔로우를 뷰 밖에서 만들었으므로 followers_count / following_count 보정
+        self.token = Token.objects.create(user=self.viewer)
+        token_user_cache.clear()
+
+    def get(self, url):
+        return self.client.get(url, HTTP_AUTHORIZATION=f"Token {self.token.key}", HTTP_HOST="localhost")
+
+    def test_profile_follow_lists_are_bounded_and_do_not_scale_with_followers(self):
+        self.get(f"/auth/{self.star.id}/detail/")  # 토큰 캐시 채우기
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(f"/auth/{self.star.id}/detail/")
+        data = response.json()
+        self.assertEqual(len(data["followers"]), 20)
+        self.assertEqual(len(data["following"]), 5)
+        self.assertEqual(data["followers_count"], 30)
+
+        Follow.objects.bulk_create([
+            Follow(follower=User.objects.create_user(username=f"late{i}", password="pw"), following=self.star)
+            for i in range(30)
+        ])
+        with CaptureQueriesContext(connection) as more_queries:
+            self.get(f"/auth/{self.star.id}/detail/")
+        self.assertEqual(len(more_queries), len(queries))
+
+        fan0 = data["followers"][0]
+        self.assertEqual(fan0["id"], self.fans[0].id)
+        self.assertEqual((fan0["followers_count"], fan0["following_count"]), (2, 1))  # star, viewer / star
+        # 목록의 사용자별 팔로워/팔로잉 수는 집계 컬럼에서 읽는다 (COUNT 없음)
+        self.assertFalse([query for query in queries if "COUNT(DISTINCT" in query["sql"].upper()])
+        self.assertTrue(fan0["is_following"])
+        self.assertFalse(data["followers"][3]["is_following"])
+
+    def test_paginated_follow_lists(self):
+        self.get(f"/auth/{self.star.id}/followers/")
+        seen = []
+        url = f"/auth/{self.star.id}/followers/?page_size=12"
+        while url:
+            with self.assertNumQueries(3):  # 대상 사용자 + 목록 + 보는 사람의 팔로우 id
+                data = self.get(url).json()
+            seen.extend(user["id"] for user in data["results"])
+            url = data["next"]
+        self.assertEqual(seen, [fan.id for fan in self.fans])
+
+        following = self.get(f"/auth/{self.star.id}/following/").json()
+        self.assertIsNone(following["next"])
+        self.assertEqual([user["id"] for user in following["results"]], [fan.id for fan in self.fans[:5]])
+        self.assertEqual([user["is_following"] for user in following["results"]], [True] * 3 + [False] * 2)
+
+
+@override_settings(TOKEN_USER_CACHE_LOCAL_TTL=300)
+class ProfileSectionsTest(TestCase):
+    def setUp(self):
+        self.viewer = User.objects.create_user(username="viewer", password="pw", nickname="viewer")
+        self.owner = User.objects.create_user(username="owner", password="pw", nickname="owner")
+        genre = Genre.objects.create(id=1, name="드라마", tmdb_id=18)
+        self.movies = [create_movie(title=f"영화{i}", tmdb_id=i) for i in range(25)]
+        for movie in self.movies:
+            movie.genres.add(genre)
+        Review.objects.bulk_create([Review(user=self.owner, movie=movie, rating=4) for movie in self.movies[:23]])
+        MovieLike.objects.bulk_create([MovieLike(user=self.owner, movie=movie) for movie in self.movies])
+        Follow.objects.create(follower=self.viewer, following=self.owner)
+        Follow.objects.bulk_create([Follow(follower=self.owner, following=self.viewer)])
+        reconcile_counters()  # 팔로우를 뷰 밖에서 만들었으므로 followers_count / following_count 보정
+        self.token = Token.objects.create(user=self.viewer)
+        token_user_cache.clear()
+
+    def get(self, url):
+        return self.client.get(url, HTTP_AUTHORIZATION=f"Token {self.token.key}", HTTP_HOST="localhost")
+
+    def test_header_fields_come_from_one_query(self):
+        self.get(f"/auth/{self.owner.id}/detail/?fields=id")  # 토큰 캐시 채우기
+        fields = "id,nickname,followers_count,following_count,reviews_count,like_movies_count,is_following"
+        with self.assertNumQueries(1):
+            data = self.get(f"/auth/{self.owner.id}/detail/?fields={fields}").json()
+        self.assertEqual(set(data), set(fields.split(",")))
+        self.assertEqual(
+            (data["followers_count"], data["following_count"], data["reviews_count"], data["like_movies_count"]),
+            (1, 1, 23, 25),
+        )
+        self.assertTrue(data["is_following"])
+
+        # fields를 주지 않으면 예전처럼 전체 프로필
+        data = self.get(f"/auth/{self.owner.id}/detail/").json()
+        self.assertEqual(len(data["reviews"]), 23)
+        self.assertEqual(len(data["like_movies"]), 25)
+        self.assertTrue(all(movie["is_liked"] for movie in data["like_movies"]))
+
+    def test_paginated_sections(self):
+        self.get(f"/auth/{self.owner.id}/reviews/")
+        seen = []
+        url = f"/auth/{self.owner.id}/reviews/?page_size=10"
+        while url:
+            with self.assertNumQueries(2):  # 대상 사용자 + 리뷰(영화 join)
+                data = self.get(url).json()
+            seen.extend(review["movie_id"] for review in data["results"])
+            url = data["next"]
+        self.assertEqual(seen, [movie.id for movie in reversed(self.movies[:23])])
+
+        with self.assertNumQueries(3):  # 대상 사용자 + 좋아요(영화 join) + 장르 prefetch
+            data = self.get(f"/auth/{self.owner.id}/liked-movies/").json()
+        self.assertEqual([movie["id"] for movie in data["results"]], [movie.id for movie in self.movies[::-1][:20]])
+        self.assertEqual(data["results"][0]["genres"][0]["name"], "드라마")
+        rest = self.get(data["next"]).json()
+        self.assertIsNone(rest["next"])
+        self.assertEqual(len(rest["results"]), 5)
+
+
+@override_settings(TOKEN_USER_CACHE_LOCAL_TTL=300)
+class ActivityFeedTest(TestCase):
+    def setUp(self):
+        self.viewer = User.objects.create_user(username="viewer", password="pw", nickname="viewer")
+        self.friends = [
+            User.objects.create_user(username=f"friend{i}", password="pw", nickname=f"friend{i}") for i in range(3)
+        ]
+        self.stranger = User.objects.create_user(username="stranger", password="pw", nickname="stranger")
+        self.movies = [create_movie(title=f"영화{i}", tmdb_id=i) for i in range(12)]
+        Follow.objects.bulk_create([Follow(follower=self.viewer, following=friend) for friend in self.friends])
+        for i, movie in enumerate(self.movies):
+            Review.objects.create(user=self.friends[i % 3], movie=movie, rating=3)
+            MovieLike.objects.create(user=self.friends[(i + 1) % 3], movie=movie)
+        Follow.objects.create(follower=self.friends[0], following=self.stranger)
+        Review.objects.create(user=self.stranger, movie=self.movies[0], rating=1)
+        # 같은 시각에 생긴 활동도 (created_at, 종류, id) 순서로 빠짐없이 나와야 한다
+        same_time = timezone.now()
+        Review.objects.filter(movie__in=self.movies[:4]).update(created_at=same_time)
+        MovieLike.objects.filter(movie__in=self.movies[:4]).update(created_at=same_time)
+        self.token = Token.objects.create(user=self.viewer)
+        token_user_cache.clear()
+
+    def get(self, url):
+        return self.client.get(url, HTTP_AUTHORIZATION=f"Token {self.token.key}", HTTP_HOST="localhost")
+
+    def collect(self, url, queries_per_page):
+        seen = []
+        while url:
+            with self.assertNumQueries(queries_per_page):
+                data = self.get(url).json()
+            seen.extend(data["results"])
+            url = data["next"]
+        return seen
+
+    def expected(self, users):
+        rows = (
+            [(r.created_at, "review", r.id) for r in Review.objects.filter(user__in=users)]
+            + [(l.created_at, "like", l.id) for l in MovieLike.objects.filter(user__in=users)]
+            + [(f.created_at, "follow", f.id) for f in Follow.objects.filter(follower__in=users)]
+        )
+        return [f"{kind}_{pk}" for _, kind, pk in sorted(rows, reverse=True)]
+
+    def test_user_activities_are_merged_in_order_across_pages(self):
+        friend = self.friends[0]
+        self.get(f"/auth/{friend.id}/activities/")  # 토큰 캐시 채우기
+        # 대상 사용자 + 리뷰/좋아요/팔로우 각 1번
+        seen = self.collect(f"/auth/{friend.id}/activities/?page_size=3", 4)
+        self.assertEqual([activity["id"] for activity in seen], self.expected([friend]))
+        self.assertEqual({activity["user"]["id"] for activity in seen}, {friend.id})
+
+    def test_following_activities(self):
+        self.get("/auth/following-activities/")
+        seen = self.collect("/auth/following-activities/?page_size=5", 3)  # 리뷰/좋아요/팔로우 각 1번
+        self.assertEqual([activity["id"] for activity in seen], self.expected(self.friends))
+        self.assertNotIn(self.stranger.id, {activity["user"]["id"] for activity in seen})
+
+        response = self.get("/auth/following-activities/?cursor=broken")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client.get("/auth/following-activities/", HTTP_HOST="localhost").status_code, 401)
+
+
+@override_settings(TIMELINE_FANOUT_LIMIT=3, TIMELINE_MAX_ENTRIES=10, TOKEN_USER_CACHE_LOCAL_TTL=300)
+class TimelineTest(TestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(username="reader", password="pw", nickname="reader")
+        self.author = User.objects.create_user(username="author", password="pw", nickname="author")
+        self.star = User.objects.create_user(username="star", password="pw", nickname="star")
+        self.stranger = User.objects.create_user(username="stranger", password="pw", nickname="stranger")
+        self.movies = [create_movie(title=f"영화{i}", tmdb_id=i) for i in range(8)]
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.create(follower=self.reader, following=self.author)
+            Follow.objects.create(follower=self.reader, following=self.star)
+            # star는 팔로워가 TIMELINE_FANOUT_LIMIT보다 많아서 읽을 때 가져오는 사용자
+            for i in range(3):
+                fan = User.objects.create_user(username=f"fan{i}", password="pw", nickname=f"fan{i}")
+                Follow.objects.create(follower=fan, following=self.star)
+        reconcile_counters()  # 팔로우를 뷰 밖에서 만들었으므로 followers_count 보정
+        self.token = Token.objects.create(user=self.reader)
+        token_user_cache.clear()
+
+    def get(self, url):
+        return self.client.get(url, HTTP_AUTHORIZATION=f"Token {self.token.key}", HTTP_HOST="localhost")
+
+    def act(self, user, movie, kind):
+        with self.captureOnCommitCallbacks(execute=True):
+            if kind == "review":
+                return Review.objects.create(user=user, movie=movie, rating=4)
+            return MovieLike.objects.create(user=user, movie=movie)
+
+    def timeline_ids(self, page_size=3):
+        seen = []
+        url = f"/auth/timeline/?page_size={page_size}"
+        while url:
+            data = self.get(url).json()
+            seen.extend(activity["id"] for activity in data["results"])
+            url = data["next"]
+        return seen
+
+    def test_fan_out_on_write_and_read_for_popular_users(self):
+        activities = []
+        for i, movie in enumerate(self.movies[:4]):
+            activities.append(self.act(self.author, movie, "review"))
+            activities.append(self.act(self.star, movie, "like"))
+            self.act(self.stranger, movie, "like")
+
+        # 작성자 활동만 저장되고, star와 팔로우하지 않은 사람의 활동은 저장되지 않는다
+        self.assertEqual(TimelineEntry.objects.filter(owner=self.reader).count(), 4)
+        self.assertFalse(TimelineEntry.objects.filter(actor=self.star).exists())
+
+        keys = [(a.created_at, "review" if isinstance(a, Review) else "like", a.pk) for a in activities]
+        expected = [f"{kind}_{pk}" for _, kind, pk in sorted(keys, reverse=True)]
+        self.assertEqual(self.timeline_ids(), expected)
+
+        # 원본이 지워지거나 언팔로우하면 타임라인에서도 빠진다
+        with self.captureOnCommitCallbacks(execute=True):
+            activities[0].delete()
+        self.assertNotIn(f"review_{activities[0].pk}", self.timeline_ids())
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.filter(follower=self.reader, following=self.author).delete()
+        self.assertFalse(TimelineEntry.objects.filter(owner=self.reader).exists())
+
+        # 다시 팔로우하면 최근 활동을 채워 넣는다
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.create(follower=self.reader, following=self.author)
+        self.assertEqual(TimelineEntry.objects.filter(owner=self.reader).count(), 3)
+
+    def test_timeline_is_capped_per_user(self):
+        counts = []
+        for movie in self.movies:
+            self.act(self.author, movie, "review")
+            self.act(self.author, movie, "like")
+            counts.append(TimelineEntry.objects.filter(owner=self.reader).count())
+        # fan-out 뒤 보관 개수(10) + 여유(1)를 넘으면 바로 10개로 정리한다
+        self.assertEqual(counts, [2, 4, 6, 8, 10, 10, 10, 10])
+        self.assertLessEqual(max(counts), 11)
+
+        # 여유 안쪽으로 넘은 항목은 읽기 요청이 지우지 않고 관리 명령이 정리한다
+        TimelineEntry.objects.create(owner=self.reader, actor=self.author, activity_type=TimelineEntry.LIKE,
+                                     object_id=10000, created_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(len(self.timeline_ids(page_size=20)), 10)
+        self.assertEqual(TimelineEntry.objects.filter(owner=self.reader).count(), 11)
+        call_command("rebuild_timelines", "--trim-only", stdout=StringIO())
+        self.assertEqual(TimelineEntry.objects.filter(owner=self.reader).count(), 10)
+
+    def test_counter_decides_fan_out_on_both_sides(self):
+        # 뷰 밖에서 만든 팔로우라 집계 컬럼(0)이 실제 팔로워 수(4)와 다르다
+        quiet = User.objects.create_user(username="quiet", password="pw", nickname="quiet")
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.create(follower=self.reader, following=quiet)
+            for i in range(3):
+                fan = User.objects.create_user(username=f"quiet_fan{i}", password="pw", nickname=f"quiet_fan{i}")
+                Follow.objects.create(follower=fan, following=quiet)
+        self.assertEqual(User.objects.get(pk=quiet.pk).followers_count, 0)
+
+        review = self.act(quiet, self.movies[0], "review")
+        self.assertEqual(TimelineEntry.objects.filter(actor=quiet).count(), 4)
+        self.assertEqual(self.timeline_ids(), [f"review_{review.pk}"])
+
+        # 집계 컬럼을 보정하면 읽을 때 가져오는 쪽으로 바뀌고, 한 번만 보인다
+        reconcile_counters()
+        like = self.act(quiet, self.movies[1], "like")
+        self.assertFalse(TimelineEntry.objects.filter(actor=quiet, object_id=like.pk,
+                                                      activity_type=TimelineEntry.LIKE).exists())
+        self.assertEqual(self.timeline_ids(), [f"like_{like.pk}", f"review_{review.pk}"])
+
+    def test_pages_stay_full_with_stale_and_duplicate_entries(self):
+        reviews = [self.act(self.author, movie, "review") for movie in self.movies[:6]]
+        # 신호 없이 지워진 원본 (항목만 남음)
+        Review.objects.filter(pk__in=[reviews[4].pk, reviews[3].pk]).delete()
+        TimelineEntry.objects.bulk_create([
+            TimelineEntry(owner=self.reader, actor=self.author, activity_type=TimelineEntry.REVIEW,
+                          object_id=review.pk, created_at=review.created_at)
+            for review in (reviews[4], reviews[3])
+        ], ignore_conflicts=True)
+        expected = [f"review_{review.pk}" for review in reversed(reviews) if review not in (reviews[3], reviews[4])]
+
+        def first_page():
+            return [activity["id"] for activity in self.get("/auth/timeline/?page_size=2").json()["results"]]
+
+        self.assertEqual(first_page(), expected[:2])
+        self.assertEqual(self.timeline_ids(page_size=2), expected)
+
+        # author가 나중에 팔로워가 많아지면 저장된 항목과 읽을 때 가져온 활동이 겹친다
+        User.objects.filter(pk=self.author.pk).update(followers_count=100)
+        self.assertEqual(first_page(), expected[:2])
+        self.assertEqual(self.timeline_ids(page_size=2), expected)
+
+    def test_requires_login(self):
+        self.assertEqual(self.client.get("/auth/timeline/", HTTP_HOST="localhost").status_code, 401)
+
+
+class FollowToggleTest(TestCase):
+    def setUp(self):
+        self.me = User.objects.create_user(username="me", password="pw", nickname="me")
+        self.other = User.objects.create_user(username="other", password="pw", nickname="other")
+        self.token = Token.objects.create(user=self.me)
+        token_user_cache.clear()
+
+    def call(self, method):
+        return getattr(self.client, method)(
+            f"/auth/{self.other.id}/follow/", HTTP_AUTHORIZATION=f"Token {self.token.key}", HTTP_HOST="localhost"
+        )
+
+    def test_follow_and_unfollow_are_idempotent(self):
+        responses = [self.call("post") for _ in range(3)]
+        self.assertEqual([response.status_code for response in responses], [201, 200, 200])
+        for response in responses:
+            data = response.json()
+            self.assertEqual((data["is_following"], data["followers_count"], data["following_count"]), (True, 1, 1))
+        self.assertEqual(Follow.objects.count(), 1)
+
+        # 응답의 팔로워/팔로잉 수는 집계 컬럼에서 읽는다 (COUNT 쿼리 없음)
+        with CaptureQueriesContext(connection) as queries:
+            self.call("post")
+        self.assertFalse([query for query in queries if "COUNT(" in query["sql"].upper()])
+
+        for _ in range(2):
+            data = self.call("delete").json()
+            self.assertEqual((data["is_following"], data["followers_count"], data["following_count"]), (False, 0, 0))
+        self.assertFalse(Follow.objects.exists())
+
+    def test_profile_update_after_follow_keeps_counters(self):
+        self.client.get(f"/auth/{self.me.id}/detail/", HTTP_AUTHORIZATION=f"Token {self.token.key}", HTTP_HOST="localhost")
+        self.call("post")
+        # 토큰 캐시의 사용자는 팔로우 전 값이지만, 쓰기 요청은 DB에서 다시 읽고 바뀐 필드만 저장한다
+        response = self.client.put(
+            f"/auth/{self.me.id}/detail/", {"profile_bio": "안녕하세요"}, content_type="application/json",
+            HTTP_AUTHORIZATION=f"Token {self.token.key}", HTTP_HOST="localhost",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.me.refresh_from_db()
+        self.assertEqual((self.me.profile_bio, self.me.following_count), ("안녕하세요", 1))
+
+    def test_explicit_counter_writes_are_saved(self):
+        self.other.followers_count = 7
+        self.other.save()
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.followers_count, 7)
@@ -0,0 +1,211 @@
+import heapq
+
+from django.conf import settings
+from django.db.models import Count, Q
+
+from .activity import ACTIVITY_SOURCES, merged_activities
+from .models import Follow, TimelineEntry, User
+
+
+# 타임라인에 넣는 활동 종류 (팔로우 활동은 홈 타임라인에 넣지 않는다)
+TIMELINE_TYPES = (TimelineEntry.LIKE, TimelineEntry.REVIEW)
+# 팔로우하면 그 사람의 최근 활동을 이만큼 타임라인에 채워 넣는다
+TIMELINE_BACKFILL_SIZE = 20
+FANOUT_BATCH_SIZE = 1000
+
+
+def timeline_max_entries():
+    """사용자당 보관하는 타임라인 항목 수"""
+    return getattr(settings, 'TIMELINE_MAX_ENTRIES', 500)
+
+
+def timeline_fanout_limit():
+    """팔로워가 이보다 많은 사용자의 활동은 쓸 때 넣지 않고 읽을 때 가져온다 (fan-out-on-read)"""
+    return getattr(settings, 'TIMELINE_FANOUT_LIMIT', 1000)
+
+
+def timeline_trim_slack():
+    """fan-out 뒤에 보관 개수를 이만큼 넘은 타임라인만 정리 (활동마다 모든 팔로워를 정리하지 않도록)"""
+    return max(timeline_max_entries() // 10, 1)
+
+
+def is_pulled(actor_id):
+    """
+    읽을 때 가져오는 (fan-out하지 않는) 사용자인지
+
+    쓰는 쪽(fan_out, backfill)과 읽는 쪽(pulled_followee_ids)이 같은 기준(followers_count 집계 컬럼)을 써야
+    집계 컬럼이 실제 팔로워 수와 달라도 활동이 두 쪽 모두에서 빠지지 않는다.
+    """
+    return User.objects.filter(pk=actor_id, followers_count__gt=timeline_fanout_limit()).exists()
+
+
+def entries_before(key, inclusive=False):
+    """(created_at, 종류, object_id) 내림차순에서 key 뒤에 오는 (inclusive면 key 포함) 항목 조건"""
+    created_at, activity_type, object_id = key
+    condition = (
+        Q(created_at__lt=created_at)
+        | Q(created_at=created_at, activity_type__lt=activity_type)
+        | Q(created_at=created_at, activity_type=activity_type, object_id__lt=object_id)
+    )
+    if inclusive:
+        condition |= Q(created_at=created_at, activity_type=activity_type, object_id=object_id)
+    return condition
+
+
+def ordered_entries(owner_id):
+    return TimelineEntry.objects.filter(owner_id=owner_id).order_by('-created_at', '-activity_type', '-object_id')
+
+
+def fan_out(activity_type, object_id, actor_id, created_at):
+    """
+    활동을 작성자 팔로워들의 타임라인에 추가하고 추가한 행 수를 반환
+
+    읽을 때 가져오는 사용자(is_pulled)면 아무것도 넣지 않는다.
+    넣은 뒤 보관 개수를 넘은 팔로워의 타임라인은 바로 정리한다 (trim_owners).
+    """
+    if is_pulled(actor_id):
+        return 0
+    follower_ids = list(Follow.objects.filter(following_id=actor_id).values_list('follower_id', flat=True))
+    entries = [
+        TimelineEntry(owner_id=follower_id, actor_id=actor_id, activity_type=activity_type,
+                      object_id=object_id, created_at=created_at)
+        for follower_id in follower_ids
+    ]
+    TimelineEntry.objects.bulk_create(entries, batch_size=FANOUT_BATCH_SIZE, ignore_conflicts=True)
+    trim_owners(follower_ids)
+    return len(entries)
+
+
+def remove_activity(activity_type, object_id):
+    """리뷰 / 좋아요가 지워지면 모든 타임라인에서 제거"""
+    TimelineEntry.objects.filter(activity_type=activity_type, object_id=object_id).delete()
+
+
+def backfill(owner_id, actor_id):
+    """owner가 actor를 팔로우했을 때 actor의 최근 활동을 owner 타임라인에 채워 넣기"""
+    if is_pulled(actor_id):
+        return
+    entries = []
+    for activity_type, actor_field, queryset, _ in ACTIVITY_SOURCES:
+        if activity_type not in TIMELINE_TYPES:
+            continue
+        recent = (
+            queryset().filter(**{f'{actor_field}_id': actor_id})
+            .order_by('-created_at', '-id').values_list('pk', 'created_at')[:TIMELINE_BACKFILL_SIZE]
+        )
+        entries.extend(
+            TimelineEntry(owner_id=owner_id, actor_id=actor_id, activity_type=activity_type,
+                          object_id=pk, created_at=created_at)
+            for pk, created_at in recent
+        )
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+    trim(owner_id)
+
+
+def unfollow(owner_id, actor_id):
+    TimelineEntry.objects.filter(owner_id=owner_id, actor_id=actor_id).delete()
+
+
+def trim(owner_id):
+    """timeline_max_entries()개를 넘는 오래된 항목 삭제. 삭제한 행 수 반환"""
+    max_entries = timeline_max_entries()
+    cutoff = list(ordered_entries(owner_id).values_list(
+        'created_at', 'activity_type', 'object_id'
+    )[max_entries:max_entries + 1])
+    if not cutoff:
+        return 0
+    old_entries = TimelineEntry.objects.filter(owner_id=owner_id).filter(entries_before(cutoff[0], inclusive=True))
+    deleted, _ = old_entries.delete()
+    return deleted
+
+
+def trim_owners(owner_ids):
+    """
+    owner_ids 중 보관 개수를 timeline_trim_slack()개보다 많이 넘은 타임라인만 정리하고 삭제한 행 수를 반환
+
+    넘은 사용자는 GROUP BY 쿼리 한 번으로 찾으므로, 정리는 사용자마다 slack + 1번 쓸 때 한 번만 일어난다.
+    """
+    over_limit = timeline_max_entries() + timeline_trim_slack()
+    deleted = 0
+    for start in range(0, len(owner_ids), FANOUT_BATCH_SIZE):
+        owners = (
+            TimelineEntry.objects.filter(owner_id__in=owner_ids[start:start + FANOUT_BATCH_SIZE])
+            .values('owner_id').annotate(entries=Count('id')).filter(entries__gt=over_limit)
+            .values_list('owner_id', flat=True)
+        )
+        deleted += sum(trim(owner_id) for owner_id in list(owners))
+    return deleted
+
+
+def pulled_followee_ids(user):
+    """user가 팔로우하는 사람 중 fan-out하지 않는 (팔로워가 많은) 사용자 id (is_pulled와 같은 기준)"""
+    return list(
+        Follow.objects.filter(follower=user, following__followers_count__gt=timeline_fanout_limit())
+        .values_list('following_id', flat=True)
+    )
+
+
+def hydrate(entries):
+    """타임라인 항목을 (정렬 키, 활동) 목록으로 변환 (종류마다 in_bulk 쿼리 한 번, 지워진 원본은 건너뜀)"""
+    ids_by_type = {}
+    for entry in entries:
+        ids_by_type.setdefault(entry.activity_type, []).append(entry.object_id)
+
+    objects = {}
+    for activity_type, _, queryset, to_activity in ACTIVITY_SOURCES:
+        if activity_type in ids_by_type:
+            objects[activity_type] = (queryset().in_bulk(ids_by_type[activity_type]), to_activity)
+
+    items = []
+    for entry in entries:
+        rows, to_activity = objects[entry.activity_type]
+        row = rows.get(entry.object_id)
+        if row is not None:
+            items.append(((entry.created_at, entry.activity_type, entry.object_id), to_activity(row)))
+    return items
+
+
+def stored_activities(owner_id, limit, cursor=None):
+    """
+    저장된 타임라인 항목 중 원본이 남아 있는 활동 limit개
+
+    원본이 지워진 항목은 hydrate에서 빠지므로, 그만큼 다음 항목을 더 읽어서 limit개를 채운다.
+    """
+    items = []
+    while len(items) < limit:
+        entries = ordered_entries(owner_id)
+        if cursor is not None:
+            entries = entries.filter(entries_before(cursor))
+        wanted = limit - len(items)
+        batch = list(entries[:wanted])
+        items.extend(hydrate(batch))
+        if len(batch) < wanted:
+            break
+        last = batch[-1]
+        cursor = (last.created_at, last.activity_type, last.object_id)
+    return items
+
+
+def timeline_activities(user, limit, cursor=None):
+    """
+    홈 타임라인 활동 limit개 ((created_at, 종류, id) 내림차순, ActivityCursorPagination 커서 사용)
+
+    저장된 항목과, fan-out하지 않는 팔로잉 사용자의 활동을 각각 limit개씩 읽어서 heapq.merge로 합친다.
+    사용자가 나중에 팔로워가 많아져 두 쪽에 같은 활동이 있으면 한 번만 세므로,
+    중복을 뺀 뒤에도 한쪽만으로 limit개가 채워진다.
+    """
+    streams = [stored_activities(user.pk, limit, cursor)]
+
+    pulled = pulled_followee_ids(user)
+    if pulled:
+        streams.append(merged_activities(('__in', pulled), limit, cursor, types=TIMELINE_TYPES))
+
+    items = []
+    last_key = None
+    for key, activity in heapq.merge(*streams, key=lambda item: item[0], reverse=True):
+        if key != last_key:
+            items.append((key, activity))
+            last_key = key
+        if len(items) == limit:
+            break
+    return items
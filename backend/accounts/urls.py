@@ -22,6 +22,13 @@ urlpatterns = [
     path("email_check/", view=views.EmailDuplicateCheckView.as_view()),
     path("<int:user_pk>/follow/", view=views.follow),
     path('<int:user_pk>/follow-status/', views.check_follow_status, name='check_follow_status'),
+    path("<int:user_pk>/followers/", view=views.followers),
+    path("<int:user_pk>/following/", view=views.following),
+    path("<int:user_pk>/reviews/", view=views.reviews),
+    path("<int:user_pk>/liked-movies/", view=views.liked_movies),
+    path("<int:user_pk>/activities/", view=views.activities),
+    path("following-activities/", view=views.following_activities),
+    path("timeline/", view=views.timeline),
 
     path("<int:user_pk>/detail/", view=views.detail),
 ]
@@ -3,10 +3,20 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
 from rest_framework.decorators import api_view, permission_classes
 from dj_rest_auth.views import UserDetailsView
-from .serializers import UserProfileSerializer, UserUpdateSerializer
-from accounts.models import Follow
+from .serializers import (
+    UserProfileSerializer, UserUpdateSerializer, ReviewSimpleSerializer, ProfileMovieSerializer,
+    follow_list_queryset, follow_list_data, profile_queryset,
+)
+from .activity import ActivityCursorPagination, user_activity_lookup, following_activity_lookup
+from . import timeline as home_timeline
+from accounts.models import Follow, MovieLike
+from movies.counters import insert_once
+from movies.models import Review
+from movies.pagination import CreatedAtCursorPagination, NewestCreatedAtCursorPagination
 
 
 # Create your views here.
@@ -23,6 +33,22 @@ class EmailDuplicateCheckView(APIView):
         return Response({"is_duplicate": is_duplicate})
 
 
+def follow_counts_response(request, user, detail, is_following, status_code):
+    """팔로우/언팔로우 응답: 대상의 팔로워 수와 내 팔로잉 수를 집계 컬럼에서 읽는다 (쿼리 한 번)"""
+    counts = dict(
+        (pk, (followers_count, following_count))
+        for pk, followers_count, following_count in User.objects.filter(
+            pk__in=[user.pk, request.user.pk]
+        ).values_list('pk', 'followers_count', 'following_count')
+    )
+    return Response({
+        'detail': detail,
+        'is_following': is_following,
+        'followers_count': counts[user.pk][0],
+        'following_count': counts[request.user.pk][1]
+    }, status=status_code)
+
+
 @api_view(['POST', 'DELETE'])
 @permission_classes([permissions.IsAuthenticated])
 def follow(request, user_pk):
@@ -31,35 +57,24 @@ def follow(request, user_pk):
     if user == request.user:
         return Response({'error': "자기 자신은 팔로우할 수 없습니다."}, status=status.HTTP_400_BAD_REQUEST)
 
+    # 이미 팔로우 중인데 POST, 팔로우하지 않았는데 DELETE여도 오류 없이 현재 상태를 돌려준다 (중복 요청에 안전)
     if request.method == "POST":
-        if Follow.objects.filter(follower=request.user, following=user).exists():
-            return Response({'error': "이미 팔로우 중입니다."}, status=status.HTTP_400_BAD_REQUEST)
-        
-        Follow.objects.create(follower=request.user, following=user)
-        
-        # 팔로우 성공 후 업데이트된 팔로워/팔로잉 수 반환
-        return Response({
-            'detail': "팔로우 성공!",
-            'is_following': True,
-            'followers_count': user.followers.count(),
-            'following_count': request.user.following.count()
-        }, status=status.HTTP_201_CREATED)
+        with transaction.atomic():
+            created = insert_once(Follow, follower=request.user, following=user)
+            if created:
+                User.objects.filter(pk=user.pk).update(followers_count=F('followers_count') + 1)
+                User.objects.filter(pk=request.user.pk).update(following_count=F('following_count') + 1)
+        return follow_counts_response(
+            request, user, "팔로우 성공!", True, status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
 
     elif request.method == "DELETE":
-        # 수정: exists() 확인을 올바르게 수정
-        follow_relation = Follow.objects.filter(follower=request.user, following=user)
-        if not follow_relation.exists():
-            return Response({'error': "팔로우한 적이 없습니다."}, status=status.HTTP_400_BAD_REQUEST)
-        
-        follow_relation.delete()
-        
-        # 언팔로우 성공 후 업데이트된 팔로워/팔로잉 수 반환
-        return Response({
-            'detail': "언팔로우 성공!",
-            'is_following': False,
-            'followers_count': user.followers.count(),
-            'following_count': request.user.following.count()
-        }, status=status.HTTP_200_OK)
+        with transaction.atomic():
+            deleted_count, _ = Follow.objects.filter(follower=request.user, following=user).delete()
+            if deleted_count:
+                User.objects.filter(pk=user.pk).update(followers_count=F('followers_count') - deleted_count)
+                User.objects.filter(pk=request.user.pk).update(following_count=F('following_count') - deleted_count)
+        return follow_counts_response(request, user, "언팔로우 성공!", False, status.HTTP_200_OK)
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
@@ -74,32 +89,88 @@ def check_follow_status(request, user_pk):
     
     return Response({
         'is_following': is_following,
-        'followers_count': user.followers.count(),
-        'following_count': user.following.count()
+        'followers_count': user.followers_count,
+        'following_count': user.following_count
     }, status=status.HTTP_200_OK)
 
 
+def paginated_follow_list(request, user_pk, direction):
+    user = get_object_or_404(User, pk=user_pk)
+    paginator = CreatedAtCursorPagination()
+    # 페이지당 쿼리: 목록 1번 + 요청한 사용자의 팔로우 id 1번
+    follows = paginator.paginate_queryset(follow_list_queryset(user, direction), request)
+    return paginator.get_paginated_response(follow_list_data(follows, direction, {'request': request}))
+
+
+@api_view(['GET'])
+def followers(request, user_pk):
+    """팔로워 목록 (팔로우한 순, 커서 페이지네이션)"""
+    return paginated_follow_list(request, user_pk, 'followers')
+
+
+@api_view(['GET'])
+def following(request, user_pk):
+    """팔로잉 목록 (팔로우한 순, 커서 페이지네이션)"""
+    return paginated_follow_list(request, user_pk, 'following')
+
+
+@api_view(['GET'])
+def reviews(request, user_pk):
+    """작성한 리뷰 목록 (최신순, 커서 페이지네이션)"""
+    user = get_object_or_404(User, pk=user_pk)
+    paginator = NewestCreatedAtCursorPagination()
+    page = paginator.paginate_queryset(Review.objects.filter(user=user).select_related('movie'), request)
+    return paginator.get_paginated_response(ReviewSimpleSerializer(page, many=True).data)
+
+
+@api_view(['GET'])
+def liked_movies(request, user_pk):
+    """좋아요한 영화 목록 (좋아요한 최신순, 커서 페이지네이션)"""
+    user = get_object_or_404(User, pk=user_pk)
+    paginator = NewestCreatedAtCursorPagination()
+    likes = MovieLike.objects.filter(user=user).select_related('movie').prefetch_related('movie__genres')
+    page = paginator.paginate_queryset(likes, request)
+    movies = [like.movie for like in page]
+    return paginator.get_paginated_response(ProfileMovieSerializer(movies, many=True).data)
+
+
+@api_view(['GET'])
+def activities(request, user_pk):
+    """최근 활동 (리뷰 작성, 팔로우, 영화 좋아요를 합쳐서 최신순, 커서 페이지네이션)"""
+    user = get_object_or_404(User, pk=user_pk)
+    paginator = ActivityCursorPagination()
+    page = paginator.paginate_activities(user_activity_lookup(user), request)
+    return paginator.get_paginated_response(page)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def following_activities(request):
+    """내가 팔로우하는 사람들의 최근 활동 (최신순, 커서 페이지네이션)"""
+    paginator = ActivityCursorPagination()
+    page = paginator.paginate_activities(following_activity_lookup(request.user), request)
+    return paginator.get_paginated_response(page)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def timeline(request):
+    """홈 타임라인: 팔로우하는 사람들의 리뷰 / 영화 좋아요 (최신순, 커서 페이지네이션)"""
+    paginator = ActivityCursorPagination()
+    page = paginator.paginate_merged(
+        lambda limit, cursor: home_timeline.timeline_activities(request.user, limit, cursor), request
+    )
+    return paginator.get_paginated_response(page)
+
+
 class CustomUserDetailsView(UserDetailsView):
     serializer_class = UserProfileSerializer
 
 @api_view(["GET", "PUT"])
 def detail(request, user_pk):
     if request.method == "GET":
-        user = get_object_or_404(User, pk=user_pk)
-        
-        # 디버깅 정보 출력
-        print(f"Request user: {request.user}")
-        print(f"Request user authenticated: {request.user.is_authenticated}")
-        print(f"Target user: {user}")
-        print(f"Target user's liked movies: {user.like_movie.all()}")
-        
-        # 특정 영화로 테스트
-        if user.like_movie.exists():
-            first_movie = user.like_movie.first()
-            print(f"First liked movie: {first_movie}")
-            print(f"Movie's liked_user field: {first_movie.liked_user.all()}")
-            print(f"Is request.user in liked_user? {first_movie.liked_user.filter(id=request.user.id).exists()}")
-        
+        # ?fields=로 필요한 필드만 요청할 수 있다 (헤더 필드만이면 쿼리 한 번, PROFILE_HEADER_FIELDS 참고)
+        user = get_object_or_404(profile_queryset(request), pk=user_pk)
         serializer = UserProfileSerializer(user, context={'request': request})
         return Response(data=serializer.data, status=status.HTTP_200_OK)
     
@@ -1,5 +1,6 @@
 from functools import wraps
-from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from accounts.authentication import CachedTokenAuthentication
 from django.http import JsonResponse
 from django.shortcuts import redirect
 from django.conf import settings
@@ -17,10 +18,10 @@ def token_required(view_func):
         if auth_header.startswith('Token '):
             token_key = auth_header.split(' ')[1]
             try:
-                token = Token.objects.get(key=token_key)
-                request.user = token.user
+                # API 요청과 같은 토큰 캐시 사용 (캐시 적중 시 쿼리 없음)
+                request.user, _ = CachedTokenAuthentication().authenticate_credentials(token_key)
                 return view_func(request, *args, **kwargs)
-            except Token.DoesNotExist:
+            except AuthenticationFailed:
                 if request.headers.get("X-Requested-With") == "XMLHttpRequest":
                     return JsonResponse({'error': 'Invalid token'}, status=401)
                 return redirect(settings.LOGIN_URL)
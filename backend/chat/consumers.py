@@ -1,16 +1,358 @@
 # chat/consumers.py
+import asyncio
+import atexit
 import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from .models import ChatRoom, Message
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import ChatReadState, ChatRoom, Message
+from .presence import get_presence_backend
 
 User = get_user_model()
 
+# 연결 시 / load_history 한 번에 보내는 메시지 수
+HISTORY_PAGE_SIZE = 50
+MAX_HISTORY_PAGE_SIZE = 200
+
+# 채팅방 updated_at 갱신은 방마다 1초에 한 번으로 합친다 (프로세스 단위)
+# 마지막 갱신 시각은 최근 ROOM_TOUCH_CACHE_SIZE개 방만 기억한다 (밀려난 방은 다음 메시지에서 한 번 더 UPDATE할 뿐)
+ROOM_TOUCH_INTERVAL = 1.0
+ROOM_TOUCH_CACHE_SIZE = 10000
+_room_touched_at = OrderedDict()
+_room_touched_lock = threading.Lock()
+
+
+def sender_payload(user):
+    return {
+        'id': user.id,
+        'nickname': user.nickname,
+        'profile_image': user.profile_image.url if user.profile_image else None
+    }
+
+
+def serialize_message(message, sender=None):
+    """sender를 넘기면 message.sender를 읽지 않는다 (보낸 사람 조회 쿼리 생략)"""
+    return {
+        'id': message.id,
+        'content': message.content,
+        'sender': sender or sender_payload(message.sender),
+        'timestamp': message.timestamp.isoformat(),
+        'is_read': message.is_read
+    }
+
+
+def touch_room(room_id):
+    """채팅방 updated_at을 UPDATE 한 번으로 갱신하되, 같은 방은 ROOM_TOUCH_INTERVAL에 한 번만"""
+    now = time.monotonic()
+    with _room_touched_lock:
+        if now - _room_touched_at.get(room_id, float('-inf')) < ROOM_TOUCH_INTERVAL:
+            return
+        _room_touched_at[room_id] = now
+        _room_touched_at.move_to_end(room_id)
+        while len(_room_touched_at) > ROOM_TOUCH_CACHE_SIZE:
+            _room_touched_at.popitem(last=False)
+    ChatRoom.objects.filter(pk=room_id).update(updated_at=timezone.now())
+
+
+def save_message(room_id, sender_id, content):
+    """메시지를 데이터베이스에 저장 (INSERT 1번, 채팅방 updated_at은 1초에 한 번만 갱신)"""
+    message = Message.objects.create(room_id=room_id, sender_id=sender_id, content=content)
+    touch_room(room_id)
+    return message
+
+
+class MessageIdGenerator:
+    """
+    DB에 저장하기 전에 발급하는 시간순 메시지 id (snowflake 방식)
+
+    41비트 밀리초 | 6비트 워커 id | 6비트 시퀀스 = 53비트라 브라우저(JS Number)에서도 정확히 다룰 수 있다.
+    같은 밀리초에 64개를 넘으면 다음 밀리초 값을 당겨 써서 id가 겹치지 않고 계속 증가한다.
+    여러 프로세스가 write-behind로 저장할 때는 CHAT_WORKER_ID를 프로세스마다 다르게 줘야 한다.
+    """
+
+    EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+    WORKER_BITS = 6
+    SEQUENCE_BITS = 6
+
+    def __init__(self, worker_id):
+        if not 0 <= worker_id < 1 << self.WORKER_BITS:
+            raise ValueError(f"워커 id는 0~{(1 << self.WORKER_BITS) - 1} 사이여야 합니다: {worker_id}")
+        self.worker_id = worker_id
+        self._last_ms = -1
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def next_id(self):
+        with self._lock:
+            now = max(int(time.time() * 1000), self._last_ms)
+            if now == self._last_ms:
+                self._sequence = (self._sequence + 1) % (1 << self.SEQUENCE_BITS)
+                if self._sequence == 0:
+                    now += 1
+            else:
+                self._sequence = 0
+            self._last_ms = now
+            return (
+                ((now - self.EPOCH_MS) << (self.WORKER_BITS + self.SEQUENCE_BITS))
+                | (self.worker_id << self.SEQUENCE_BITS)
+                | self._sequence
+            )
+
+
+class MessageIdConflict(Exception):
+    """미리 발급한 메시지 id에 다른 메시지가 이미 저장돼 있음 (CHAT_WORKER_ID가 프로세스끼리 겹친 경우)"""
+
+    def __init__(self, messages):
+        self.messages = messages
+        super().__init__(f"메시지 {len(messages)}개를 저장하지 못함: {[message.id for message in messages]}")
+
+
+def spill_dir():
+    """DB에 저장하지 못한 채팅 메시지를 남기는 디렉터리 (replay_chat_messages 명령으로 다시 저장)"""
+    return Path(getattr(settings, 'CHAT_SPILL_DIR', settings.BASE_DIR / 'chat_spill'))
+
+
+def message_record(message):
+    return {
+        'id': message.id,
+        'room_id': message.room_id,
+        'sender_id': message.sender_id,
+        'content': message.content,
+        'timestamp': message.timestamp.isoformat(),
+    }
+
+
+class MessageWriter:
+    """
+    write-behind 메시지 저장 (settings.CHAT_WRITE_BEHIND=True일 때 사용, 프로세스당 하나)
+
+    submit()은 id와 timestamp를 붙인 Message를 바로 돌려주므로 저장을 기다리지 않고 브로드캐스트할 수 있다.
+    백그라운드 태스크가 flush_interval마다 쌓인 메시지를 bulk_create로 저장한다.
+    저장에 실패한 배치는 대기열 맨 앞에 남겨 두고 retry_delay부터 max_retry_delay까지 늘려 가며 계속 다시 저장한다.
+    다시 저장할 때 이미 저장된 같은 메시지는 건너뛰고, 같은 id에 다른 메시지가 있으면 MessageIdConflict로 알린다.
+    id가 겹친 메시지와 프로세스 종료 시(atexit) 저장하지 못한 메시지는 버리지 않고 spill 파일에 남긴다.
+    """
+
+    flush_interval = 0.005
+    batch_size = 500
+    retry_delay = 0.5
+    max_retry_delay = 30.0
+    flush_timeout = 10.0
+
+    def __init__(self, worker_id=None):
+        self._worker_id = worker_id
+        self._ids = None
+        self._pending = []
+        self._pending_ids = set()
+        self._lock = threading.Lock()
+        self._task = None
+        atexit.register(self.flush_sync)
+
+    @property
+    def enabled(self):
+        return getattr(settings, 'CHAT_WRITE_BEHIND', False)
+
+    @property
+    def ids(self):
+        """메시지 id 발급기 (처음 쓸 때 CHAT_WORKER_ID로 만든다)"""
+        if self._ids is None:
+            worker_id = self._worker_id
+            if worker_id is None:
+                worker_id = getattr(settings, 'CHAT_WORKER_ID', None)
+            if worker_id is None:
+                raise ImproperlyConfigured(
+                    "CHAT_WRITE_BEHIND를 켜면 프로세스마다 다른 CHAT_WORKER_ID(0~63)를 지정해야 합니다."
+                )
+            try:
+                self._ids = MessageIdGenerator(worker_id)
+            except ValueError as e:
+                raise ImproperlyConfigured(f"CHAT_WORKER_ID: {e}") from e
+        return self._ids
+
+    @property
+    def pending_count(self):
+        return len(self._pending)
+
+    def is_pending(self, message_id):
+        """아직 저장되지 않은 메시지인지"""
+        return message_id in self._pending_ids
+
+    def submit(self, room_id, sender_id, content):
+        """저장 대기열에 넣고 저장 전 Message 인스턴스를 돌려준다 (이벤트 루프 안에서 호출)"""
+        message = Message(
+            id=self.ids.next_id(),
+            room_id=room_id,
+            sender_id=sender_id,
+            content=content,
+            timestamp=timezone.now(),
+        )
+        with self._lock:
+            self._pending.append(message)
+            self._pending_ids.add(message.id)
+        self._ensure_task()
+        return message
+
+    def _ensure_task(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._run())
+
+    def _done(self, batch):
+        with self._lock:
+            # 이 태스크만 앞에서 꺼내고 submit은 뒤에 붙이므로 앞의 len(batch)개가 방금 저장한 배치
+            del self._pending[:len(batch)]
+            self._pending_ids.difference_update(message.id for message in batch)
+
+    async def _run(self):
+        failures = 0
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            with self._lock:
+                batch = self._pending[:self.batch_size]
+            if not batch:
+                return
+            try:
+                await database_sync_to_async(self._persist)(batch)
+            except MessageIdConflict as e:
+                # 나머지 메시지는 저장됐고, 겹친 메시지는 다시 저장해도 겹치므로 파일에 남긴다
+                print(f"❌ 채팅 메시지 id 충돌, CHAT_WORKER_ID 설정을 확인하세요: {e}")
+                self._spill(e.messages)
+            except Exception as e:
+                # 저장된 메시지를 버리지 않도록 같은 배치를 점점 긴 간격으로 계속 다시 저장한다
+                failures += 1
+                delay = min(self.retry_delay * 2 ** (failures - 1), self.max_retry_delay)
+                print(f"❌ 채팅 메시지 저장 실패, {delay:g}초 뒤 재시도 ({len(batch)}개, {failures}번째): {e}")
+                await asyncio.sleep(delay)
+                continue
+            failures = 0
+            self._done(batch)
+
+    @staticmethod
+    def _persist(batch):
+        """
+        배치를 저장하고 채팅방 updated_at을 갱신한다
+
+        INSERT가 실패하면 메시지마다 나눠서 저장한다. 재시도라서 같은 메시지가 이미 있으면 건너뛰고,
+        채팅방/사용자가 삭제된 메시지는 버린다. 같은 id에 다른 메시지가 있으면 나머지를 저장한 뒤
+        그 메시지들을 담아 MessageIdConflict를 올린다.
+        """
+        conflicts = []
+        try:
+            with transaction.atomic():
+                Message.objects.bulk_create(batch)
+        except IntegrityError:
+            saved = Message.objects.in_bulk([message.id for message in batch])
+            for message in batch:
+                existing = saved.get(message.id)
+                if existing is not None:
+                    if (existing.room_id, existing.sender_id, existing.content) != (
+                        message.room_id, message.sender_id, message.content
+                    ):
+                        conflicts.append(message)
+                    continue
+                try:
+                    with transaction.atomic():
+                        Message.objects.bulk_create([message])
+                except IntegrityError:
+                    if Message.objects.filter(pk=message.id).exists():
+                        conflicts.append(message)
+                    else:
+                        print(f"⚠️ 저장할 수 없는 채팅 메시지 버림 (채팅방/사용자 삭제됨): {message.id}")
+        for room_id in {message.room_id for message in batch}:
+            touch_room(room_id)
+        if conflicts:
+            raise MessageIdConflict(conflicts)
+
+    def _spill(self, messages):
+        """
+        저장하지 못한 메시지를 spill 파일에 한 줄에 하나씩 JSON으로 덧붙인다 (fsync까지 한 뒤 반환)
+
+        파일은 워커마다 따로 쓰고 replay_chat_messages 명령이 다시 저장한다.
+        파일에도 못 쓰면 같은 JSON을 로그에 남긴다.
+        """
+        lines = ''.join(json.dumps(message_record(message), ensure_ascii=False) + '\n' for message in messages)
+        path = spill_dir() / f'worker_{self.ids.worker_id}.jsonl'
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'a', encoding='utf-8') as spill_file:
+                spill_file.write(lines)
+                spill_file.flush()
+                os.fsync(spill_file.fileno())
+        except OSError as e:
+            print(f"❌ 채팅 메시지 {len(messages)}개를 spill 파일에 쓰지 못함 ({e}), 로그에 남김")
+            print(lines, end='')
+            return
+        print(f"⚠️ 채팅 메시지 {len(messages)}개를 {path}에 남김 (replay_chat_messages로 다시 저장)")
+
+    async def wait_saved(self, message_id, timeout=None):
+        """
+        message_id 메시지가 저장될 때까지 최대 timeout초(기본 flush_timeout) 기다린다
+
+        대기열은 순서대로 저장되므로 한 연결이 마지막으로 보낸 메시지만 기다리면 그 연결의 메시지가 모두 저장된다.
+        다른 채팅방의 메시지는 기다리지 않는다.
+
+        Returns:
+            저장됐으면 True, 시간이 지나도 남아 있으면 False (백그라운드 태스크가 계속 저장)
+        """
+        deadline = time.monotonic() + (self.flush_timeout if timeout is None else timeout)
+        while self.is_pending(message_id):
+            if time.monotonic() >= deadline:
+                print(f"⚠️ 채팅 메시지 {message_id}가 아직 저장되지 않았습니다.")
+                return False
+            self._ensure_task()
+            await asyncio.sleep(self.flush_interval)
+        return True
+
+    async def flush(self, timeout=None):
+        """
+        대기열이 빌 때까지 최대 timeout초(기본 flush_timeout) 기다린다 (벤치마크 / 테스트용)
+
+        Returns:
+            다 저장했으면 True, 시간이 지나도 남아 있으면 False (남은 메시지는 백그라운드 태스크가 계속 저장)
+        """
+        deadline = time.monotonic() + (self.flush_timeout if timeout is None else timeout)
+        while self._pending:
+            if time.monotonic() >= deadline:
+                print(f"⚠️ 채팅 메시지 {len(self._pending)}개가 아직 저장되지 않았습니다.")
+                return False
+            self._ensure_task()
+            await asyncio.sleep(self.flush_interval)
+        return True
+
+    def flush_sync(self):
+        """이벤트 루프 없이 남은 메시지를 바로 저장하고, 저장하지 못하면 spill 파일에 남긴다 (프로세스 종료 시)"""
+        with self._lock:
+            batch, self._pending = self._pending, []
+            self._pending_ids = set()
+        if not batch:
+            return
+        try:
+            self._persist(batch)
+        except MessageIdConflict as e:
+            print(f"❌ 채팅 메시지 id 충돌, CHAT_WORKER_ID 설정을 확인하세요: {e}")
+            self._spill(e.messages)
+        except Exception as e:
+            print(f"❌ 종료 중 채팅 메시지 {len(batch)}개 저장 실패: {e}")
+            self._spill(batch)
+
+
+message_writer = MessageWriter()
+
+
 class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         # URL에서 room_id 추출
-        self.room_id = self.scope['url_route']['kwargs']['room_id']
+        self.room_id = int(self.scope['url_route']['kwargs']['room_id'])
         self.room_group_name = f'chat_{self.room_id}'
         self.user = self.scope['user']
         
@@ -19,10 +361,14 @@ class ChatConsumer(AsyncWebsocketConsumer):
             await self.close()
             return
         
-        # 채팅방 권한 확인
-        if not await self.has_room_permission():
+        # 채팅방 권한 확인 (연결 동안 유지되므로 메시지마다 다시 확인하지 않음)
+        self.partner_id = await self.get_partner_id()
+        if self.partner_id is None:
             await self.close()
             return
+
+        # 보낸 사람 정보는 연결 시 한 번만 만들어 둔다
+        self.sender = sender_payload(self.user)
         
         # 그룹에 조인
         await self.channel_layer.group_add(
@@ -32,11 +378,18 @@ class ChatConsumer(AsyncWebsocketConsumer):
         
         await self.accept()
         
-        # 기존 메시지 로드해서 전송
-        messages = await self.get_room_messages()
+        # 접속 상태는 Redis TTL 키로만 관리 (DB 사용 없음)
+        self.presence = get_presence_backend()
+        if await self.presence.connect(self.user.id, self.channel_name):
+            await self.send_user_status(is_online=True)
+
+        # 최근 메시지만 전송 (이전 메시지는 load_history로 요청)
+        messages, has_more = await self.get_room_messages()
         await self.send(text_data=json.dumps({
             'type': 'message_history',
-            'messages': messages
+            'messages': messages,
+            'has_more': has_more,
+            'partner_online': await self.presence.is_online(self.partner_id)
         }))
 
     async def disconnect(self, close_code):
@@ -45,6 +398,15 @@ class ChatConsumer(AsyncWebsocketConsumer):
             self.room_group_name,
             self.channel_name
         )
+        if hasattr(self, 'presence'):
+            if await self.presence.stop_typing(self.room_id, self.user.id):
+                await self.send_typing(is_typing=False)
+            # 다른 탭/기기 연결이 남아 있으면 오프라인 알림을 보내지 않는다
+            if await self.presence.disconnect(self.user.id, self.channel_name):
+                await self.send_user_status(is_online=False)
+        # write-behind 모드면 이 연결이 마지막으로 보낸 메시지까지 저장되기를 기다린다 (다른 방은 기다리지 않음)
+        if getattr(self, 'last_submitted_id', None) is not None:
+            await message_writer.wait_saved(self.last_submitted_id)
 
     async def receive(self, text_data):
         data = json.loads(text_data)
@@ -53,28 +415,97 @@ class ChatConsumer(AsyncWebsocketConsumer):
         if message_type == 'chat_message':
             message_content = data['message']
             
-            # 메시지 저장
-            message = await self.save_message(message_content)
+            # 메시지 저장 (write-behind 모드는 id만 받고 저장은 백그라운드에서)
+            if message_writer.enabled:
+                message = message_writer.submit(self.room_id, self.user.id, message_content)
+                self.last_submitted_id = message.id
+            else:
+                message = await database_sync_to_async(save_message)(self.room_id, self.user.id, message_content)
             
             # 그룹의 모든 멤버에게 메시지 전송
             await self.channel_layer.group_send(
                 self.room_group_name,
                 {
                     'type': 'chat_message',
-                    'message': {
-                        'id': message.id,
-                        'content': message.content,
-                        'sender': {
-                            'id': message.sender.id,
-                            'nickname': message.sender.nickname,
-                            'profile_image': message.sender.profile_image.url if message.sender.profile_image else None
-                        },
-                        'timestamp': message.timestamp.isoformat(),
-                        'is_read': message.is_read
-                    }
+                    'message': serialize_message(message, sender=self.sender)
                 }
             )
 
+        elif message_type == 'load_history':
+            # before_id 메시지보다 이전 메시지 한 페이지
+            try:
+                before_id = int(data['before_id'])
+                limit = min(max(int(data.get('limit', HISTORY_PAGE_SIZE)), 1), MAX_HISTORY_PAGE_SIZE)
+            except (KeyError, TypeError, ValueError):
+                return
+            messages, has_more = await self.get_room_messages(before_id=before_id, limit=limit)
+            await self.send(text_data=json.dumps({
+                'type': 'history_page',
+                'before_id': before_id,
+                'messages': messages,
+                'has_more': has_more
+            }))
+
+        elif message_type == 'mark_read':
+            # last_message_id까지 읽음 처리 (UPDATE 한 번) 후 채팅방에 읽음 이벤트 한 번 전송
+            try:
+                last_message_id = int(data['last_message_id'])
+            except (KeyError, TypeError, ValueError):
+                return
+            if message_writer.is_pending(last_message_id):
+                # 방금 브로드캐스트한 메시지가 아직 저장 전이면 이 방의 메시지로 확인되지 않으므로 그 메시지만 기다린다
+                await message_writer.wait_saved(last_message_id)
+            updated = await self.mark_read(last_message_id)
+            if updated:
+                await self.channel_layer.group_send(
+                    self.room_group_name,
+                    {
+                        'type': 'read_receipt',
+                        'reader_id': self.user.id,
+                        'last_read_message_id': last_message_id
+                    }
+                )
+
+        elif message_type == 'typing_indicator':
+            # 입력 중 알림은 사용자별로 TYPING_TTL_MS에 한 번만 채팅방에 보낸다
+            if data.get('is_typing'):
+                changed = await self.presence.start_typing(self.room_id, self.user.id)
+            else:
+                changed = await self.presence.stop_typing(self.room_id, self.user.id)
+            if changed:
+                await self.send_typing(is_typing=bool(data.get('is_typing')))
+
+        elif message_type == 'heartbeat':
+            await self.presence.heartbeat(self.user.id, self.channel_name)
+
+    async def send_user_status(self, is_online):
+        await self.channel_layer.group_send(
+            self.room_group_name,
+            {'type': 'user_status', 'user_id': self.user.id, 'is_online': is_online}
+        )
+
+    async def send_typing(self, is_typing):
+        await self.channel_layer.group_send(
+            self.room_group_name,
+            {'type': 'typing_indicator', 'user_id': self.user.id, 'is_typing': is_typing}
+        )
+
+    async def user_status(self, event):
+        # 내 상태는 나에게 다시 보내지 않는다
+        if event['user_id'] != self.user.id:
+            await self.send(text_data=json.dumps(event))
+
+    async def typing_indicator(self, event):
+        if event['user_id'] != self.user.id:
+            await self.send(text_data=json.dumps(event))
+
+    async def read_receipt(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'read_receipt',
+            'reader_id': event['reader_id'],
+            'last_read_message_id': event['last_read_message_id']
+        }))
+
     async def chat_message(self, event):
         # 그룹에서 받은 메시지를 WebSocket으로 전송
         await self.send(text_data=json.dumps({
@@ -83,47 +514,35 @@ class ChatConsumer(AsyncWebsocketConsumer):
         }))
 
     @database_sync_to_async
-    def has_room_permission(self):
-        """사용자가 해당 채팅방에 접근 권한이 있는지 확인"""
-        try:
-            room = ChatRoom.objects.get(id=self.room_id)
-            return self.user in [room.participant1, room.participant2]
-        except ChatRoom.DoesNotExist:
-            return False
+    def get_partner_id(self):
+        """채팅방 상대 id (참가자가 아니면 None). 권한 확인을 겸하고 참가자 User 행은 읽지 않음"""
+        participants = ChatRoom.objects.filter(
+            Q(participant1_id=self.user.id) | Q(participant2_id=self.user.id),
+            id=self.room_id
+        ).values_list('participant1_id', 'participant2_id').first()
+        if participants is None:
+            return None
+        return participants[1] if participants[0] == self.user.id else participants[0]
 
     @database_sync_to_async
-    def save_message(self, content):
-        """메시지를 데이터베이스에 저장"""
-        room = ChatRoom.objects.get(id=self.room_id)
-        message = Message.objects.create(
-            room=room,
-            sender=self.user,
-            content=content
-        )
-        # 채팅방의 updated_at 갱신
-        room.save()
-        return message
+    def mark_read(self, last_message_id):
+        return ChatReadState.mark_read(self.room_id, self.user.id, last_message_id)
 
     @database_sync_to_async
-    def get_room_messages(self):
-        """채팅방의 기존 메시지들을 가져오기"""
-        try:
-            room = ChatRoom.objects.get(id=self.room_id)
-            messages = room.messages.select_related('sender').order_by('timestamp')
-            
-            return [
-                {
-                    'id': msg.id,
-                    'content': msg.content,
-                    'sender': {
-                        'id': msg.sender.id,
-                        'nickname': msg.sender.nickname,
-                        'profile_image': msg.sender.profile_image.url if msg.sender.profile_image else None
-                    },
-                    'timestamp': msg.timestamp.isoformat(),
-                    'is_read': msg.is_read
-                }
-                for msg in messages
-            ]
-        except ChatRoom.DoesNotExist:
-            return []
\ No newline at end of file
+    def get_room_messages(self, before_id=None, limit=HISTORY_PAGE_SIZE):
+        """
+        채팅방 메시지 한 페이지 (오래된 순으로 정렬해서 반환)와 더 이전 메시지가 있는지 여부
+
+        (room, timestamp, id) 인덱스를 최신순으로 읽는 키셋 조회라 방의 메시지 수와 상관없이 limit개만 읽는다.
+        before_id가 있으면 그 메시지보다 이전 메시지부터 읽는다.
+        """
+        messages = Message.objects.filter(room_id=self.room_id)
+        if before_id is not None:
+            cursor = messages.filter(id=before_id).values_list('timestamp', flat=True).first()
+            if cursor is None:
+                return [], False
+            messages = messages.filter(Q(timestamp__lt=cursor) | Q(timestamp=cursor, id__lt=before_id))
+
+        page = list(messages.select_related('sender').order_by('-timestamp', '-id')[:limit + 1])
+        has_more = len(page) > limit
+        return [serialize_message(msg) for msg in reversed(page[:limit])], has_more
@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import InMemoryChannelLayer
+from django.core.management.base import BaseCommand
+
+from accounts.models import User
+from chat import consumers
+from chat.models import ChatRoom
+
+
+class Command(BaseCommand):
+    help = "채팅 메시지 저장 처리량을 즉시 저장(sync)과 write-behind 모드로 비교합니다. 임시 사용자/채팅방은 끝나면 삭제됩니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, nargs='+', default=[1, 10, 100], help="동시에 대화하는 채팅방 수 (기본 1 10 100)")
+        parser.add_argument('--messages', type=int, default=200, help="채팅방마다 보낼 메시지 수 (기본 200)")
+
+    def handle(self, *args, **options):
+        for room_count in options['rooms']:
+            rooms = self.create_rooms(room_count)
+            try:
+                sync_rate = async_to_sync(self.run)(rooms, options['messages'], write_behind=False)
+                write_behind_rate = async_to_sync(self.run)(rooms, options['messages'], write_behind=True)
+            finally:
+                User.objects.filter(username__startswith='bench_chat_').delete()
+            self.stdout.write(
+                f"채팅방 {room_count}개: sync {sync_rate:,.0f} msg/s, "
+                f"write-behind {write_behind_rate:,.0f} msg/s ({write_behind_rate / sync_rate:.1f}x)"
+            )
+
+    @staticmethod
+    def create_rooms(count):
+        users = User.objects.bulk_create([
+            User(username=f'bench_chat_{i}', nickname=f'bench_chat_{i}') for i in range(count * 2)
+        ])
+        return ChatRoom.objects.bulk_create([
+            ChatRoom(participant1=users[2 * i], participant2=users[2 * i + 1]) for i in range(count)
+        ])
+
+    async def run(self, rooms, per_room, write_behind):
+        """채팅방마다 클라이언트 하나가 메시지를 연달아 보내는 상황 (저장 완료까지 포함한 처리량)"""
+        layer = InMemoryChannelLayer()
+        writer = consumers.MessageWriter(worker_id=0)
+        consumers._room_touched_at.clear()
+
+        async def talk(room):
+            sender = consumers.sender_payload(room.participant1)
+            for i in range(per_room):
+                if write_behind:
+                    message = writer.submit(room.id, room.participant1_id, f"벤치마크 {i}")
+                else:
+                    message = await database_sync_to_async(consumers.save_message)(
+                        room.id, room.participant1_id, f"벤치마크 {i}"
+                    )
+                await layer.group_send(f'chat_{room.id}', {
+                    'type': 'chat_message',
+                    'message': consumers.serialize_message(message, sender=sender),
+                })
+
+        started = time.perf_counter()
+        await asyncio.gather(*(talk(room) for room in rooms))
+        if write_behind:
+            await writer.flush()
+        elapsed = time.perf_counter() - started
+        return len(rooms) * per_room / elapsed
@@ -0,0 +1,41 @@
+import json
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+
+from chat.consumers import MessageIdConflict, MessageWriter, message_record, spill_dir
+from chat.models import Message
+
+
+class Command(BaseCommand):
+    help = (
+        "write-behind가 DB에 저장하지 못하고 spill 파일(CHAT_SPILL_DIR)에 남긴 채팅 메시지를 다시 저장합니다. "
+        "이미 저장된 메시지는 건너뛰고, id가 다른 메시지와 겹치는 메시지는 conflicts.jsonl에 남깁니다."
+    )
+
+    def handle(self, *args, **options):
+        directory = spill_dir()
+        # 워커가 계속 덧붙이는 파일은 이름을 바꾼 뒤 읽는다 (워커는 다음에 새 파일을 만든다)
+        for path in sorted(directory.glob('worker_*.jsonl')):
+            path.rename(path.with_suffix('.replaying'))
+
+        saved = conflicted = 0
+        for path in sorted(directory.glob('worker_*.replaying')):
+            with open(path, encoding='utf-8') as spill_file:
+                messages = [
+                    Message(**dict(record, timestamp=datetime.fromisoformat(record['timestamp'])))
+                    for record in map(json.loads, filter(str.strip, spill_file))
+                ]
+            try:
+                MessageWriter._persist(messages)
+            except MessageIdConflict as e:
+                with open(directory / 'conflicts.jsonl', 'a', encoding='utf-8') as conflict_file:
+                    for message in e.messages:
+                        conflict_file.write(json.dumps(message_record(message), ensure_ascii=False) + '\n')
+                conflicted += len(e.messages)
+            saved += len(messages)
+            path.unlink()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"채팅 메시지 {saved - conflicted}개 다시 저장, id 충돌 {conflicted}개 (conflicts.jsonl)"
+        ))
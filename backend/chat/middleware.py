@@ -1,15 +1,17 @@
 from urllib.parse import parse_qs
 from channels.db import database_sync_to_async
 from channels.middleware import BaseMiddleware
-from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
 from django.contrib.auth.models import AnonymousUser
+from accounts.authentication import CachedTokenAuthentication
 
 @database_sync_to_async
 def get_user_from_token(token_key):
+    # API 요청과 같은 토큰 캐시 사용 (캐시 적중 시 쿼리 없음)
     try:
-        token = Token.objects.get(key=token_key)
-        return token.user
-    except Token.DoesNotExist:
+        user, _ = CachedTokenAuthentication().authenticate_credentials(token_key)
+        return user
+    except AuthenticationFailed:
         return AnonymousUser()
 
 class TokenAuthMiddleware(BaseMiddleware):
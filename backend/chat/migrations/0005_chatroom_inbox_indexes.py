@@ -0,0 +1,21 @@
+# Generated by Django 4.2.21 on 2026-10-18 11:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0004_chatreadstate'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatroom',
+            index=models.Index(fields=['participant1', 'updated_at'], name='chat_room_p1_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatroom',
+            index=models.Index(fields=['participant2', 'updated_at'], name='chat_room_p2_updated_idx'),
+        ),
+    ]
@@ -1,5 +1,7 @@
 # chat/models.py
 from django.db import models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 
@@ -15,10 +17,41 @@ class ChatRoom(models.Model):
     class Meta:
         unique_together = ['participant1', 'participant2']
         ordering = ['-updated_at']
+        indexes = [
+            # 사용자별 채팅방 목록 (최근 대화 순) 키셋 조회용
+            models.Index(fields=['participant1', 'updated_at'], name='chat_room_p1_updated_idx'),
+            models.Index(fields=['participant2', 'updated_at'], name='chat_room_p2_updated_idx'),
+        ]
     
     def __str__(self):
         return f"Chat: {self.participant1.nickname} & {self.participant2.nickname}"
     
+    @classmethod
+    def inbox(cls, user):
+        """
+        사용자의 채팅방 목록 (쿼리 한 번)
+
+        참가자는 select_related로, 마지막 메시지는 Subquery 어노테이션으로,
+        안 읽은 메시지 수는 읽은 위치(ChatReadState)보다 뒤에 온 상대 메시지의 조건부 COUNT로 붙인다.
+        """
+        last_message = Message.objects.filter(room=OuterRef('pk')).order_by('-timestamp', '-id')
+        last_read = ChatReadState.objects.filter(room=OuterRef('pk'), user=user).values('last_read_message_id')[:1]
+        return (
+            cls.objects
+            .filter(Q(participant1=user) | Q(participant2=user))
+            .select_related('participant1', 'participant2')
+            .annotate(
+                last_message_id=Subquery(last_message.values('id')[:1]),
+                last_message_content=Subquery(last_message.values('content')[:1]),
+                last_message_sender_id=Subquery(last_message.values('sender_id')[:1]),
+                last_message_timestamp=Subquery(last_message.values('timestamp')[:1]),
+                unread_count=Count(
+                    'messages',
+                    filter=~Q(messages__sender=user) & Q(messages__id__gt=Coalesce(Subquery(last_read), 0)),
+                ),
+            )
+        )
+
     @classmethod
     def get_or_create_room(cls, user1, user2):
         """두 사용자 간의 채팅방 가져오기 또는 생성"""
@@ -37,11 +70,75 @@ class Message(models.Model):
     room = models.ForeignKey(ChatRoom, on_delete=models.CASCADE, related_name='messages')
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_messages')
     content = models.TextField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # write-behind 저장 시 보낸 시각을 그대로 넣을 수 있도록 auto_now_add 대신 default 사용
+    timestamp = models.DateTimeField(default=timezone.now)
     is_read = models.BooleanField(default=False)
     
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            # 채팅방별 최신 메시지 / 이전 메시지 키셋 조회용
+            models.Index(fields=['room', 'timestamp', 'id'], name='chat_msg_room_ts_id_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.sender.nickname}: {self.content[:50]}"
\ No newline at end of file
+        return f"{self.sender.nickname}: {self.content[:50]}"
+
+
+class ChatReadState(models.Model):
+    """채팅방별 사용자가 마지막으로 읽은 메시지 id (안 읽은 메시지 수 계산용)"""
+    room = models.ForeignKey(ChatRoom, on_delete=models.CASCADE, related_name='read_states')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chat_read_states')
+    last_read_message_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['room', 'user']
+
+    def __str__(self):
+        return f"{self.user.nickname} @ {self.room_id}: {self.last_read_message_id}"
+
+    @classmethod
+    def mark_read(cls, room_id, user_id, last_message_id):
+        """
+        last_message_id까지 읽음 처리하고 읽음 처리된 상대 메시지 수를 반환
+
+        메시지는 UPDATE 한 번으로 is_read를 바꾸고, 읽은 위치는 앞으로만 이동한다.
+        last_message_id가 이 방의 메시지가 아니면 (다른 방 / 없는 id) 아무것도 바꾸지 않고 0을 반환하므로
+        읽은 위치가 방의 마지막 메시지를 넘어가지 않는다.
+        """
+        if not Message.objects.filter(room_id=room_id, id=last_message_id).exists():
+            return 0
+
+        updated = Message.objects.filter(
+            room_id=room_id, id__lte=last_message_id, is_read=False
+        ).exclude(sender_id=user_id).update(is_read=True)
+
+        moved = cls.objects.filter(
+            room_id=room_id, user_id=user_id, last_read_message_id__lt=last_message_id
+        ).update(last_read_message_id=last_message_id)
+        if not moved:
+            cls.objects.get_or_create(
+                room_id=room_id, user_id=user_id, defaults={'last_read_message_id': last_message_id}
+            )
+        return updated
+
+    @classmethod
+    def unread_counts(cls, user, room_ids=None):
+        """
+        {room_id: 안 읽은 메시지 수} (안 읽은 메시지가 있는 방만)
+
+        방마다 COUNT를 따로 하지 않고, 읽은 위치를 서브쿼리로 붙여 GROUP BY 한 번으로 전체 채팅방을 센다.
+        """
+        last_read = cls.objects.filter(room_id=OuterRef('room_id'), user=user).values('last_read_message_id')[:1]
+        messages = Message.objects.filter(Q(room__participant1=user) | Q(room__participant2=user))
+        if room_ids is not None:
+            messages = messages.filter(room_id__in=room_ids)
+        rows = (
+            messages.exclude(sender=user)
+            .filter(id__gt=Coalesce(Subquery(last_read), 0))
+            .order_by()
+            .values('room_id')
+            .annotate(unread=Count('id'))
+        )
+        return {row['room_id']: row['unread'] for row in rows}
@@ -0,0 +1,230 @@
+import asyncio
+import threading
+import time
+import weakref
+from functools import lru_cache
+
+import redis
+import redis.asyncio
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+# 연결이 heartbeat 없이 이 시간(ms)이 지나면 오프라인으로 본다 (클라이언트는 25초마다 heartbeat)
+PRESENCE_TTL_MS = 60 * 1000
+# 같은 사용자의 "입력 중" / "입력 끝" 알림은 각각 이 시간(ms)에 한 번만 채팅방에 보낸다
+TYPING_TTL_MS = 3 * 1000
+TYPING, STOPPED = b'1', b'0'
+
+
+def presence_key(user_id):
+    return f'chat:presence:{user_id}'
+
+
+def typing_key(room_id, user_id):
+    return f'chat:typing:{room_id}:{user_id}'
+
+
+class RedisPresenceBackend:
+    """
+    접속 상태 / 입력 중 상태를 Redis TTL 키로 관리 (DB 사용 없음)
+
+    접속 상태는 사용자별 sorted set에 연결(channel_name)마다 만료 시각을 점수로 넣어서,
+    탭을 여러 개 열어도 마지막 연결이 끊기거나 만료될 때만 오프라인이 된다.
+    입력 중 상태는 SET NX PX 키라 TTL 동안 반복된 알림은 group_send 없이 버려진다.
+    입력 끝 알림은 키를 지우지 않고 값만 STOPPED로 바꿔서 TTL이 끝날 때까지 남겨 두므로,
+    입력 중/끝을 번갈아 보내도 TTL마다 각각 한 번씩만 보낸다.
+    Redis에 연결할 수 없으면 경고만 남기고 알림을 보내지 않는다 (채팅 자체는 계속 동작).
+    """
+
+    def __init__(self, url=None):
+        self.url = url or self.default_url()
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._sync_client = None
+
+    @staticmethod
+    def default_url():
+        url = getattr(settings, 'CHAT_PRESENCE_REDIS_URL', '')
+        if url:
+            return url
+        # 따로 지정하지 않으면 채널 레이어와 같은 Redis 사용
+        host = settings.CHANNEL_LAYERS['default'].get('CONFIG', {}).get('hosts', [('127.0.0.1', 6379)])[0]
+        if isinstance(host, str):
+            return host
+        return f'redis://{host[0]}:{host[1]}/0'
+
+    def _client(self):
+        # redis.asyncio 연결은 이벤트 루프에 묶여 있으므로 루프마다 클라이언트를 만든다
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = self._async_clients[loop] = redis.asyncio.Redis.from_url(self.url)
+        return client
+
+    async def _safely(self, operation, default):
+        try:
+            return await operation(self._client())
+        except (redis.RedisError, OSError) as e:
+            print(f"⚠️ 접속 상태 저장소(Redis) 사용 불가: {e}")
+            return default
+
+    async def connect(self, user_id, channel_name):
+        """연결 추가. 이 연결로 오프라인 → 온라인이 됐으면 True"""
+        async def operation(client):
+            now = int(time.time() * 1000)
+            key = presence_key(user_id)
+            async with client.pipeline(transaction=True) as pipe:
+                pipe.zremrangebyscore(key, '-inf', now)
+                pipe.zcard(key)
+                pipe.zadd(key, {channel_name: now + PRESENCE_TTL_MS})
+                pipe.pexpire(key, PRESENCE_TTL_MS)
+                _, live, _, _ = await pipe.execute()
+            return live == 0
+        return await self._safely(operation, False)
+
+    async def heartbeat(self, user_id, channel_name):
+        async def operation(client):
+            key = presence_key(user_id)
+            async with client.pipeline(transaction=True) as pipe:
+                pipe.zadd(key, {channel_name: int(time.time() * 1000) + PRESENCE_TTL_MS})
+                pipe.pexpire(key, PRESENCE_TTL_MS)
+                await pipe.execute()
+        await self._safely(operation, None)
+
+    async def disconnect(self, user_id, channel_name):
+        """연결 제거. 남은 연결이 없어 오프라인이 됐으면 True"""
+        async def operation(client):
+            key = presence_key(user_id)
+            async with client.pipeline(transaction=True) as pipe:
+                pipe.zrem(key, channel_name)
+                pipe.zcount(key, int(time.time() * 1000), '+inf')
+                removed, live = await pipe.execute()
+            return bool(removed) and live == 0
+        return await self._safely(operation, False)
+
+    async def is_online(self, user_id):
+        async def operation(client):
+            return await client.zcount(presence_key(user_id), int(time.time() * 1000), '+inf') > 0
+        return await self._safely(operation, False)
+
+    async def start_typing(self, room_id, user_id):
+        """입력 중 알림을 보내야 하면 True (TYPING_TTL_MS 안에 이미 입력 중/끝 알림을 보냈으면 False)"""
+        async def operation(client):
+            return bool(await client.set(typing_key(room_id, user_id), TYPING, nx=True, px=TYPING_TTL_MS))
+        return await self._safely(operation, False)
+
+    async def stop_typing(self, room_id, user_id):
+        """입력 끝 알림을 보내야 하면 True (입력 중 알림을 보낸 상태일 때만, 키는 TTL로 만료)"""
+        async def operation(client):
+            previous = await client.set(typing_key(room_id, user_id), STOPPED, xx=True, keepttl=True, get=True)
+            return previous == TYPING
+        return await self._safely(operation, False)
+
+    def online_user_ids(self, user_ids):
+        """여러 사용자 중 온라인인 사용자 id (파이프라인 한 번, 동기 뷰용)"""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return set()
+        if self._sync_client is None:
+            self._sync_client = redis.Redis.from_url(self.url)
+        now = int(time.time() * 1000)
+        try:
+            pipe = self._sync_client.pipeline(transaction=False)
+            for user_id in user_ids:
+                pipe.zcount(presence_key(user_id), now, '+inf')
+            counts = pipe.execute()
+        except (redis.RedisError, OSError) as e:
+            print(f"⚠️ 접속 상태 저장소(Redis) 사용 불가: {e}")
+            return set()
+        return {user_id for user_id, live in zip(user_ids, counts) if live}
+
+
+class LocalPresenceBackend:
+    """
+    프로세스 내 접속 상태 저장소 (InMemoryChannelLayer를 쓰는 개발/테스트용)
+
+    RedisPresenceBackend와 같은 동작을 dict와 만료 시각으로 흉내 낸다. 프로세스 사이에는 공유되지 않는다.
+    """
+
+    def __init__(self):
+        self._connections = {}
+        self._typing = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _now():
+        return time.monotonic() * 1000
+
+    def _live(self, user_id, now):
+        connections = self._connections.get(user_id, {})
+        for channel_name in [name for name, expires_at in connections.items() if expires_at <= now]:
+            del connections[channel_name]
+        return connections
+
+    async def connect(self, user_id, channel_name):
+        with self._lock:
+            now = self._now()
+            connections = self._live(user_id, now)
+            was_offline = not connections
+            self._connections.setdefault(user_id, connections)[channel_name] = now + PRESENCE_TTL_MS
+            return was_offline
+
+    async def heartbeat(self, user_id, channel_name):
+        with self._lock:
+            now = self._now()
+            self._connections.setdefault(user_id, {})[channel_name] = now + PRESENCE_TTL_MS
+
+    async def disconnect(self, user_id, channel_name):
+        with self._lock:
+            connections = self._live(user_id, self._now())
+            removed = connections.pop(channel_name, None) is not None
+            return removed and not connections
+
+    async def is_online(self, user_id):
+        with self._lock:
+            return bool(self._live(user_id, self._now()))
+
+    async def start_typing(self, room_id, user_id):
+        with self._lock:
+            now = self._now()
+            key = (room_id, user_id)
+            expires_at, _ = self._typing.get(key, (0, None))
+            if expires_at > now:
+                return False
+            self._typing[key] = (now + TYPING_TTL_MS, TYPING)
+            return True
+
+    async def stop_typing(self, room_id, user_id):
+        with self._lock:
+            key = (room_id, user_id)
+            expires_at, state = self._typing.get(key, (0, None))
+            if expires_at <= self._now() or state != TYPING:
+                return False
+            self._typing[key] = (expires_at, STOPPED)
+            return True
+
+    def online_user_ids(self, user_ids):
+        with self._lock:
+            now = self._now()
+            return {user_id for user_id in user_ids if self._live(user_id, now)}
+
+
+@lru_cache(maxsize=None)
+def get_presence_backend():
+    """
+    settings.CHAT_PRESENCE_BACKEND (dotted path)이 있으면 그 백엔드,
+    없으면 채널 레이어가 Redis일 때 Redis, 그 외에는 프로세스 내 백엔드를 사용
+    """
+    backend_path = getattr(settings, 'CHAT_PRESENCE_BACKEND', None)
+    if backend_path:
+        return import_string(backend_path)()
+    if settings.CHANNEL_LAYERS['default']['BACKEND'] == 'channels_redis.core.RedisChannelLayer':
+        return RedisPresenceBackend()
+    return LocalPresenceBackend()
+
+
+@receiver(setting_changed)
+def presence_settings_changed(setting, **kwargs):
+    if setting in ('CHANNEL_LAYERS', 'CHAT_PRESENCE_BACKEND', 'CHAT_PRESENCE_REDIS_URL'):
+        get_presence_backend.cache_clear()
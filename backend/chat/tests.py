@@ -1,3 +1,466 @@
-from django.test import TestCase
+import json
+import tempfile
+from contextlib import redirect_stdout
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
 
-# Create your tests here.
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import OperationalError
+from django.db.backends.utils import CursorWrapper
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import User
+from . import consumers
+from .models import ChatReadState, ChatRoom, Message
+from .presence import RedisPresenceBackend, get_presence_backend
+from .routing import websocket_urlpatterns
+
+
+IN_MEMORY_CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class ChatHistoryTest(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="me", password="pw", nickname="me")
+        self.partner = User.objects.create_user(username="you", password="pw", nickname="you")
+        self.room, _ = ChatRoom.get_or_create_room(self.user, self.partner)
+        messages = Message.objects.bulk_create([
+            Message(room=self.room, sender=self.user, content=f"메시지 {i}") for i in range(120)
+        ])
+        # 같은 시각 메시지가 섞여 있어도 id로 순서가 정해지는지 확인
+        base = timezone.now() - timedelta(hours=1)
+        for i, message in enumerate(messages):
+            message.timestamp = base + timedelta(seconds=i // 3)
+        Message.objects.bulk_update(messages, ["timestamp"])
+
+    async def connect(self):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f"/ws/chat/{self.room.id}/")
+        communicator.scope["user"] = self.user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    def test_connect_sends_latest_page_and_loads_older(self):
+        async def run():
+            communicator = await self.connect()
+            history = await communicator.receive_json_from()
+            self.assertEqual(history["type"], "message_history")
+            self.assertTrue(history["has_more"])
+            contents = [message["content"] for message in history["messages"]]
+            self.assertEqual(contents, [f"메시지 {i}" for i in range(70, 120)])
+
+            before_id = history["messages"][0]["id"]
+            seen = contents
+            while True:
+                await communicator.send_json_to({"type": "load_history", "before_id": before_id, "limit": 40})
+                page = await communicator.receive_json_from()
+                self.assertEqual(page["type"], "history_page")
+                seen = [message["content"] for message in page["messages"]] + seen
+                if not page["has_more"]:
+                    break
+                before_id = page["messages"][0]["id"]
+
+            self.assertEqual(seen, [f"메시지 {i}" for i in range(120)])
+            await communicator.disconnect()
+
+        async_to_sync(run)()
+
+    def test_message_is_one_insert_and_room_touch_is_coalesced(self):
+        consumers._room_touched_at.clear()
+
+        async def run():
+            communicator = await self.connect()
+            await communicator.receive_json_from()
+
+            # 쿼리는 consumer의 DB 스레드에서 실행되므로 커서 자체를 감싸서 기록
+            statements = []
+            execute = CursorWrapper.execute
+
+            def recording_execute(cursor, sql, params=None):
+                statements.append(sql.split()[0])
+                return execute(cursor, sql, params)
+
+            with patch.object(CursorWrapper, "execute", recording_execute):
+                for i in range(3):
+                    await communicator.send_json_to({"type": "chat_message", "message": f"새 메시지 {i}"})
+                    event = await communicator.receive_json_from()
+                    self.assertEqual(event["message"]["sender"]["nickname"], "me")
+            await communicator.disconnect()
+            return statements
+
+        statements = async_to_sync(run)()
+        # 메시지마다 INSERT 1번, 채팅방 updated_at UPDATE는 1초 안에 한 번만
+        self.assertEqual(statements.count("INSERT"), 3)
+        self.assertEqual(statements.count("UPDATE"), 1)
+        self.assertEqual(len(statements), 4)
+        self.assertEqual(Message.objects.filter(room=self.room, content__startswith="새 메시지").count(), 3)
+
+    @patch.object(consumers, "ROOM_TOUCH_CACHE_SIZE", 2)
+    def test_room_touch_times_are_bounded(self):
+        consumers._room_touched_at.clear()
+        self.addCleanup(consumers._room_touched_at.clear)
+        for room_id in (1, 2, 3, 1):
+            consumers.touch_room(room_id)
+        # 오래 안 쓴 방부터 잊는다
+        self.assertEqual(list(consumers._room_touched_at), [3, 1])
+        with self.assertNumQueries(0):
+            consumers.touch_room(3)
+        with self.assertNumQueries(1):
+            consumers.touch_room(2)
+        self.assertEqual(list(consumers._room_touched_at), [1, 2])
+
+    @override_settings(CHAT_WRITE_BEHIND=True, CHAT_WORKER_ID=1)
+    def test_write_behind_broadcasts_before_insert_and_flushes_in_batches(self):
+        async def run():
+            communicator = await self.connect()
+            await communicator.receive_json_from()
+
+            ids = []
+            for i in range(5):
+                await communicator.send_json_to({"type": "chat_message", "message": f"바로 전송 {i}"})
+                event = await communicator.receive_json_from()
+                ids.append(event["message"]["id"])
+            await communicator.disconnect()
+            return ids
+
+        ids = async_to_sync(run)()
+        # id는 저장 전에 발급되지만 시간순으로 증가하고, 연결을 닫으면 대기열이 비워진다
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(consumers.message_writer.pending_count, 0)
+        saved = Message.objects.filter(room=self.room, content__startswith="바로 전송").order_by("id")
+        self.assertEqual(list(saved.values_list("id", flat=True)), ids)
+        self.assertLess(max(ids), 2 ** 53)
+
+        # 같은 배치를 다시 저장해도 (재시도) 중복이 생기지 않는다
+        consumers.MessageWriter._persist(list(saved))
+        self.assertEqual(saved.count(), 5)
+
+    @override_settings(CHAT_WRITE_BEHIND=True, CHAT_WORKER_ID=None)
+    def test_write_behind_requires_worker_id(self):
+        # 프로세스 id로 대신하면 워커끼리 id가 겹칠 수 있으므로 설정하지 않으면 쓰지 않는다
+        with self.assertRaises(ImproperlyConfigured):
+            consumers.MessageWriter().submit(self.room.id, self.user.id, "저장 안 됨")
+        with self.assertRaises(ImproperlyConfigured):
+            consumers.MessageWriter(worker_id=64).ids
+        self.assertEqual(consumers.MessageWriter(worker_id=63).ids.worker_id, 63)
+
+    def test_persist_raises_on_id_conflict(self):
+        ids = consumers.MessageIdGenerator(3)
+        taken = Message.objects.create(id=ids.next_id(), room=self.room, sender=self.user, content="먼저 저장됨")
+        batch = [
+            Message(id=taken.id, room=self.room, sender=self.partner, content="같은 id 다른 메시지"),
+            Message(id=ids.next_id(), room=self.room, sender=self.user, content="정상 메시지"),
+        ]
+        with self.assertRaises(consumers.MessageIdConflict):
+            consumers.MessageWriter._persist(batch)
+        # 겹치지 않은 메시지는 저장되고 이미 있던 메시지는 그대로
+        self.assertTrue(Message.objects.filter(id=batch[1].id, content="정상 메시지").exists())
+        self.assertEqual(Message.objects.get(id=taken.id).content, "먼저 저장됨")
+
+    def test_failed_batch_is_retried_with_backoff_until_saved(self):
+        writer = consumers.MessageWriter(worker_id=2)
+        writer.retry_delay, writer.max_retry_delay = 0.001, 0.004
+        persist = consumers.MessageWriter._persist
+        calls = []
+
+        def locked_then_saved(batch):
+            calls.append(len(batch))
+            if len(calls) <= 6:
+                raise OperationalError("database is locked")
+            persist(batch)
+
+        async def run():
+            message = writer.submit(self.room.id, self.user.id, "저장 실패 후 재시도")
+            return message, await writer.flush(timeout=5)
+
+        output = StringIO()
+        with patch.object(consumers.MessageWriter, "_persist", side_effect=locked_then_saved), redirect_stdout(output):
+            message, flushed = async_to_sync(run)()
+        # 몇 번 실패해도 버리지 않고 저장될 때까지 다시 시도한다 (간격은 max_retry_delay까지 늘어남)
+        self.assertTrue(flushed)
+        self.assertEqual(calls, [1] * 7)
+        self.assertTrue(Message.objects.filter(id=message.id, content="저장 실패 후 재시도").exists())
+        self.assertIn("0.004초 뒤 재시도 (1개, 6번째)", output.getvalue())
+        self.assertNotIn("버림", output.getvalue())
+
+    def test_unsaved_messages_are_spilled_and_replayed(self):
+        spill = tempfile.TemporaryDirectory()
+        self.addCleanup(spill.cleanup)
+        ids = consumers.MessageIdGenerator(4)
+        taken = Message.objects.create(id=ids.next_id(), room=self.room, sender=self.user, content="먼저 저장됨")
+
+        with override_settings(CHAT_SPILL_DIR=spill.name), redirect_stdout(StringIO()):
+            writer = consumers.MessageWriter(worker_id=4)
+            writer._ids = ids
+            writer._pending = [
+                Message(id=ids.next_id(), room=self.room, sender=self.user, content="종료 중 남은 메시지",
+                        timestamp=timezone.now())
+            ]
+            with patch.object(consumers.MessageWriter, "_persist", side_effect=OperationalError("database is locked")):
+                writer.flush_sync()
+            # id가 겹친 메시지도 버리지 않고 남긴다
+            writer._pending = [
+                Message(id=taken.id, room=self.room, sender=self.partner, content="같은 id 다른 메시지",
+                        timestamp=timezone.now())
+            ]
+            writer.flush_sync()
+            self.assertEqual(writer.pending_count, 0)
+
+            spilled = Path(spill.name) / "worker_4.jsonl"
+            records = [json.loads(line) for line in spilled.read_text(encoding="utf-8").splitlines()]
+            self.assertEqual([record["content"] for record in records], ["종료 중 남은 메시지", "같은 id 다른 메시지"])
+
+            output = StringIO()
+            call_command("replay_chat_messages", stdout=output)
+        self.assertIn("채팅 메시지 1개 다시 저장, id 충돌 1개", output.getvalue())
+        self.assertTrue(Message.objects.filter(id=records[0]["id"], content="종료 중 남은 메시지").exists())
+        self.assertEqual(Message.objects.get(id=taken.id).content, "먼저 저장됨")
+        self.assertEqual(sorted(path.name for path in Path(spill.name).iterdir()), ["conflicts.jsonl"])
+
+    def test_waits_only_for_the_given_message(self):
+        writer = consumers.MessageWriter(worker_id=2)
+        writer.retry_delay = 60
+
+        async def run():
+            stuck = writer.submit(self.room.id, self.user.id, "저장 대기")
+            results = (
+                await writer.wait_saved(stuck.id + 1, timeout=0.05),
+                await writer.wait_saved(stuck.id, timeout=0.05),
+                await writer.flush(timeout=0.05),
+            )
+            writer._task.cancel()
+            return results
+
+        with patch.object(consumers.MessageWriter, "_persist", side_effect=OperationalError("database is locked")):
+            with redirect_stdout(StringIO()):
+                # 다른 메시지는 바로 돌아오고, 저장 안 된 메시지는 timeout까지만 기다린다
+                self.assertEqual(async_to_sync(run)(), (True, False, False))
+        self.assertEqual(writer.pending_count, 1)
+        writer._pending.clear()
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class ChatReadReceiptTest(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="me", password="pw", nickname="me")
+        self.partner = User.objects.create_user(username="you", password="pw", nickname="you")
+        self.other = User.objects.create_user(username="other", password="pw", nickname="other")
+        self.room, _ = ChatRoom.get_or_create_room(self.user, self.partner)
+        self.other_room, _ = ChatRoom.get_or_create_room(self.user, self.other)
+        self.incoming = Message.objects.bulk_create([
+            Message(room=self.room, sender=self.partner, content=f"받은 메시지 {i}") for i in range(5)
+        ])
+        Message.objects.create(room=self.room, sender=self.user, content="보낸 메시지")
+        Message.objects.bulk_create([
+            Message(room=self.other_room, sender=self.other, content=f"다른 방 {i}") for i in range(3)
+        ])
+
+    async def connect(self, user):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f"/ws/chat/{self.room.id}/")
+        communicator.scope["user"] = user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        await communicator.receive_json_from()
+        return communicator
+
+    def test_unread_counts_are_one_grouped_query(self):
+        with self.assertNumQueries(1):
+            counts = ChatReadState.unread_counts(self.user)
+        self.assertEqual(counts, {self.room.id: 5, self.other_room.id: 3})
+
+        ChatReadState.mark_read(self.room.id, self.user.id, self.incoming[2].id)
+        self.assertEqual(ChatReadState.unread_counts(self.user), {self.room.id: 2, self.other_room.id: 3})
+        # 읽은 위치는 뒤로 가지 않는다
+        ChatReadState.mark_read(self.room.id, self.user.id, self.incoming[0].id)
+        self.assertEqual(ChatReadState.unread_counts(self.user)[self.room.id], 2)
+
+    def test_mark_read_rejects_ids_outside_the_room(self):
+        other_room_message = Message.objects.filter(room=self.other_room).last()
+        last = Message.objects.filter(room=self.room).order_by("id").last()
+        for message_id in (other_room_message.id, last.id + 1000, 10 ** 15):
+            with self.subTest(message_id=message_id):
+                self.assertEqual(ChatReadState.mark_read(self.room.id, self.user.id, message_id), 0)
+        self.assertFalse(ChatReadState.objects.filter(room=self.room, user=self.user).exists())
+        self.assertEqual(ChatReadState.unread_counts(self.user)[self.room.id], 5)
+
+        # 새 메시지가 와도 미리 앞당겨 둔 읽은 위치 때문에 읽은 것으로 세지 않는다
+        self.assertEqual(ChatReadState.mark_read(self.room.id, self.user.id, last.id), 5)
+        Message.objects.create(room=self.room, sender=self.partner, content="새 메시지")
+        self.assertEqual(ChatReadState.objects.get(room=self.room, user=self.user).last_read_message_id, last.id)
+        self.assertEqual(ChatReadState.unread_counts(self.user)[self.room.id], 1)
+
+    def test_mark_read_updates_in_bulk_and_notifies_room(self):
+        async def run():
+            sender = await self.connect(self.partner)
+            reader = await self.connect(self.user)
+            self.assertEqual((await sender.receive_json_from())["type"], "user_status")
+
+            statements = []
+            execute = CursorWrapper.execute
+
+            def recording_execute(cursor, sql, params=None):
+                statements.append(sql.split()[0])
+                return execute(cursor, sql, params)
+
+            with patch.object(CursorWrapper, "execute", recording_execute):
+                await reader.send_json_to({"type": "mark_read", "last_message_id": self.incoming[3].id})
+                receipt = await sender.receive_json_from()
+            self.assertEqual(receipt, {
+                "type": "read_receipt",
+                "reader_id": self.user.id,
+                "last_read_message_id": self.incoming[3].id,
+            })
+            self.assertEqual((await reader.receive_json_from())["type"], "read_receipt")
+
+            # 이미 읽은 위치를 다시 보내면 이벤트를 보내지 않는다
+            await reader.send_json_to({"type": "mark_read", "last_message_id": self.incoming[3].id})
+            self.assertTrue(await sender.receive_nothing())
+
+            await sender.disconnect()
+            await reader.disconnect()
+            return statements
+
+        statements = async_to_sync(run)()
+        # 메시지 UPDATE 1번 + 읽은 위치 UPDATE 1번 (처음이라 없으면 조회 후 INSERT)
+        self.assertEqual(statements.count("UPDATE"), 2)
+        self.assertEqual(statements.count("INSERT"), 1)
+        read = Message.objects.filter(room=self.room, is_read=True)
+        self.assertEqual(set(read.values_list("id", flat=True)), {m.id for m in self.incoming[:4]})
+        self.assertEqual(ChatReadState.unread_counts(self.user)[self.room.id], 1)
+
+    def test_unread_endpoint(self):
+        self.client.force_login(self.user)
+        response = self.client.get("/api/chat/unread/", HTTP_HOST="localhost")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            "rooms": {str(self.room.id): 5, str(self.other_room.id): 3},
+            "total": 8,
+        })
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class ChatPresenceTest(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="me", password="pw", nickname="me")
+        self.partner = User.objects.create_user(username="you", password="pw", nickname="you")
+        self.room, _ = ChatRoom.get_or_create_room(self.user, self.partner)
+
+    async def connect(self, user):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f"/ws/chat/{self.room.id}/")
+        communicator.scope["user"] = user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator, await communicator.receive_json_from()
+
+    def test_presence_and_typing_without_db_queries(self):
+        async def run():
+            partner, history = await self.connect(self.partner)
+            self.assertFalse(history["partner_online"])
+            me, history = await self.connect(self.user)
+            self.assertTrue(history["partner_online"])
+            self.assertEqual(await partner.receive_json_from(), {
+                "type": "user_status", "user_id": self.user.id, "is_online": True
+            })
+            # 같은 사용자가 탭을 하나 더 열어도 온라인 알림은 다시 보내지 않는다
+            second_tab, _ = await self.connect(self.user)
+            self.assertTrue(await partner.receive_nothing())
+            self.assertEqual(get_presence_backend().online_user_ids([self.user.id, self.partner.id, 0]),
+                             {self.user.id, self.partner.id})
+
+            statements = []
+            execute = CursorWrapper.execute
+
+            def recording_execute(cursor, sql, params=None):
+                statements.append(sql)
+                return execute(cursor, sql, params)
+
+            with patch.object(CursorWrapper, "execute", recording_execute):
+                # 키 입력마다 오는 입력 중 알림은 한 번만 전달
+                for _ in range(5):
+                    await me.send_json_to({"type": "typing_indicator", "is_typing": True})
+                await me.send_json_to({"type": "heartbeat"})
+                await me.send_json_to({"type": "typing_indicator", "is_typing": False})
+                self.assertEqual(await partner.receive_json_from(), {
+                    "type": "typing_indicator", "user_id": self.user.id, "is_typing": True
+                })
+                self.assertEqual((await partner.receive_json_from())["is_typing"], False)
+                self.assertTrue(await partner.receive_nothing())
+                # 입력 중/끝을 번갈아 보내도 TTL 안에서는 다시 보내지 않는다
+                for is_typing in (True, False, True, False):
+                    await me.send_json_to({"type": "typing_indicator", "is_typing": is_typing})
+                self.assertTrue(await partner.receive_nothing())
+                # 내 입력 중 알림은 나에게 돌아오지 않는다
+                self.assertTrue(await me.receive_nothing())
+
+                await second_tab.disconnect()
+                self.assertTrue(await partner.receive_nothing())
+                await me.disconnect()
+                self.assertEqual(await partner.receive_json_from(), {
+                    "type": "user_status", "user_id": self.user.id, "is_online": False
+                })
+            self.assertEqual(statements, [])
+            await partner.disconnect()
+
+        async_to_sync(run)()
+
+    def test_redis_backend_degrades_when_unavailable(self):
+        backend = RedisPresenceBackend(url="redis://127.0.0.1:1/0")
+        self.assertEqual(backend.online_user_ids([self.user.id]), set())
+        self.assertFalse(async_to_sync(backend.start_typing)(self.room.id, self.user.id))
+        self.assertFalse(async_to_sync(backend.connect)(self.user.id, "channel"))
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class ChatInboxTest(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="me", password="pw", nickname="me")
+        self.partners = [
+            User.objects.create_user(username=f"partner{i}", password="pw", nickname=f"partner{i}") for i in range(5)
+        ]
+        base = timezone.now() - timedelta(hours=1)
+        self.rooms = []
+        for i, partner in enumerate(self.partners):
+            room, _ = ChatRoom.get_or_create_room(self.user, partner)
+            Message.objects.bulk_create([
+                Message(room=room, sender=partner, content=f"{partner.nickname} {j}") for j in range(i)
+            ])
+            # 두 방씩 같은 시각이라 id로 순서가 정해지는지 확인
+            ChatRoom.objects.filter(pk=room.pk).update(updated_at=base + timedelta(minutes=i // 2))
+            self.rooms.append(room)
+        ChatReadState.mark_read(self.rooms[4].id, self.user.id, Message.objects.filter(room=self.rooms[4]).first().id)
+        ChatRoom.get_or_create_room(self.partners[0], self.partners[1])  # 내가 없는 방
+        self.client.force_login(self.user)
+
+    def test_rooms_are_listed_in_one_query_per_page(self):
+        seen = []
+        url = "/api/chat/rooms/?page_size=2"
+        while url:
+            with self.assertNumQueries(3):  # 세션 + 사용자 + 채팅방 목록
+                response = self.client.get(url, HTTP_HOST="localhost")
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            seen.extend(data["results"])
+            url = data["next"]
+
+        self.assertEqual([room["room_id"] for room in seen], [self.rooms[i].id for i in (4, 3, 2, 1, 0)])
+        by_partner = {room["partner"]["nickname"]: room for room in seen}
+        self.assertIsNone(by_partner["partner0"]["last_message"])
+        self.assertEqual(by_partner["partner3"]["last_message"]["content"], "partner3 2")
+        self.assertEqual(by_partner["partner3"]["unread_count"], 3)
+        # 첫 메시지까지 읽었으므로 4개 중 3개
+        self.assertEqual(by_partner["partner4"]["unread_count"], 3)
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/chat/rooms/?cursor=bad", HTTP_HOST="localhost")
+        # 다른 커서 페이지네이션 API와 같이 404
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {"error": "잘못된 커서입니다."})
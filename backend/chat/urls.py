@@ -6,5 +6,7 @@ urlpatterns = [
     path("room/<int:room_id>/", views.chat_room, name="room"),
     path("with/<int:user_id>/", views.chat_with, name="with"),
     path("latest/", views.latest_room, name="latest"),
+    path("unread/", views.unread_counts, name="unread"),
+    path("rooms/", views.room_list, name="rooms"),
 
 ]
\ No newline at end of file
@@ -2,7 +2,11 @@ from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.contrib.auth import get_user_model
 from django.db.models import Q
-from .models import ChatRoom
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from movies.pagination import NewestCreatedAtCursorPagination
+from .models import ChatReadState, ChatRoom
+from .presence import get_presence_backend
 from .authentication import token_required
 
 # views.py 수정
@@ -50,6 +54,53 @@ def latest_room(request):
         "updated_at": room.updated_at.isoformat()
     })
 
+class RoomCursorPagination(NewestCreatedAtCursorPagination):
+    """채팅방 목록용 (updated_at, id) 키셋 커서 페이지네이션 (최근 대화 순)"""
+
+    ordering_field = 'updated_at'
+
+
+@token_required
+def room_list(request):
+    """
+    내 채팅방 목록 (최근 대화 순, (updated_at, id) 키셋 페이지네이션)
+
+    상대 정보, 마지막 메시지, 안 읽은 메시지 수를 페이지당 쿼리 한 번으로 가져온다.
+    """
+    paginator = RoomCursorPagination()
+    try:
+        page = paginator.paginate_queryset(ChatRoom.inbox(request.user), Request(request))
+    except NotFound as exc:
+        return JsonResponse({"error": exc.detail}, status=exc.status_code)
+
+    partners = [room.participant2 if room.participant1_id == request.user.id else room.participant1 for room in page]
+    # 상대 접속 상태는 Redis 파이프라인 한 번으로 조회
+    online_ids = get_presence_backend().online_user_ids(partner.id for partner in partners)
+
+    results = []
+    for room, partner in zip(page, partners):
+        results.append({
+            "room_id": room.id,
+            "partner": {
+                "id": partner.id,
+                "username": partner.username,
+                "nickname": partner.nickname,
+                "profile_image": partner.profile_image.url if partner.profile_image else None,
+                "is_online": partner.id in online_ids
+            },
+            "last_message": {
+                "id": room.last_message_id,
+                "content": room.last_message_content,
+                "sender_id": room.last_message_sender_id,
+                "timestamp": room.last_message_timestamp.isoformat()
+            } if room.last_message_id is not None else None,
+            "unread_count": room.unread_count,
+            "created_at": room.created_at.isoformat(),
+            "updated_at": room.updated_at.isoformat()
+        })
+
+    return JsonResponse({"next": paginator.get_next_link(), "results": results})
+
 @token_required
 def chat_room(request, room_id):
     # 채팅방 조회
@@ -86,4 +137,13 @@ def current_user(request):
         "username": user.username,
         "nickname": getattr(user, 'nickname', user.username),
         "profile_image": user.profile_image.url if getattr(user, 'profile_image', None) else None,
-    })
\ No newline at end of file
+    })
+
+@token_required
+def unread_counts(request):
+    """채팅방별 안 읽은 메시지 수 (쿼리 한 번)"""
+    counts = ChatReadState.unread_counts(request.user)
+    return JsonResponse({
+        "rooms": {str(room_id): count for room_id, count in counts.items()},
+        "total": sum(counts.values()),
+    })
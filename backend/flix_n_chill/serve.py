@@ -0,0 +1,22 @@
+"""
+daphne 실행 진입점 (deploy/supervisord.conf, deploy/loadtest.py에서 사용)
+
+    python -m flix_n_chill.serve --fd 0 flix_n_chill.asgi:application
+
+daphne 4.x 패키지는 --fd 옵션이 쓰는 Twisted "fd" 엔드포인트 플러그인을 daphne/twisted/plugins에 두는데,
+Twisted는 그 경로에서 플러그인을 찾지 않아 "Unknown endpoint type: 'fd'"로 실패한다.
+플러그인 경로를 추가한 뒤 daphne CLI를 그대로 실행한다.
+"""
+import os
+
+import daphne
+import twisted.plugins
+from daphne.cli import CommandLineInterface
+
+DAPHNE_PLUGINS = os.path.join(os.path.dirname(daphne.__file__), 'twisted', 'plugins')
+if DAPHNE_PLUGINS not in twisted.plugins.__path__:
+    twisted.plugins.__path__.append(DAPHNE_PLUGINS)
+
+
+if __name__ == '__main__':
+    CommandLineInterface.entrypoint()
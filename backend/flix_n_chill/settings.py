@@ -16,6 +16,7 @@ from decouple import config
 
 # environment
 TMDB_API_KEY = config('TMDB_API_KEY', default='test-key-for-development')
+TMDB_API_BASE_URL = config('TMDB_API_BASE_URL', default='https://api.themoviedb.org/3')
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -32,6 +33,17 @@ DEBUG = config('DJANGO_DEBUG', default=True, cast=bool)
 
 ALLOWED_HOSTS = ['flix-n-chill.com', 'www.flix-n-chill.com', '127.0.0.1', 'localhost', '0.0.0.0']
 
+# 채팅 메시지 write-behind 저장 (브로드캐스트 먼저, DB 저장은 배치로)
+# 켜려면 CHAT_WORKER_ID(0~63)가 필요하고, 프로세스가 여럿이면 프로세스마다 다르게 준다 (겹치면 메시지 id 충돌)
+CHAT_WRITE_BEHIND = config('CHAT_WRITE_BEHIND', default=False, cast=bool)
+CHAT_WORKER_ID = config('CHAT_WORKER_ID', default=None, cast=lambda value: None if value in (None, '') else int(value))
+# 종료 중 저장하지 못했거나 id가 겹친 메시지를 남기는 디렉터리 (manage.py replay_chat_messages로 다시 저장)
+CHAT_SPILL_DIR = config('CHAT_SPILL_DIR', default=str(BASE_DIR / 'chat_spill'))
+
+# 접속 상태 / 입력 중 표시 저장소 (chat.presence). 비워 두면 채널 레이어가 Redis일 때 같은 Redis 사용
+CHAT_PRESENCE_BACKEND = config('CHAT_PRESENCE_BACKEND', default='')
+CHAT_PRESENCE_REDIS_URL = config('CHAT_PRESENCE_REDIS_URL', default='')
+
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
@@ -41,6 +53,24 @@ CHANNEL_LAYERS = {
     },
 }
 
+# 캐시 (토큰 → 사용자, 장르 선호도, 메모리 색인 버전 번호)
+# 워커 프로세스가 여럿이면 CACHE_REDIS_URL로 모든 프로세스가 같은 Redis를 보게 해야 한다 (deploy는 Dockerfile에서 지정).
+# 비워 두면 프로세스 내 LocMemCache라 한 프로세스(runserver, 테스트)에서만 무효화가 맞다.
+CACHE_REDIS_URL = config('CACHE_REDIS_URL', default='')
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -73,7 +103,7 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20,
     # Authentication
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'accounts.authentication.CachedTokenAuthentication',
     ],
     # permission
     'DEFAULT_PERMISSION_CLASSES': [
@@ -81,6 +111,17 @@ REST_FRAMEWORK = {
     ],
 }
 
+# 토큰 → 사용자 캐시 (accounts.authentication.token_user_cache)
+# 공유 캐시(Redis)에 두어야 로그아웃이 모든 프로세스에 바로 반영된다. 프로세스 내 캐시(LocMemCache)면 TTL을 LOCAL_TTL로 줄인다
+TOKEN_USER_CACHE_ALIAS = config('TOKEN_USER_CACHE_ALIAS', default='default')
+TOKEN_USER_CACHE_TTL = config('TOKEN_USER_CACHE_TTL', default=300, cast=int)
+TOKEN_USER_CACHE_LOCAL_TTL = config('TOKEN_USER_CACHE_LOCAL_TTL', default=5, cast=int)
+
+# 홈 타임라인 (accounts.timeline): 사용자당 보관 항목 수, 팔로워가 이보다 많으면 쓸 때 넣지 않고 읽을 때 가져온다
+# 보관 개수를 넘는 항목은 팔로우할 때, fan-out 뒤 (보관 개수의 10%를 더 넘은 타임라인), `manage.py rebuild_timelines --trim-only`에서 정리한다
+TIMELINE_MAX_ENTRIES = config('TIMELINE_MAX_ENTRIES', default=500, cast=int)
+TIMELINE_FANOUT_LIMIT = config('TIMELINE_FANOUT_LIMIT', default=1000, cast=int)
+
 REST_AUTH = {
     'USER_DETAILS_SERIALIZER': 'accounts.serializers.UserProfileSerializer',
     'REGISTER_SERIALIZER': 'accounts.serializers.CustomRegisterSerializer',
@@ -152,10 +193,16 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # 테스트 DB도 파일로 만든다 (메모리 DB는 스레드 사이 쓰기 경합 시 기다리지 않고 바로 잠금 오류)
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
 
+# 영화 검색 백엔드 (dotted path, 비워두면 SQLite는 FTS5 / 그 외 DB는 icontains)
+MOVIE_SEARCH_BACKEND = config('MOVIE_SEARCH_BACKEND', default='')
+
+
 # Custom User Model
 
 AUTH_USER_MODEL = "accounts.user"
@@ -0,0 +1,80 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, FloatField, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from accounts.models import Follow, MovieLike, ReviewLike, User
+from .models import Movie, Review, Comment
+
+
+def _aggregate(queryset, fk_name, aggregate, output_field):
+    """부모 행(OuterRef('pk'))별 집계값을 돌려주는 상관 서브쿼리 (없으면 0)"""
+    subquery = (
+        queryset
+        .filter(**{fk_name: OuterRef('pk')})
+        .order_by()
+        .values(fk_name)
+        .annotate(value=aggregate)
+        .values('value')
+    )
+    return Coalesce(Subquery(subquery, output_field=output_field), Value(0), output_field=output_field)
+
+
+def insert_once(model, **fields):
+    """
+    fields로 행을 INSERT하고 새로 만들었으면 True, 유니크 제약에 걸려 이미 있으면 False
+
+    좋아요/팔로우 토글용. get_or_create(SELECT 후 INSERT)와 달리 INSERT부터 하므로
+    SQLite에서는 트랜잭션의 첫 문장부터 쓰기 잠금을 기다리고 (읽기 잠금을 쓰기 잠금으로 올리다가 나는
+    'database is locked'가 없다), 다른 DB에서는 동시에 들어온 요청을 유니크 인덱스가 하나로 정리한다.
+    호출하는 쪽은 True일 때만 집계 컬럼을 올리면 중복 요청이 와도 카운터가 맞는다.
+    """
+    try:
+        with transaction.atomic():
+            model.objects.create(**fields)
+    except IntegrityError:
+        return False
+    return True
+
+
+def counter_expressions():
+    """모델별 {집계 컬럼: 실제 값을 계산하는 식}"""
+    return {
+        Movie: {
+            'review_count': _aggregate(Review.objects.all(), 'movie', Count('id'), IntegerField()),
+            'rating_sum': _aggregate(Review.objects.all(), 'movie', Sum('rating'), FloatField()),
+            'like_count': _aggregate(MovieLike.objects.all(), 'movie', Count('id'), IntegerField()),
+        },
+        Review: {
+            'like_count': _aggregate(ReviewLike.objects.all(), 'review', Count('id'), IntegerField()),
+        },
+        Comment: {
+            'like_count': _aggregate(Comment.likes.through.objects.all(), 'comment', Count('id'), IntegerField()),
+        },
+        User: {
+            'followers_count': _aggregate(Follow.objects.all(), 'following', Count('id'), IntegerField()),
+            'following_count': _aggregate(Follow.objects.all(), 'follower', Count('id'), IntegerField()),
+        },
+    }
+
+
+def reconcile_counters(dry_run=False):
+    """
+    집계 컬럼을 실제 행 수와 맞춘다
+
+    Returns:
+        {'Movie.review_count': 어긋난 행 수, ...}
+    """
+    drift = {}
+    for model, expressions in counter_expressions().items():
+        for field, expression in expressions.items():
+            drifted = (
+                model.objects
+                .annotate(actual=expression)
+                .exclude(**{field: F('actual')})
+                .values_list('pk', flat=True)
+            )
+            drifted_ids = list(drifted)
+            drift[f'{model.__name__}.{field}'] = len(drifted_ids)
+            if drifted_ids and not dry_run:
+                model.objects.filter(pk__in=drifted_ids).update(**{field: expression})
+    return drift
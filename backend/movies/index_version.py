@@ -0,0 +1,75 @@
+import time
+
+from django.core.cache import cache
+
+
+# 변경 기록 대신 남기는 "전체 재생성" 표시
+FULL_REBUILD = '*'
+
+
+class SharedVersion:
+    """
+    프로세스 내 색인(장르 행렬, 선호도 행렬, 제목 자동완성)의 버전 번호와 버전별 변경 id 기록
+
+    번호와 기록은 공유 캐시(배포 환경은 Redis)에 있어서, 다른 워커나 collect_movies 같은 명령이
+    bump()한 변경도 각 프로세스의 색인이 읽을 때 changes()로 알아낸다.
+    색인은 자기가 반영한 번호와 current()가 다르면 그 사이에 바뀐 id만 다시 읽고,
+    기록이 빠졌거나 너무 많이 밀렸으면 전체를 다시 만든다.
+    """
+
+    # 이보다 많이 밀렸으면 기록을 하나씩 적용하지 않고 전체 재생성
+    max_replay = 100
+    change_log_timeout = 60 * 60
+
+    def __init__(self, name):
+        self.version_key = f'{name}:version'
+        self.change_key_prefix = f'{name}:changes:'
+
+    def _initialize(self):
+        # 캐시가 비워져도 번호가 예전 값으로 돌아가지 않도록 현재 시각(ms)에서 시작
+        cache.add(self.version_key, int(time.time() * 1000), None)
+
+    def current(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            self._initialize()
+            version = cache.get(self.version_key)
+        return version
+
+    def bump(self, ids=None):
+        """
+        번호를 올리고 바뀐 id를 기록 (ids가 None이면 모든 프로세스가 전체를 다시 만든다)
+
+        트랜잭션 안에서 바꿨으면 커밋 후에 불러야 다른 프로세스가 커밋 전 데이터를 읽지 않는다.
+        """
+        try:
+            version = cache.incr(self.version_key)
+        except ValueError:
+            self._initialize()
+            version = cache.incr(self.version_key)
+        change = FULL_REBUILD if ids is None else sorted(set(ids))
+        cache.set(f'{self.change_key_prefix}{version}', change, self.change_log_timeout)
+        return version
+
+    def changes(self, since, until):
+        """
+        since 다음 버전부터 until까지 바뀐 id 집합
+
+        Returns:
+            set - 기록이 모두 남아 있으면 / None - 전체를 다시 만들어야 하면
+        """
+        if since is None or not 0 <= until - since <= self.max_replay:
+            return None
+
+        keys = [f'{self.change_key_prefix}{version}' for version in range(since + 1, until + 1)]
+        entries = cache.get_many(keys)
+        if len(entries) != len(keys):
+            # bump() 도중이거나 기록이 만료/유실됨
+            return None
+
+        ids = set()
+        for change in entries.values():
+            if change == FULL_REBUILD:
+                return None
+            ids.update(change)
+        return ids
@@ -0,0 +1,339 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .models import Movie, Genre, MovieProvider
+from .recommendation import movie_genre_matrix
+from .search import get_search_backend
+from .serializers import MovieCreateSerializer
+from .suggest import title_suggest_index
+
+
+PROVIDER_OPTION_TYPES = ("buy", "flatrate", "rent")
+
+
+class RateLimiter:
+    """
+    토큰 버킷 방식 요청 속도 제한 (스레드 간 공유)
+
+    초당 rate개씩 토큰이 차고 최대 burst개까지 쌓인다. 토큰이 없으면 생길 때까지 기다린다.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or max(1, int(rate)))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class TMDBClient:
+    """
+    커넥션 풀을 재사용하는 TMDB API 클라이언트
+
+    429/5xx 응답과 연결 오류는 urllib3 Retry로 지수 백오프 재시도(Retry-After 헤더 우선)하고,
+    모든 요청은 RateLimiter를 거친다.
+    """
+
+    def __init__(self, api_key=None, base_url=None, rate=20, pool_size=10, retries=5, backoff_factor=0.5, timeout=10):
+        self.base_url = (base_url or settings.TMDB_API_BASE_URL).rstrip("/")
+        self.timeout = timeout
+        self.rate_limiter = RateLimiter(rate)
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET",),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "accept": "application/json",
+            "Authorization": f"Bearer {api_key or settings.TMDB_API_KEY}",
+        })
+
+    def get(self, path, **params):
+        """JSON 응답을 돌려주고, 재시도 후에도 실패하면 None"""
+        self.rate_limiter.acquire()
+        try:
+            response = self.session.get(f"{self.base_url}{path}", params=params, timeout=self.timeout)
+        except requests.RequestException as e:
+            print(f"❌ TMDB 요청 실패 {path}: {e}")
+            return None
+        if response.status_code != 200:
+            print(f"❌ TMDB 응답 오류 {path}: {response.status_code}")
+            return None
+        return response.json()
+
+    def top_rated(self, page):
+        return self.get("/movie/top_rated", language="ko-KR", page=page)
+
+    def movie_detail(self, tmdb_id):
+        return self.get(f"/movie/{tmdb_id}", language="ko-KR")
+
+    def watch_providers(self, tmdb_id):
+        return self.get(f"/movie/{tmdb_id}/watch/providers")
+
+    def close(self):
+        self.session.close()
+
+
+class IngestionCheckpoint:
+    """
+    완료한 페이지 번호를 JSON 파일에 기록해서 중단된 수집을 이어서 할 수 있게 한다
+
+    path가 None이면 기록하지 않는다. 파일은 임시 파일에 쓴 뒤 교체하므로 쓰는 도중 죽어도 깨지지 않는다.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.completed_pages = set()
+        self.saved = 0
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.completed_pages = set(data.get("completed_pages", []))
+            self.saved = data.get("saved", 0)
+
+    def mark_page(self, page, saved):
+        self.completed_pages.add(page)
+        self.saved += saved
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"completed_pages": sorted(self.completed_pages), "saved": self.saved}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        self.completed_pages = set()
+        self.saved = 0
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class TMDBIngestor:
+    """
+    TMDB top rated 영화 수집기 (movie_collect / collect_movies 커맨드에서 사용)
+
+    페이지 단위로 처리한다. 목록에서 이미 있는 영화를 한 번에 거르고, 새 영화의 상세/제공처 요청은
+    스레드 풀에서 동시에 보낸 뒤, 영화와 장르/제공처 연결을 bulk_create로 한 트랜잭션에 저장한다.
+    페이지가 끝날 때마다 체크포인트를 남긴다.
+
+    upsert=True이면 이미 있는 영화도 건너뛰지 않고 평점(vote_average)과 제공처가 바뀐 것만 갱신한다.
+    """
+
+    def __init__(self, client=None, workers=8, checkpoint=None, upsert=False):
+        self.client = client or TMDBClient(pool_size=workers)
+        self.workers = workers
+        self.checkpoint = checkpoint or IngestionCheckpoint()
+        self.upsert = upsert
+        self.errors = []
+        self.genre_pks = {}
+        self.provider_pks = {}
+
+    def load_lookups(self):
+        """장르/제공처 tmdb_id -> pk 맵을 실행마다 한 번만 읽는다"""
+        self.genre_pks = dict(Genre.objects.values_list("tmdb_id", "pk"))
+        self.provider_pks = dict(MovieProvider.objects.values_list("tmdb_id", "pk"))
+
+    def run(self, pages=range(1, 26)):
+        """
+        pages를 순서대로 수집하고 결과 통계를 돌려준다
+
+        모든 영화를 가져온 페이지만 완료로 기록하므로, 실패한 페이지는 다시 실행하면 이어서 수집된다.
+        """
+        self.load_lookups()
+        stats = {"saved": 0, "updated": 0, "skipped": 0, "failed": 0, "pages": 0}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for page in pages:
+                if page in self.checkpoint.completed_pages:
+                    continue
+                saved, updated, skipped, failed = self.ingest_page(page, executor)
+                stats["saved"] += saved
+                stats["updated"] += updated
+                stats["skipped"] += skipped
+                stats["failed"] += failed
+                if failed == 0:
+                    self.checkpoint.mark_page(page, saved)
+                    stats["pages"] += 1
+                print(f"📥 {page}페이지: 저장 {saved}, 갱신 {updated}, 기존 {skipped}, 실패 {failed}")
+        return stats
+
+    def ingest_page(self, page, executor):
+        data = self.client.top_rated(page)
+        if data is None:
+            self.errors.append({"page": page, "error": "목록 요청 실패"})
+            return 0, 0, 0, 1
+
+        listed = {movie["id"]: movie for movie in data.get("results", [])}
+        existing = {
+            tmdb_id: (pk, vote_average)
+            for tmdb_id, pk, vote_average in Movie.objects.filter(
+                tmdb_id__in=listed
+            ).values_list("tmdb_id", "pk", "vote_average")
+        }
+        new_ids = [tmdb_id for tmdb_id in listed if tmdb_id not in existing]
+
+        new_movies = executor.map(self.fetch_movie, new_ids)
+        # 기존 영화는 목록 응답에 평점이 있으므로 제공처만 요청
+        existing_providers = executor.map(self.client.watch_providers, existing) if self.upsert else []
+
+        fetched = [result for result in new_movies if result is not None]
+        saved = self.save_movies(fetched)
+        updated = 0
+        if self.upsert:
+            changes = [
+                (pk, listed[tmdb_id].get("vote_average", vote_average), providers)
+                for (tmdb_id, (pk, vote_average)), providers in zip(existing.items(), existing_providers)
+            ]
+            updated = self.update_movies(changes, current_votes=dict(existing.values()))
+        # 요청 실패 + 검증 실패
+        return saved, updated, len(existing) - updated, len(new_ids) - saved
+
+    def fetch_movie(self, tmdb_id):
+        """상세 + 제공처 요청 (워커 스레드에서 실행, DB 접근 없음)"""
+        detail = self.client.movie_detail(tmdb_id)
+        if detail is None:
+            self.errors.append({"tmdb_id": tmdb_id, "error": "상세 요청 실패"})
+            return None
+        providers = self.client.watch_providers(tmdb_id) or {}
+        return tmdb_id, detail, providers
+
+    @staticmethod
+    def movie_data(tmdb_id, detail):
+        return {
+            "tmdb_id": tmdb_id,
+            "title": detail.get("title", ""),
+            "original_title": detail.get("original_title", ""),
+            "overview": detail.get("overview", ""),
+            "adult": detail.get("adult", False),
+            "budget": detail.get("budget", 0),
+            "origin_country": (detail.get("origin_country") or ["UNKNOWN"])[0],
+            "runtime": detail.get("runtime", 0),
+            "release_date": detail.get("release_date") or "1900-01-01",
+            "tagline": detail.get("tagline", ""),
+            "vote_average": detail.get("vote_average", 0.0),
+            "poster_path": detail.get("poster_path", ""),
+        }
+
+    @staticmethod
+    def provider_ids(providers):
+        region = (providers.get("results") or {}).get("KR", {})
+        return {
+            provider["provider_id"]
+            for option_type in PROVIDER_OPTION_TYPES
+            for provider in region.get(option_type, [])
+        }
+
+    def _provider_pk_set(self, providers):
+        return {self.provider_pks[tmdb_id] for tmdb_id in self.provider_ids(providers) if tmdb_id in self.provider_pks}
+
+    def save_movies(self, fetched):
+        """검증한 영화와 장르/제공처 연결을 bulk_create로 저장하고 저장한 수를 돌려준다"""
+        movies, relations = [], []
+        for tmdb_id, detail, providers in fetched:
+            serializer = MovieCreateSerializer(data=self.movie_data(tmdb_id, detail))
+            if not serializer.is_valid():
+                print(serializer.errors)
+                self.errors.append({"tmdb_id": tmdb_id, "error": serializer.errors})
+                continue
+            movies.append(Movie(**serializer.validated_data))
+            relations.append((
+                {self.genre_pks[genre["id"]] for genre in detail.get("genres", []) if genre["id"] in self.genre_pks},
+                self._provider_pk_set(providers),
+            ))
+        if not movies:
+            return 0
+
+        GenreThrough = Movie.genres.through
+        ProviderThrough = Movie.providers.through
+        with transaction.atomic():
+            # bulk_create는 post_save / m2m_changed 시그널을 보내지 않으므로 색인은 아래에서 직접 갱신
+            Movie.objects.bulk_create(movies)
+            GenreThrough.objects.bulk_create([
+                GenreThrough(movie_id=movie.pk, genre_id=genre_pk)
+                for movie, (genre_pks, _) in zip(movies, relations)
+                for genre_pk in genre_pks
+            ], ignore_conflicts=True)
+            ProviderThrough.objects.bulk_create([
+                ProviderThrough(movie_id=movie.pk, movieprovider_id=provider_pk)
+                for movie, (_, provider_pks) in zip(movies, relations)
+                for provider_pk in provider_pks
+            ], ignore_conflicts=True)
+
+            get_search_backend().index_movies(movies)
+            movie_ids = [movie.pk for movie in movies]
+            transaction.on_commit(lambda: movie_genre_matrix.refresh_movies(movie_ids))
+            transaction.on_commit(lambda: title_suggest_index.update_movies(movie_ids))
+        return len(movies)
+
+    def update_movies(self, changes, current_votes):
+        """
+        기존 영화의 평점/제공처 중 바뀐 것만 반영하고 갱신한 영화 수를 돌려준다
+
+        changes: [(movie_pk, vote_average, 제공처 응답 또는 None)]
+        제공처 요청이 실패한 영화(None)는 제공처를 건드리지 않는다.
+        """
+        ProviderThrough = Movie.providers.through
+        movie_pks = [pk for pk, _, _ in changes]
+        current_providers = {}
+        for movie_id, provider_pk in ProviderThrough.objects.filter(
+            movie_id__in=movie_pks
+        ).values_list("movie_id", "movieprovider_id"):
+            current_providers.setdefault(movie_id, set()).add(provider_pk)
+
+        vote_updates, added_rows, removed = [], [], Q(pk__in=[])
+        changed = set()
+        for pk, vote_average, providers in changes:
+            if vote_average != current_votes[pk]:
+                vote_updates.append(Movie(pk=pk, vote_average=vote_average))
+                changed.add(pk)
+            if providers is None:
+                continue
+            wanted = self._provider_pk_set(providers)
+            current = current_providers.get(pk, set())
+            if wanted != current:
+                added_rows.extend(ProviderThrough(movie_id=pk, movieprovider_id=provider_pk) for provider_pk in wanted - current)
+                if current - wanted:
+                    removed |= Q(movie_id=pk, movieprovider_id__in=current - wanted)
+                changed.add(pk)
+        if not changed:
+            return 0
+
+        with transaction.atomic():
+            Movie.objects.bulk_update(vote_updates, ["vote_average"])
+            ProviderThrough.objects.bulk_create(added_rows, ignore_conflicts=True)
+            ProviderThrough.objects.filter(removed).delete()
+            # 자동완성 응답에 평점이 들어 있으므로 갱신
+            changed_ids = list(changed)
+            transaction.on_commit(lambda: title_suggest_index.update_movies(changed_ids))
+        return len(changed)
@@ -0,0 +1,68 @@
+import statistics
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from movies.recommendation import UserPreferenceMatrix, top_k_rows
+from movies.views import calculate_user_similarity
+
+
+class Command(BaseCommand):
+    help = "가상의 사용자 선호도로 유사 사용자 검색(행렬 방식 vs 사용자별 반복)을 측정합니다. DB는 사용하지 않습니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, nargs='+', default=[10_000, 100_000],
+                            help="가상 사용자 수 (기본 10000 100000)")
+        parser.add_argument('--genres', type=int, default=19, help="장르 수 (기본 19)")
+        parser.add_argument('--density', type=float, default=0.4,
+                            help="사용자가 평가한 장르 비율 (기본 0.4)")
+        parser.add_argument('--queries', type=int, default=20, help="측정할 검색 횟수 (기본 20)")
+        parser.add_argument('--loop-sample', type=int, default=5_000,
+                            help="반복 방식은 이 수만큼만 실행하고 전체 사용자 수로 환산 (기본 5000)")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        genres = [f"genre_{i}" for i in range(options['genres'])]
+
+        for user_count in options['users']:
+            values = rng.choice(np.arange(0.5, 5.5, 0.5), size=(user_count, len(genres)))
+            mask = rng.random((user_count, len(genres))) < options['density']
+            user_ids = np.arange(1, user_count + 1)
+
+            started = time.perf_counter()
+            matrix = UserPreferenceMatrix.from_arrays(user_ids, genres, values, mask)
+            build_ms = (time.perf_counter() - started) * 1000
+
+            targets = rng.integers(1, user_count + 1, size=options['queries'])
+            matrix_ms = []
+            for target in targets:
+                preferences = matrix.preferences_of(int(target))
+                started = time.perf_counter()
+                ids, scores = matrix.similarity(preferences)
+                top_k_rows(scores, (scores > 0.5) & (ids != target), 3)
+                matrix_ms.append((time.perf_counter() - started) * 1000)
+
+            # 기존 방식: 사용자마다 dict를 만들고 calculate_user_similarity 호출
+            sample = min(options['loop_sample'], user_count)
+            preferences = matrix.preferences_of(int(targets[0]))
+            others = [matrix.preferences_of(int(user_id)) for user_id in user_ids[:sample]]
+            started = time.perf_counter()
+            for other in others:
+                if other:
+                    calculate_user_similarity(preferences, other)
+            loop_ms = (time.perf_counter() - started) * 1000 * user_count / sample
+
+            # 행렬 방식 결과가 기존 계산과 같은지 표본으로 확인
+            ids, scores = matrix.similarity(preferences)
+            for row in range(min(sample, 1000)):
+                if others[row]:
+                    expected = calculate_user_similarity(preferences, others[row])
+                    assert abs(scores[row] - expected) < 1e-9, (row, scores[row], expected)
+
+            self.stdout.write(
+                f"users={user_count:>7}  build={build_ms:8.1f}ms  "
+                f"matrix p50={statistics.median(matrix_ms):7.2f}ms max={max(matrix_ms):7.2f}ms  "
+                f"loop≈{loop_ms:9.1f}ms (DB 조회 제외)"
+            )
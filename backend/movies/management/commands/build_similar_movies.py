@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from movies.models import SimilarMovie
+from movies.recommendation import MovieGenreMatrix, SIMILAR_MOVIES_TOP_N
+
+
+class Command(BaseCommand):
+    help = "영화별 유사 영화 상위 N개 테이블(SimilarMovie)을 다시 만듭니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-n', type=int, default=SIMILAR_MOVIES_TOP_N,
+                            help=f"영화당 저장할 유사 영화 수 (기본 {SIMILAR_MOVIES_TOP_N})")
+        parser.add_argument('--block-size', type=int, default=1024,
+                            help="한 번에 곱할 영화 수 (기본 1024)")
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help="bulk_create 배치 크기 (기본 5000)")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        # 서버 프로세스의 행렬은 건드리지 않고 이 명령에서 DB를 새로 읽어 만든다
+        movie_genre_matrix = MovieGenreMatrix()
+
+        entries = []
+        movie_count = 0
+        with transaction.atomic():
+            SimilarMovie.objects.all().delete()
+            for movie_id, neighbors in movie_genre_matrix.iter_similar_movies(
+                options['top_n'], block_size=options['block_size']
+            ):
+                movie_count += 1
+                entries.extend(
+                    SimilarMovie(
+                        movie_id=movie_id,
+                        similar_movie_id=similar_movie_id,
+                        rank=rank,
+                        similarity_score=score,
+                    )
+                    for rank, (similar_movie_id, score) in enumerate(neighbors)
+                )
+                if len(entries) >= options['batch_size']:
+                    SimilarMovie.objects.bulk_create(entries)
+                    entries = []
+            SimilarMovie.objects.bulk_create(entries)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{movie_count}편의 유사 영화 테이블 생성 완료 ({elapsed:.2f}s)"
+        ))
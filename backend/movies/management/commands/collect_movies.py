@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from movies.ingestion import TMDBClient, TMDBIngestor, IngestionCheckpoint
+
+
+class Command(BaseCommand):
+    help = "TMDB top rated 영화를 동시 요청으로 수집합니다. 체크포인트가 있으면 이어서 수집합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-page', type=int, default=1, help="시작 페이지 (기본 1)")
+        parser.add_argument('--end-page', type=int, default=25, help="마지막 페이지 (기본 25)")
+        parser.add_argument('--workers', type=int, default=8, help="동시 요청 수 (기본 8)")
+        parser.add_argument('--rate', type=float, default=20,
+                            help="초당 최대 요청 수, 0이면 제한 없음 (기본 20)")
+        parser.add_argument('--retries', type=int, default=5, help="요청당 재시도 횟수 (기본 5)")
+        parser.add_argument('--checkpoint', default='tmdb_ingest_checkpoint.json',
+                            help="체크포인트 파일 경로 (빈 값이면 기록하지 않음)")
+        parser.add_argument('--upsert', action='store_true',
+                            help="이미 있는 영화도 평점/제공처가 바뀌었으면 갱신")
+        parser.add_argument('--reset', action='store_true', help="체크포인트를 지우고 처음부터 수집")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        checkpoint = IngestionCheckpoint(options['checkpoint'] or None)
+        if options['reset']:
+            checkpoint.clear()
+        elif checkpoint.completed_pages:
+            self.stdout.write(f"체크포인트에서 이어서 수집: 완료 {len(checkpoint.completed_pages)}페이지")
+
+        client = TMDBClient(rate=options['rate'], pool_size=options['workers'], retries=options['retries'])
+        ingestor = TMDBIngestor(
+            client=client, workers=options['workers'], checkpoint=checkpoint, upsert=options['upsert']
+        )
+        try:
+            stats = ingestor.run(range(options['start_page'], options['end_page'] + 1))
+        finally:
+            client.close()
+
+        elapsed = time.perf_counter() - started
+        message = (
+            f"저장 {stats['saved']}편, 갱신 {stats['updated']}편, 기존 {stats['skipped']}편, 실패 {stats['failed']}건, "
+            f"완료 {stats['pages']}페이지 ({elapsed:.2f}s)"
+        )
+        if stats['failed']:
+            self.stdout.write(self.style.WARNING(f"{message} - 다시 실행하면 실패한 페이지부터 이어서 수집합니다."))
+        else:
+            # 전부 끝났으면 다음 실행은 처음부터 (새로 순위에 오른 영화 수집)
+            checkpoint.clear()
+            self.stdout.write(self.style.SUCCESS(message))
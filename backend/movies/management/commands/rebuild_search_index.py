@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from movies.search import get_search_backend
+from movies.suggest import title_suggest_index
+
+
+class Command(BaseCommand):
+    help = "영화 검색 색인을 처음부터 다시 만들고, 제목 자동완성 색인도 다시 만들게 합니다."
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        backend.rebuild()
+        # 서버 프로세스들의 제목 자동완성 색인도 다음 조회 때 다시 만든다
+        title_suggest_index.invalidate()
+        self.stdout.write(self.style.SUCCESS(f"{type(backend).__name__} 색인 재생성 완료"))
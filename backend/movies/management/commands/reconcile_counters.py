@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from movies.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = "영화/리뷰/댓글/사용자의 집계 컬럼(review_count, rating_sum, like_count, followers_count, following_count)을 실제 값으로 보정합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="보정하지 않고 어긋난 행 수만 출력")
+
+    def handle(self, *args, **options):
+        drift = reconcile_counters(dry_run=options['dry_run'])
+        for name, count in drift.items():
+            self.stdout.write(f"{name}: {count}개 행 {'불일치' if options['dry_run'] else '보정'}")
+        total = sum(drift.values())
+        if total == 0:
+            self.stdout.write(self.style.SUCCESS("모든 집계 컬럼이 일치합니다."))
@@ -0,0 +1,74 @@
+# Generated by Django 4.2.21 on 2026-10-18 11:39
+
+from django.db import migrations, models
+from django.db.models import Count, FloatField, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def _aggregate(queryset, fk_name, aggregate, output_field):
+    subquery = (
+        queryset
+        .filter(**{fk_name: OuterRef('pk')})
+        .order_by()
+        .values(fk_name)
+        .annotate(value=aggregate)
+        .values('value')
+    )
+    return Coalesce(Subquery(subquery, output_field=output_field), Value(0), output_field=output_field)
+
+
+def fill_counters(apps, schema_editor):
+    Movie = apps.get_model('movies', 'Movie')
+    Review = apps.get_model('movies', 'Review')
+    Comment = apps.get_model('movies', 'Comment')
+    MovieLike = apps.get_model('accounts', 'MovieLike')
+    ReviewLike = apps.get_model('accounts', 'ReviewLike')
+
+    Movie.objects.update(
+        review_count=_aggregate(Review.objects.all(), 'movie', Count('id'), IntegerField()),
+        rating_sum=_aggregate(Review.objects.all(), 'movie', Sum('rating'), FloatField()),
+        like_count=_aggregate(MovieLike.objects.all(), 'movie', Count('id'), IntegerField()),
+    )
+    Review.objects.update(
+        like_count=_aggregate(ReviewLike.objects.all(), 'review', Count('id'), IntegerField()),
+    )
+    Comment.objects.update(
+        like_count=_aggregate(Comment.likes.through.objects.all(), 'comment', Count('id'), IntegerField()),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0002_similarmovie'),
+        ('accounts', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='rating_sum',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.21 on 2026-10-18 11:52
+
+import re
+
+from django.db import migrations
+
+
+# 마이그레이션은 작성 시점의 스키마/토큰화를 그대로 유지해야 하므로 movies.search를 가져오지 않고 복사해 둔다
+FTS_TABLE = 'movies_movie_fts'
+FTS_COLUMNS = ('title', 'original_title', 'overview', 'tagline')
+WORD_RE = re.compile(r'\w+')
+
+
+def ngrams(text, n=2):
+    tokens = []
+    for word in WORD_RE.findall((text or '').lower()):
+        if len(word) <= n:
+            tokens.append(word)
+        else:
+            tokens.extend(word[i:i + n] for i in range(len(word) - n + 1))
+    return ' '.join(tokens)
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    Movie = apps.get_model('movies', 'Movie')
+    placeholders = ', '.join(['%s'] * (len(FTS_COLUMNS) + 1))
+    rows = [
+        (movie.pk, *(ngrams(getattr(movie, column)) for column in FTS_COLUMNS))
+        for movie in Movie.objects.only('pk', *FTS_COLUMNS).iterator()
+    ]
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            f"USING fts5({', '.join(FTS_COLUMNS)}, tokenize='unicode61 remove_diacritics 0')"
+        )
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) VALUES ({placeholders})",
+            rows
+        )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0003_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
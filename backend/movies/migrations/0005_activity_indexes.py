@@ -0,0 +1,17 @@
+# Generated by Django 4.2.21 on 2026-10-18 12:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0004_movie_fts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['user', 'created_at'], name='review_user_created_idx'),
+        ),
+    ]
@@ -1,6 +1,24 @@
 from django.db import models
 
 # Create your models here.
+class MovieQuerySet(models.QuerySet):
+    def with_list_info(self, user=None):
+        """
+        MovieListSerializer가 쓰는 값(장르, 좋아요 여부)을 한 번에 가져오도록 annotate
+        (평균 평점은 review_count / rating_sum 컬럼으로 계산)
+        """
+        from accounts.models import MovieLike
+
+        queryset = self.prefetch_related('genres')
+        if user is not None and user.is_authenticated:
+            queryset = queryset.annotate(
+                liked_by_user=models.Exists(
+                    MovieLike.objects.filter(movie=models.OuterRef('pk'), user=user)
+                )
+            )
+        return queryset
+
+
 class Movie(models.Model):
     rating = models.ManyToManyField("accounts.user", through='movies.review')
 
@@ -22,6 +40,20 @@ class Movie(models.Model):
     vote_average = models.FloatField()
     poster_path = models.CharField(max_length=100)
 
+    # 리뷰/좋아요 뷰에서 F()로 함께 갱신하는 집계 컬럼 (reconcile_counters 커맨드로 보정)
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.FloatField(default=0)
+    like_count = models.PositiveIntegerField(default=0)
+
+    objects = MovieQuerySet.as_manager()
+
+    @property
+    def average_rating(self):
+        """리뷰 평균 평점 (리뷰가 없으면 None)"""
+        if not self.review_count:
+            return None
+        return round(self.rating_sum / self.review_count, 2)
+
 class Review(models.Model):
     user = models.ForeignKey("accounts.user", on_delete=models.CASCADE)
     movie = models.ForeignKey("movies.movie", on_delete=models.CASCADE)
@@ -30,12 +62,12 @@ class Review(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     unique_together = ('user', 'movie')
     updated_at = models.DateTimeField(auto_now=True)
+    like_count = models.PositiveIntegerField(default=0)  # 리뷰 좋아요 수
+
+    class Meta:
+        # 프로필 리뷰 목록 / 활동 피드: 사용자별 최신순 조회
+        indexes = [models.Index(fields=['user', 'created_at'], name='review_user_created_idx')]
 
-    @property
-    def like_count(self):
-        """리뷰 좋아요 수"""
-        return self.likes.count()
-    
     def is_liked_by_user(self, user):
         """특정 사용자가 좋아요 했는지 확인"""
         if not user.is_authenticated:
@@ -43,6 +75,12 @@ class Review(models.Model):
         return self.likes.filter(user=user).exists()
 
 
+class CommentQuerySet(models.QuerySet):
+    def with_thread_info(self):
+        """작성자와 대댓글 수(reply_count)를 함께 가져오도록 select_related / annotate"""
+        return self.select_related('user').annotate(reply_count=models.Count('replies'))
+
+
 class Comment(models.Model):
     user = models.ForeignKey("accounts.user", on_delete=models.CASCADE)
     review = models.ForeignKey("movies.review", on_delete=models.CASCADE, related_name="comments", null=True, blank=True)
@@ -50,14 +88,13 @@ class Comment(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     likes = models.ManyToManyField("accounts.user", related_name="liked_comments", blank=True)
+    like_count = models.PositiveIntegerField(default=0)
+
+    objects = CommentQuerySet.as_manager()
 
     def __str__(self):
         return f"Comment by {self.user.username} on {self.created_at.strftime('%Y-%m-%d')}"
 
-    @property
-    def like_count(self):
-        return self.likes.count()
-
 class Genre(models.Model):
     name = models.CharField(max_length=50)
     tmdb_id = models.PositiveIntegerField()
@@ -66,3 +103,15 @@ class MovieProvider(models.Model):
     name = models.CharField(max_length=50)
     tmdb_id = models.PositiveIntegerField()
     logo_path = models.CharField(max_length=100)
+
+
+class SimilarMovie(models.Model):
+    """영화별 유사 영화 상위 N개 (build_similar_movies 커맨드로 미리 계산)"""
+    movie = models.ForeignKey("movies.movie", on_delete=models.CASCADE, related_name="similar_entries")
+    similar_movie = models.ForeignKey("movies.movie", on_delete=models.CASCADE, related_name="+")
+    rank = models.PositiveSmallIntegerField()
+    similarity_score = models.FloatField()
+
+    class Meta:
+        unique_together = ('movie', 'rank')
+        ordering = ['movie', 'rank']
@@ -0,0 +1,86 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class CreatedAtCursorPagination(BasePagination):
+    """
+    (created_at, id) 키셋 커서 페이지네이션 (오래된 순, newest_first = True면 최신순)
+
+    커서는 마지막 항목의 (created_at, id)를 인코딩한 값이라 OFFSET 없이 인덱스 범위 조회로 다음 페이지를 읽는다.
+    같은 시각에 만들어진 항목이 있어도 id로 순서가 정해지므로 빠지거나 겹치지 않는다.
+    다른 시각 필드로 정렬하려면 ordering_field를 바꾼다 (예: updated_at).
+    """
+
+    page_size = 20
+    newest_first = False
+    ordering_field = 'created_at'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = '잘못된 커서입니다.'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    @staticmethod
+    def encode_cursor(created_at, pk):
+        raw = f"{created_at.isoformat()}|{pk}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            created_at, pk = base64.urlsafe_b64decode(encoded.encode()).decode().split('|')
+            return datetime.fromisoformat(created_at), int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+
+        field = self.ordering_field
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            value, pk = cursor
+            if self.newest_first:
+                queryset = queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value}, pk__lt=pk))
+            else:
+                queryset = queryset.filter(Q(**{f'{field}__gt': value}) | Q(**{field: value}, pk__gt=pk))
+
+        ordering = (f'-{field}', '-id') if self.newest_first else (field, 'id')
+        # 한 개 더 읽어서 다음 페이지가 있는지 확인
+        rows = list(queryset.order_by(*ordering)[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        self.next_cursor = self.encode_cursor(getattr(rows[-1], field), rows[-1].pk) if self.has_next else None
+        return rows
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+
+class NewestCreatedAtCursorPagination(CreatedAtCursorPagination):
+    """최신순 (created_at, id) 키셋 커서 페이지네이션"""
+
+    newest_first = True
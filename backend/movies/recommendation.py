@@ -0,0 +1,447 @@
+import threading
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Avg, Count
+
+from .index_version import SharedVersion
+from .models import Movie, Genre, Review
+
+
+# 영화별로 SimilarMovie 테이블에 저장하는 유사 영화 수
+SIMILAR_MOVIES_TOP_N = 20
+
+# 사용자 장르 선호도 캐시 유지 시간 (리뷰가 바뀌면 signals에서 바로 무효화한다)
+GENRE_PREFERENCES_CACHE_TIMEOUT = 60 * 60
+GENRE_PREFERENCES_GENERATION_KEY = 'genre_preferences:generation'
+GENRE_PREFERENCES_USER_VERSION_PREFIX = 'genre_preferences:user-version:'
+
+
+def top_k_rows(scores, mask, k):
+    """
+    점수 상위 k개 행 인덱스 (동점은 기존 코드처럼 행(id) 순서를 유지)
+
+    행렬 연산과 기존의 건별 계산은 부동소수점 오차가 1e-16 수준으로 다를 수 있어
+    소수점 12자리에서 반올림한 점수로 순위를 매긴다.
+    """
+    candidates = np.flatnonzero(mask)
+    if k <= 0 or len(candidates) == 0:
+        return candidates[:0]
+
+    candidate_scores = np.round(scores[candidates], 12)
+    if k < len(candidates):
+        # argpartition으로 k번째 점수를 찾고, 그 점수와 같은 동점 후보까지 포함해서 정렬
+        kth = np.argpartition(-candidate_scores, k - 1)[:k]
+        threshold = candidate_scores[kth].min()
+        keep = candidate_scores >= threshold
+        candidates = candidates[keep]
+        candidate_scores = candidate_scores[keep]
+
+    order = np.argsort(-candidate_scores, kind='stable')
+    return candidates[order][:k]
+
+
+class MovieGenreMatrix:
+    """
+    영화×장르 원핫 행렬 (프로세스 내 캐시)
+
+    최초 사용 시 한 번만 DB에서 만들고, 이후에는 signals(또는 수집 명령)가 refresh_movies()로 남긴
+    변경을 읽을 때마다 공유 버전 번호로 확인해서 장르가 바뀐 영화의 행만 다시 채운다.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built = False
+        self._version = SharedVersion('index:movie-genre-matrix')
+        self._synced = None                         # 행렬에 반영한 버전 번호
+        self.genres = []                            # 열 순서 (장르 이름)
+        self._genre_col = {}                        # 장르 이름 -> 열 인덱스
+        self.movie_ids = np.empty(0, dtype=np.int64)
+        self._row_of = {}                           # movie_id -> 행 인덱스
+        self._matrix = np.zeros((0, 0))             # 원핫 행렬
+        self._unit = np.zeros((0, 0))               # 행 단위 정규화 행렬
+        self._alive = np.zeros(0, dtype=bool)       # 삭제되지 않은 영화
+
+    def _build(self):
+        self.genres = list(Genre.objects.values_list('name', flat=True).distinct())
+        self._genre_col = {name: col for col, name in enumerate(self.genres)}
+
+        movie_ids = list(Movie.objects.order_by('pk').values_list('pk', flat=True))
+        self.movie_ids = np.array(movie_ids, dtype=np.int64)
+        self._row_of = {movie_id: row for row, movie_id in enumerate(movie_ids)}
+        self._matrix = np.zeros((len(movie_ids), len(self.genres)))
+        self._alive = np.ones(len(movie_ids), dtype=bool)
+
+        pairs = Movie.genres.through.objects.values_list('movie_id', 'genre__name')
+        for movie_id, genre_name in pairs:
+            row = self._row_of.get(movie_id)
+            if row is not None:
+                self._matrix[row, self._genre_col[genre_name]] = 1
+
+        self._unit = self._normalize(self._matrix)
+        self._built = True
+        print(f"🧮 영화×장르 행렬 생성: {self._matrix.shape[0]}편 × {self._matrix.shape[1]}개 장르")
+
+    @staticmethod
+    def _normalize(matrix):
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return matrix / norms
+
+    def _ensure_built(self):
+        """다른 프로세스를 포함해 마지막으로 반영한 뒤 바뀐 영화가 있으면 그 행만 (기록이 없으면 전체) 다시 계산"""
+        version = self._version.current()
+        if self._built and version != self._synced:
+            movie_ids = self._version.changes(self._synced, version)
+            if movie_ids is None:
+                self._built = False
+            else:
+                self._refresh_rows(movie_ids)
+        if not self._built:
+            self._build()
+        self._synced = version
+
+    def invalidate(self):
+        """모든 프로세스가 다음 사용 시 전체를 다시 만들도록 표시"""
+        self._version.bump()
+
+    def refresh_movies(self, movie_ids):
+        """주어진 영화들의 장르가 바뀌었다고 기록 (각 프로세스가 다음 사용 시 그 행만 다시 계산)"""
+        self._version.bump(movie_ids)
+
+    def _refresh_rows(self, movie_ids):
+        """
+        주어진 영화들의 장르 행만 다시 계산 (새 영화는 행 추가)
+        """
+        if not movie_ids:
+            return
+
+        movie_ids = set(movie_ids)
+        existing = set(Movie.objects.filter(pk__in=movie_ids).values_list('pk', flat=True))
+        new_ids = sorted(existing - set(self._row_of))
+        if new_ids:
+            start = len(self.movie_ids)
+            self.movie_ids = np.concatenate([self.movie_ids, np.array(new_ids, dtype=np.int64)])
+            self._matrix = np.vstack([self._matrix, np.zeros((len(new_ids), len(self.genres)))])
+            self._unit = np.vstack([self._unit, np.zeros((len(new_ids), len(self.genres)))])
+            self._alive = np.concatenate([self._alive, np.ones(len(new_ids), dtype=bool)])
+            for offset, movie_id in enumerate(new_ids):
+                self._row_of[movie_id] = start + offset
+
+        rows = [self._row_of[movie_id] for movie_id in movie_ids if movie_id in self._row_of]
+        self._matrix[rows] = 0
+        for movie_id in movie_ids - existing:
+            if movie_id in self._row_of:
+                self._alive[self._row_of[movie_id]] = False
+
+        pairs = Movie.genres.through.objects.filter(
+            movie_id__in=existing
+        ).values_list('movie_id', 'genre__name')
+        for movie_id, genre_name in pairs:
+            col = self._genre_col.get(genre_name)
+            if col is None:
+                # 행렬에 없는 장르가 생기면 전체 재생성
+                self._built = False
+                return
+            self._matrix[self._row_of[movie_id], col] = 1
+
+        self._unit[rows] = self._normalize(self._matrix[rows])
+
+    def score(self, user_preferences, exclude_ids=()):
+        """
+        사용자 장르 선호도와 모든 영화의 코사인 유사도를 한 번에 계산
+
+        Returns:
+            (movie_ids, scores, candidate_mask) - 장르가 없는 영화와 제외 영화는 mask에서 빠진다
+        """
+        with self._lock:
+            self._ensure_built()
+
+            # 선호도가 없는 장르는 0으로 설정
+            user_vector = np.array([user_preferences.get(genre, 0) for genre in self.genres], dtype=float)
+            user_norm = np.linalg.norm(user_vector)
+            if user_norm == 0:
+                scores = np.zeros(len(self.movie_ids))
+            else:
+                scores = self._unit @ (user_vector / user_norm)
+
+            mask = self._alive & self._matrix.any(axis=1)
+            excluded = [self._row_of[movie_id] for movie_id in exclude_ids if movie_id in self._row_of]
+            mask[excluded] = False
+
+            return self.movie_ids.copy(), scores, mask
+
+    def similar_to(self, movie_id, top_n):
+        """
+        한 영화와 장르 코사인 유사도가 0보다 큰 상위 top_n개 영화
+
+        Returns:
+            [(movie_id, similarity_score), ...]
+        """
+        with self._lock:
+            self._ensure_built()
+
+            row = self._row_of.get(movie_id)
+            if row is None:
+                return []
+            scores = self._unit @ self._unit[row]
+            mask = self._alive & (scores > 0)
+            mask[row] = False
+            top_rows = top_k_rows(scores, mask, top_n)
+            return [(int(self.movie_ids[r]), float(scores[r])) for r in top_rows]
+
+    def iter_similar_movies(self, top_n, block_size=1024):
+        """
+        모든 영화의 유사 영화 상위 top_n개를 블록 단위 행렬 곱으로 계산
+
+        block_size개 영화씩 (block × 전체) 유사도 행렬을 만들어 메모리 사용량을 제한한다.
+
+        Yields:
+            (movie_id, [(similar_movie_id, similarity_score), ...])
+        """
+        with self._lock:
+            self._ensure_built()
+            movie_ids = self.movie_ids.copy()
+            unit = self._unit.copy()
+            valid = self._alive & self._matrix.any(axis=1)
+
+        valid_rows = np.flatnonzero(valid)
+        for start in range(0, len(valid_rows), block_size):
+            block = valid_rows[start:start + block_size]
+            block_scores = unit[block] @ unit.T
+            for offset, row in enumerate(block):
+                scores = block_scores[offset]
+                mask = valid & (scores > 0)
+                mask[row] = False
+                top_rows = top_k_rows(scores, mask, top_n)
+                yield int(movie_ids[row]), [(int(movie_ids[r]), float(scores[r])) for r in top_rows]
+
+
+def aggregate_genre_preferences(user_ids=None):
+    """
+    Review ⋈ movie_genres 를 (사용자, 장르)로 묶어 평균 평점과 리뷰 수를 한 번의 쿼리로 계산
+
+    Returns:
+        [(user_id, genre_name, avg_rating, review_count), ...]
+    """
+    reviews = Review.objects.filter(movie__genres__isnull=False)
+    if user_ids is not None:
+        reviews = reviews.filter(user_id__in=user_ids)
+    return list(
+        reviews
+        .values_list('user_id', 'movie__genres__name')
+        .annotate(avg_rating=Avg('rating'), review_count=Count('id'))
+        .order_by()
+    )
+
+
+def _genre_preferences_cache_key(user_id):
+    """
+    (전체 세대 번호, 사용자별 버전)이 들어간 캐시 키
+
+    두 번호 모두 공유 캐시(배포 환경은 Redis)에 있어서 어느 프로세스에서 무효화해도 모든 프로세스의 키가 바뀐다.
+    키를 지우지 않고 버전을 올리므로, 무효화 전에 읽기 시작한 요청이 늦게 저장한 값은 이전 키에 남아 읽히지 않는다.
+    """
+    user_version_key = f'{GENRE_PREFERENCES_USER_VERSION_PREFIX}{user_id}'
+    versions = cache.get_many([GENRE_PREFERENCES_GENERATION_KEY, user_version_key])
+    generation = versions.get(GENRE_PREFERENCES_GENERATION_KEY, 0)
+    user_version = versions.get(user_version_key, 0)
+    return f'genre_preferences:{generation}:{user_id}:{user_version}'
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # 키가 없으면 (처음이거나 캐시가 비워졌으면) 0에서 올린 것으로 친다
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def get_genre_preferences(user_id):
+    """
+    사용자의 장르별 평균 평점 (캐시 우선, 없으면 GROUP BY 쿼리 한 번)
+
+    Returns:
+        {장르 이름: 평균 평점} - 장르가 있는 리뷰가 없으면 None
+    """
+    key = _genre_preferences_cache_key(user_id)
+    preferences = cache.get(key)
+    if preferences is None:
+        preferences = {
+            genre_name: avg_rating
+            for _, genre_name, avg_rating, _ in aggregate_genre_preferences([user_id])
+        }
+        cache.set(key, preferences, GENRE_PREFERENCES_CACHE_TIMEOUT)
+    return preferences or None
+
+
+def invalidate_genre_preferences(user_id=None):
+    """한 사용자(또는 user_id가 없으면 전체)의 장르 선호도 캐시 무효화"""
+    if user_id is not None:
+        _bump(f'{GENRE_PREFERENCES_USER_VERSION_PREFIX}{user_id}')
+    else:
+        # 전체 무효화는 세대 번호를 올려서 이전 키를 모두 버린다
+        _bump(GENRE_PREFERENCES_GENERATION_KEY)
+
+
+class UserPreferenceMatrix:
+    """
+    사용자×장르 선호도 행렬 (프로세스 내 캐시)
+
+    값은 장르별 평균 평점이고, 평가한 적 없는 장르는 mask가 False다.
+    calculate_user_similarity와 같은 점수(공통 장르의 1 - |차이|/5 평균)를
+    모든 사용자에 대해 한 번에 계산한다.
+    MovieGenreMatrix처럼 공유 버전 번호로 다른 프로세스에서 리뷰가 바뀐 사용자의 행만 다시 계산한다.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built = False
+        self._version = SharedVersion('index:user-preference-matrix')
+        self._synced = None                         # 행렬에 반영한 버전 번호
+        self.genres = []
+        self._genre_col = {}
+        self.user_ids = np.empty(0, dtype=np.int64)
+        self._row_of = {}
+        self._values = np.zeros((0, 0))
+        self._mask = np.zeros((0, 0), dtype=bool)
+
+    @classmethod
+    def from_arrays(cls, user_ids, genres, values, mask):
+        """DB 없이 행렬을 바로 채운다 (벤치마크용)"""
+        matrix = cls()
+        matrix._version = None                      # DB와 맞추지 않는 고정 행렬
+        matrix.genres = list(genres)
+        matrix._genre_col = {name: col for col, name in enumerate(matrix.genres)}
+        matrix.user_ids = np.asarray(user_ids, dtype=np.int64)
+        matrix._row_of = {int(user_id): row for row, user_id in enumerate(matrix.user_ids)}
+        matrix._values = np.where(mask, values, 0.0)
+        matrix._mask = np.asarray(mask, dtype=bool)
+        matrix._built = True
+        return matrix
+
+    def _build(self):
+        self.genres = list(Genre.objects.values_list('name', flat=True).distinct())
+        self._genre_col = {name: col for col, name in enumerate(self.genres)}
+
+        rows = aggregate_genre_preferences()
+        user_ids = sorted({user_id for user_id, *_ in rows})
+        self.user_ids = np.array(user_ids, dtype=np.int64)
+        self._row_of = {user_id: row for row, user_id in enumerate(user_ids)}
+        self._values = np.zeros((len(user_ids), len(self.genres)))
+        self._mask = np.zeros((len(user_ids), len(self.genres)), dtype=bool)
+        self._fill(rows)
+
+        self._built = True
+        print(f"🧮 사용자×장르 행렬 생성: {len(user_ids)}명 × {len(self.genres)}개 장르")
+
+    def _fill(self, rows):
+        for user_id, genre_name, avg_rating, _ in rows:
+            row, col = self._row_of[user_id], self._genre_col[genre_name]
+            self._values[row, col] = avg_rating
+            self._mask[row, col] = True
+
+    def _ensure_built(self):
+        """마지막으로 반영한 뒤 리뷰가 바뀐 사용자가 있으면 그 행만 (기록이 없으면 전체) 다시 계산"""
+        if self._version is None:
+            return
+        version = self._version.current()
+        if self._built and version != self._synced:
+            user_ids = self._version.changes(self._synced, version)
+            if user_ids is None:
+                self._built = False
+            else:
+                self._refresh_rows(user_ids)
+        if not self._built:
+            self._build()
+        self._synced = version
+
+    def invalidate(self):
+        """모든 프로세스가 다음 사용 시 전체를 다시 만들도록 표시"""
+        self._version.bump()
+
+    def refresh_users(self, user_ids):
+        """리뷰가 바뀐 사용자들을 기록 (각 프로세스가 다음 사용 시 그 행만 다시 계산)"""
+        self._version.bump(user_ids)
+
+    def _refresh_rows(self, user_ids):
+        """
+        리뷰가 바뀐 사용자들의 행만 다시 계산
+        """
+        if not user_ids:
+            return
+
+        user_ids = set(user_ids)
+        rows = aggregate_genre_preferences(user_ids)
+        if any(genre_name not in self._genre_col for _, genre_name, *_ in rows):
+            # 행렬에 없는 장르가 생기면 전체 재생성
+            self._built = False
+            return
+
+        new_ids = sorted({user_id for user_id, *_ in rows} - set(self._row_of))
+        if new_ids:
+            start = len(self.user_ids)
+            self.user_ids = np.concatenate([self.user_ids, np.array(new_ids, dtype=np.int64)])
+            self._values = np.vstack([self._values, np.zeros((len(new_ids), len(self.genres)))])
+            self._mask = np.vstack([self._mask, np.zeros((len(new_ids), len(self.genres)), dtype=bool)])
+            for offset, user_id in enumerate(new_ids):
+                self._row_of[user_id] = start + offset
+
+        touched = [self._row_of[user_id] for user_id in user_ids if user_id in self._row_of]
+        self._values[touched] = 0
+        self._mask[touched] = False
+        self._fill(rows)
+
+    def preferences_of(self, user_id):
+        """행렬에 저장된 사용자의 장르 선호도 dict"""
+        with self._lock:
+            self._ensure_built()
+            row = self._row_of.get(user_id)
+            if row is None:
+                return {}
+            return {
+                genre: float(self._values[row, col])
+                for col, genre in enumerate(self.genres)
+                if self._mask[row, col]
+            }
+
+    def similarity(self, user_preferences):
+        """
+        모든 사용자와의 취향 유사도 (공통 장르가 없으면 0)
+
+        Returns:
+            (user_ids, scores)
+        """
+        with self._lock:
+            self._ensure_built()
+
+            cols = [self._genre_col[genre] for genre in user_preferences if genre in self._genre_col]
+            target = np.array([user_preferences[self.genres[col]] for col in cols], dtype=float)
+
+            # 대상 사용자가 평가한 장르 열만 사용
+            common = self._mask[:, cols]
+            common_count = common.sum(axis=1)
+            # 평점 차이를 유사도로 변환 (차이가 적을수록 유사도 높음, 5점 만점 기준)
+            genre_similarity = 1 - np.abs(self._values[:, cols] - target) / 5
+            genre_similarity *= common
+            scores = np.divide(
+                genre_similarity.sum(axis=1), common_count,
+                out=np.zeros(len(self.user_ids)), where=common_count > 0
+            )
+            return self.user_ids.copy(), scores
+
+    def common_genres(self, user_id, user_preferences):
+        """공통 관심 장르"""
+        with self._lock:
+            row = self._row_of.get(user_id)
+            if row is None:
+                return []
+            return [
+                genre for col, genre in enumerate(self.genres)
+                if self._mask[row, col] and genre in user_preferences
+            ]
+
+
+movie_genre_matrix = MovieGenreMatrix()
+user_preference_matrix = UserPreferenceMatrix()
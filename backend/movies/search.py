@@ -0,0 +1,156 @@
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Movie
+
+
+WORD_RE = re.compile(r'\w+')
+
+
+def ngrams(text, n=2):
+    """
+    텍스트를 n-gram 토큰 문자열로 변환 ("기생충" -> "기생 생충")
+
+    한국어 제목은 띄어쓰기 단위로는 부분 검색이 안 되므로 단어마다 n글자씩 잘라 색인한다.
+    n글자 이하인 단어는 그대로 둔다.
+    """
+    tokens = []
+    for word in WORD_RE.findall((text or '').lower()):
+        if len(word) <= n:
+            tokens.append(word)
+        else:
+            tokens.extend(word[i:i + n] for i in range(len(word) - n + 1))
+    return ' '.join(tokens)
+
+
+class BaseSearchBackend:
+    """
+    영화 검색 백엔드 인터페이스
+
+    search()는 queryset을 검색어로 거르고 관련도 순으로 정렬해서 돌려준다.
+    색인이 필요 없는 백엔드는 index_movies / remove_movies / rebuild를 그대로 둔다.
+    """
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+    def index_movies(self, movies):
+        pass
+
+    def remove_movies(self, movie_ids):
+        pass
+
+    def rebuild(self):
+        pass
+
+
+class IContainsSearchBackend(BaseSearchBackend):
+    """색인 없이 LIKE로 검색 (SQLite 외 DB용 기본값)"""
+
+    def search(self, queryset, query):
+        return queryset.filter(
+            Q(title__icontains=query) | Q(original_title__icontains=query) | Q(overview__icontains=query) | Q(tagline__icontains=query)
+            ).order_by('-release_date')
+
+
+class SQLiteFTS5SearchBackend(BaseSearchBackend):
+    """
+    SQLite FTS5 가상 테이블 + bigram 토큰 검색
+
+    movies_movie_fts의 rowid가 영화 id이고, 각 컬럼에는 ngrams()로 변환한 텍스트를 저장한다.
+    결과는 bm25 점수(제목 > 원제 > 태그라인 > 줄거리 가중치) 순으로 정렬한다.
+    """
+
+    table = 'movies_movie_fts'
+    columns = ('title', 'original_title', 'overview', 'tagline')
+    weights = (10.0, 5.0, 1.0, 2.0)
+
+    @staticmethod
+    def build_match(query):
+        """
+        검색어를 FTS5 MATCH 식으로 변환
+
+        단어마다 bigram을 구(phrase)로 묶어 부분 문자열 검색처럼 동작하게 하고, 단어끼리는 AND로 묶는다.
+        한 글자 단어는 그 글자로 시작하는 토큰을 찾는 접두어 검색으로 처리한다.
+        """
+        terms = []
+        for word in WORD_RE.findall(query.lower()):
+            if len(word) == 1:
+                terms.append(f'"{word}"*')
+            else:
+                terms.append(f'"{ngrams(word)}"')
+        return ' '.join(terms)
+
+    def search(self, queryset, query):
+        match = self.build_match(query)
+        if not match:
+            return queryset.none()
+
+        movie_table = Movie._meta.db_table
+        weights = ', '.join(str(weight) for weight in self.weights)
+        matched_ids = RawSQL(f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s", (match,))
+        rank = RawSQL(
+            f"SELECT bm25({self.table}, {weights}) FROM {self.table} "
+            f"WHERE {self.table} MATCH %s AND rowid = {movie_table}.id",
+            (match,)
+        )
+        return (
+            queryset
+            .filter(id__in=matched_ids)
+            .annotate(search_rank=rank)
+            .order_by('search_rank', '-release_date')
+        )
+
+    def _rows(self, movies):
+        return [
+            (movie.pk, *(ngrams(getattr(movie, column)) for column in self.columns))
+            for movie in movies
+        ]
+
+    def index_movies(self, movies):
+        rows = self._rows(movies)
+        if not rows:
+            return
+        placeholders = ', '.join(['%s'] * (len(self.columns) + 1))
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {self.table} WHERE rowid = %s", [(row[0],) for row in rows])
+            cursor.executemany(
+                f"INSERT INTO {self.table} (rowid, {', '.join(self.columns)}) VALUES ({placeholders})",
+                rows
+            )
+
+    def remove_movies(self, movie_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {self.table} WHERE rowid = %s", [(movie_id,) for movie_id in movie_ids])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+        movies = Movie.objects.only('pk', *self.columns).order_by('pk')
+        batch = []
+        for movie in movies.iterator(chunk_size=1000):
+            batch.append(movie)
+            if len(batch) >= 1000:
+                self.index_movies(batch)
+                batch = []
+        self.index_movies(batch)
+
+
+@lru_cache(maxsize=None)
+def get_search_backend():
+    """
+    settings.MOVIE_SEARCH_BACKEND (dotted path)이 있으면 그 백엔드,
+    없으면 SQLite는 FTS5, 그 외 DB는 icontains 백엔드를 사용
+    """
+    backend_path = getattr(settings, 'MOVIE_SEARCH_BACKEND', None)
+    if backend_path:
+        return import_string(backend_path)()
+    if connection.vendor == 'sqlite':
+        return SQLiteFTS5SearchBackend()
+    return IContainsSearchBackend()
@@ -1,6 +1,7 @@
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
 from rest_framework import serializers
 from .models import Movie, MovieProvider, Genre, Review, Comment
-from django.db import models
 from accounts.models import User
 
 class MovieListSerializer(serializers.ModelSerializer):
@@ -22,14 +23,14 @@ class MovieListSerializer(serializers.ModelSerializer):
         request = self.context.get("request", None)
         user = getattr(request, 'user', None)
         if user and user.is_authenticated:
+            # Movie.objects.with_list_info(user)로 annotate된 값이 있으면 사용
+            if hasattr(obj, 'liked_by_user'):
+                return obj.liked_by_user
             return obj.liked_user.filter(id=user.id).exists()
         return False
 
     def get_average_rating(self, obj):
-        reviews = obj.review_set.all()
-        if reviews.exists():
-            return round(reviews.aggregate(avg=models.Avg('rating'))['avg'], 2)
-        return None
+        return obj.average_rating
 
 
 
@@ -37,7 +38,7 @@ class MovieCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Movie
         fields = "__all__"
-        read_only_fields = ("rating", "genres")
+        read_only_fields = ("rating", "genres", "review_count", "rating_sum", "like_count")
 
 
 class MovieDetailSerializer(serializers.ModelSerializer):
@@ -53,7 +54,7 @@ class MovieDetailSerializer(serializers.ModelSerializer):
     class Meta:
         model = Movie
         fields = "__all__"
-        read_only_fields = ("rating", "genres")
+        read_only_fields = ("rating", "genres", "review_count", "rating_sum", "like_count")
 
     def get_isLiked(self, obj):
         request = self.context.get("request", None)
@@ -82,18 +83,18 @@ class ReviewSerializer(serializers.ModelSerializer):
     class Meta:
         model = Review
         fields = "__all__"
-        read_only_fields = ("user", "movie", "created_at")
+        read_only_fields = ("user", "movie", "created_at", "like_count")
 
     def get_comments(self, obj):
-        comments = obj.comments.filter(parent_comment=None).order_by('created_at')
-        return CommentSerializer(comments, many=True, context=self.context).data
+        comments, context = comment_tree(obj.pk, self.context)
+        return CommentSerializer(comments, many=True, context=context).data
 
 
 class ReviewCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Review
         fields = "__all__"
-        read_only_fields = ("user", "movie", "created_at")
+        read_only_fields = ("user", "movie", "created_at", "like_count")
 
 
 class CommentUserSerializer(serializers.ModelSerializer):
@@ -116,6 +117,10 @@ class CommentSerializer(serializers.ModelSerializer):
         read_only_fields = ('user', 'review', 'parent_comment', 'created_at')
 
     def get_is_liked(self, obj):
+        # comment_tree() / comment_thread_context()로 만든 context에는 좋아요한 댓글 id 집합이 들어 있다
+        liked_ids = self.context.get('liked_comment_ids')
+        if liked_ids is not None:
+            return obj.id in liked_ids
         request = self.context.get("request", None)
         user = getattr(request, 'user', None)
         if user and user.is_authenticated:
@@ -124,10 +129,100 @@ class CommentSerializer(serializers.ModelSerializer):
 
     def get_replies(self, obj):
         # Only get direct replies to this comment
-        replies = obj.replies.all().order_by('created_at')
+        replies_map = self.context.get('comment_replies')
+        if replies_map is not None:
+            replies = replies_map.get(obj.id, [])
+        else:
+            replies = obj.replies.all().order_by('created_at')
         return CommentSerializer(replies, many=True, context=self.context).data
 
 
+def comment_tree(review_id, context):
+    """
+    리뷰의 댓글 전체를 한 번에 읽어서 메모리에서 트리로 묶는다
+
+    (최상위 댓글 목록, CommentSerializer에 넘길 context)를 돌려준다. context에는
+    부모 댓글 id -> 대댓글 목록 맵과 현재 사용자가 좋아요한 댓글 id 집합이 들어가므로
+    댓글 수와 상관없이 쿼리는 2번(댓글 + 좋아요)이다.
+    """
+    comments = (
+        Comment.objects
+        .filter(review_id=review_id)
+        .select_related('user')
+        .order_by('created_at', 'id')
+    )
+
+    roots = []
+    replies_map = {}
+    for comment in comments:
+        if comment.parent_comment_id is None:
+            roots.append(comment)
+        else:
+            replies_map.setdefault(comment.parent_comment_id, []).append(comment)
+
+    liked_ids = liked_comment_ids(context, comment__review_id=review_id)
+    return roots, {**context, 'comment_replies': replies_map, 'liked_comment_ids': liked_ids}
+
+
+def liked_comment_ids(context, **filters):
+    """현재 사용자가 좋아요한 댓글 id 집합 (filters로 범위를 좁힘, 비로그인은 빈 집합)"""
+    request = context.get("request", None)
+    user = getattr(request, 'user', None)
+    if not (user and user.is_authenticated):
+        return set()
+    return set(
+        Comment.likes.through.objects
+        .filter(user_id=user.id, **filters)
+        .values_list('comment_id', flat=True)
+    )
+
+
+class CommentThreadSerializer(CommentSerializer):
+    """
+    페이지 단위 댓글 목록용 (get_review_comments / get_comment_replies)
+
+    replies에는 처음 몇 개의 대댓글만 담고, 나머지는 reply_count를 보고 replies 엔드포인트로 펼친다.
+    """
+    reply_count = serializers.IntegerField(read_only=True)
+
+    class Meta(CommentSerializer.Meta):
+        fields = CommentSerializer.Meta.fields + ('reply_count',)
+
+    def get_replies(self, obj):
+        replies = self.context.get('comment_replies', {}).get(obj.id, [])
+        return CommentThreadSerializer(replies, many=True, context=self.context).data
+
+
+def comment_thread_context(comments, context, preview_size=3):
+    """
+    페이지의 댓글마다 대댓글 미리보기(처음 preview_size개)를 한 번에 읽어 context에 담는다
+
+    ROW_NUMBER() OVER (PARTITION BY parent_comment ORDER BY created_at, id)로 부모별 상위 N개만 가져오므로
+    대댓글이 아무리 많아도 쿼리 1번이고 응답 크기도 페이지 크기 * (1 + preview_size)로 제한된다.
+    """
+    parent_ids = [comment.id for comment in comments]
+    replies_map = {}
+    if preview_size and parent_ids:
+        previews = (
+            Comment.objects
+            .filter(parent_comment_id__in=parent_ids)
+            .with_thread_info()
+            .annotate(position=Window(
+                RowNumber(),
+                partition_by=F('parent_comment_id'),
+                order_by=[F('created_at').asc(), F('id').asc()],
+            ))
+            .filter(position__lte=preview_size)
+            .order_by('created_at', 'id')
+        )
+        for reply in previews:
+            replies_map.setdefault(reply.parent_comment_id, []).append(reply)
+
+    comment_ids = parent_ids + [reply.id for replies in replies_map.values() for reply in replies]
+    liked_ids = liked_comment_ids(context, comment_id__in=comment_ids)
+    return {**context, 'comment_replies': replies_map, 'liked_comment_ids': liked_ids}
+
+
 class CommentCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating comments"""
     class Meta:
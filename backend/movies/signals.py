@@ -0,0 +1,68 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Movie, Genre, Review, SimilarMovie
+from .recommendation import movie_genre_matrix, user_preference_matrix, invalidate_genre_preferences
+from .search import get_search_backend
+from .suggest import title_suggest_index
+
+
+@receiver(m2m_changed, sender=Movie.genres.through)
+def movie_genres_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """영화 장르가 바뀌면 장르 행렬의 해당 행만 갱신"""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if reverse:
+        # genre.movie_set.add(...) 처럼 장르 쪽에서 바뀐 경우
+        if pk_set is None:
+            transaction.on_commit(movie_genre_matrix.invalidate)
+            transaction.on_commit(user_preference_matrix.invalidate)
+            transaction.on_commit(invalidate_genre_preferences)
+            return
+        movie_ids = set(pk_set)
+    else:
+        movie_ids = {instance.pk}
+
+    # 장르가 바뀐 영화의 유사 영화 목록은 버리고, 다음 build_similar_movies 전까지 행렬로 바로 계산
+    SimilarMovie.objects.filter(movie_id__in=movie_ids).delete()
+    transaction.on_commit(lambda: movie_genre_matrix.refresh_movies(movie_ids))
+    # 영화 장르가 바뀌면 그 영화를 평가한 모든 사용자의 선호도가 바뀐다
+    transaction.on_commit(user_preference_matrix.invalidate)
+    transaction.on_commit(invalidate_genre_preferences)
+
+
+@receiver(post_save, sender=Movie)
+def movie_saved(sender, instance, created, **kwargs):
+    # 검색 색인은 같은 트랜잭션 안에서 갱신 (fixture 로드 포함)
+    get_search_backend().index_movies([instance])
+    movie_id = instance.pk
+    transaction.on_commit(lambda: title_suggest_index.update_movies([movie_id]))
+    if created:
+        transaction.on_commit(lambda: movie_genre_matrix.refresh_movies([movie_id]))
+
+
+@receiver(post_delete, sender=Movie)
+def movie_deleted(sender, instance, **kwargs):
+    movie_id = instance.pk
+    get_search_backend().remove_movies([movie_id])
+    transaction.on_commit(lambda: movie_genre_matrix.refresh_movies([movie_id]))
+    transaction.on_commit(lambda: title_suggest_index.update_movies([movie_id]))
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def genre_changed(sender, instance, **kwargs):
+    transaction.on_commit(movie_genre_matrix.invalidate)
+    transaction.on_commit(user_preference_matrix.invalidate)
+    transaction.on_commit(invalidate_genre_preferences)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def review_changed(sender, instance, **kwargs):
+    """리뷰가 바뀐 사용자의 선호도 캐시를 지우고 선호도 행만 다시 계산"""
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_genre_preferences(user_id))
+    transaction.on_commit(lambda: user_preference_matrix.refresh_users([user_id]))
@@ -0,0 +1,264 @@
+import bisect
+import heapq
+import threading
+
+from .index_version import SharedVersion
+from .models import Movie
+
+
+HANGUL_BASE = 0xAC00
+HANGUL_LAST = 0xD7A3
+CHOSEONG = 'ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ'
+JUNGSEONG = 'ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ'
+JONGSEONG = ['', *'ㄱㄲㄳㄴㄵㄶㄷㄹㄺㄻㄼㄽㄾㄿㅀㅁㅂㅄㅅㅆㅇㅈㅊㅋㅌㅍㅎ']
+
+# 겹받침/이중모음은 입력 중간 상태("달ㄱ" -> "닭")와 맞도록 낱자로 나눈다
+COMPOUND_JAMO = {
+    'ㄳ': 'ㄱㅅ', 'ㄵ': 'ㄴㅈ', 'ㄶ': 'ㄴㅎ', 'ㄺ': 'ㄹㄱ', 'ㄻ': 'ㄹㅁ', 'ㄼ': 'ㄹㅂ',
+    'ㄽ': 'ㄹㅅ', 'ㄾ': 'ㄹㅌ', 'ㄿ': 'ㄹㅍ', 'ㅀ': 'ㄹㅎ', 'ㅄ': 'ㅂㅅ',
+    'ㅘ': 'ㅗㅏ', 'ㅙ': 'ㅗㅐ', 'ㅚ': 'ㅗㅣ', 'ㅝ': 'ㅜㅓ', 'ㅞ': 'ㅜㅔ', 'ㅟ': 'ㅜㅣ', 'ㅢ': 'ㅡㅣ',
+}
+
+
+def normalize(text):
+    """소문자로 바꾸고 공백 제거 ("해리 포터" == "해리포터")"""
+    return ''.join((text or '').lower().split())
+
+
+def to_jamo(text):
+    """한글 음절을 낱자로 분해 ("영화" -> "ㅇㅕㅇㅎㅗㅏ"), 한글이 아닌 글자는 그대로"""
+    result = []
+    for char in text:
+        code = ord(char)
+        if HANGUL_BASE <= code <= HANGUL_LAST:
+            index = code - HANGUL_BASE
+            jamo = CHOSEONG[index // 588] + JUNGSEONG[(index % 588) // 28] + JONGSEONG[index % 28]
+        else:
+            jamo = char
+        result.append(''.join(COMPOUND_JAMO.get(j, j) for j in jamo))
+    return ''.join(result)
+
+
+def to_choseong(text):
+    """한글 음절을 초성으로 변환 ("영화" -> "ㅇㅎ"), 한글이 아닌 글자는 그대로"""
+    result = []
+    for char in text:
+        code = ord(char)
+        if HANGUL_BASE <= code <= HANGUL_LAST:
+            result.append(CHOSEONG[(code - HANGUL_BASE) // 588])
+        else:
+            result.append(char)
+    return ''.join(result)
+
+
+def is_choseong_query(text):
+    return bool(text) and all(char in CHOSEONG for char in text)
+
+
+class TitleSuggestIndex:
+    """
+    영화 제목 자동완성용 접두어 색인 (프로세스 내 캐시)
+
+    제목/원제의 각 단어 시작 위치부터의 문자열을 낱자 키와 초성 키로 만들어
+    정렬된 배열에 넣고 bisect로 접두어 범위를 찾는다.
+    "ㅎ", "the"처럼 짧은 접두어는 범위가 넓으므로 short_prefix_length 글자까지의 접두어마다
+    순위순으로 정렬한 영화 목록을 미리 만들어 두고 앞에서 limit개만 읽는다.
+    다른 프로세스에서 바뀐 영화는 공유 버전 번호(SharedVersion)로 알아내서 그 영화의 키만 다시 넣는다.
+    """
+
+    # 이 길이(낱자/초성 수)까지의 접두어는 순위 목록을 미리 만든다 (더 긴 접두어는 범위 전체를 정렬)
+    short_prefix_length = 3
+    fields = ('id', 'title', 'original_title', 'poster_path', 'release_date', 'vote_average')
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built = False
+        self._version = SharedVersion('index:title-suggest')
+        self._synced = None        # 색인에 반영한 버전 번호
+        self._jamo_keys, self._jamo_ids = [], []
+        self._choseong_keys, self._choseong_ids = [], []
+        self._movies = {}          # movie_id -> 응답용 dict
+        self._movie_keys = {}      # movie_id -> [(jamo_key, choseong_key), ...]
+        self._title_keys = {}      # movie_id -> 제목 전체의 (jamo_key, choseong_key)
+        self._ranked = ({}, {})    # (낱자, 초성)별 짧은 접두어 -> 정렬된 [순위 키, ...]
+
+    @staticmethod
+    def _movie_payload(movie):
+        return {
+            'id': movie['id'],
+            'title': movie['title'],
+            'original_title': movie['original_title'],
+            'poster_path': movie['poster_path'],
+            'release_date': movie['release_date'].isoformat() if movie['release_date'] else None,
+            'vote_average': movie['vote_average'],
+        }
+
+    @staticmethod
+    def _key(text):
+        return to_jamo(text), to_choseong(text)
+
+    @classmethod
+    def _keys_for(cls, movie):
+        """제목/원제의 각 단어 시작 위치부터의 접미어 키"""
+        keys = set()
+        for title in {movie['title'], movie['original_title']}:
+            words = (title or '').lower().split()
+            for start in range(len(words)):
+                keys.add(cls._key(''.join(words[start:])))
+        return sorted(keys)
+
+    def _add(self, movie):
+        """영화 정보와 키를 저장하고 키 목록을 돌려준다"""
+        keys = self._keys_for(movie)
+        self._movies[movie['id']] = self._movie_payload(movie)
+        self._movie_keys[movie['id']] = keys
+        self._title_keys[movie['id']] = {
+            self._key(normalize(movie['title'])), self._key(normalize(movie['original_title']))
+        }
+        return keys
+
+    def _rank(self, movie_id, key_index, prefix):
+        """제목 맨 앞부터 일치하는 영화를 먼저, 그다음 평점 높은 순"""
+        title_start = any(key[key_index].startswith(prefix) for key in self._title_keys[movie_id])
+        return not title_start, -self._movies[movie_id]['vote_average'], movie_id
+
+    def _ranked_entries(self, movie_id):
+        """영화가 들어갈 (낱자/초성, 짧은 접두어, 순위 키) 목록"""
+        entries = set()
+        for keys in self._movie_keys[movie_id]:
+            for key_index, key in enumerate(keys):
+                for length in range(1, min(len(key), self.short_prefix_length) + 1):
+                    prefix = key[:length]
+                    entries.add((key_index, prefix, self._rank(movie_id, key_index, prefix)))
+        return entries
+
+    def _build(self):
+        jamo_entries, choseong_entries = [], []
+        self._movies, self._movie_keys, self._title_keys = {}, {}, {}
+        self._ranked = ({}, {})
+        for movie in Movie.objects.values(*self.fields).iterator():
+            keys = self._add(movie)
+            for jamo_key, choseong_key in keys:
+                jamo_entries.append((jamo_key, movie['id']))
+                choseong_entries.append((choseong_key, movie['id']))
+            for key_index, prefix, rank in self._ranked_entries(movie['id']):
+                self._ranked[key_index].setdefault(prefix, []).append(rank)
+
+        for ranked in self._ranked:
+            for ranks in ranked.values():
+                ranks.sort()
+        jamo_entries.sort()
+        choseong_entries.sort()
+        self._jamo_keys = [key for key, _ in jamo_entries]
+        self._jamo_ids = [movie_id for _, movie_id in jamo_entries]
+        self._choseong_keys = [key for key, _ in choseong_entries]
+        self._choseong_ids = [movie_id for _, movie_id in choseong_entries]
+        self._built = True
+        print(f"🔤 제목 자동완성 색인 생성: {len(self._movies)}편, {len(self._jamo_keys)}개 키")
+
+    def _ensure_built(self):
+        """마지막으로 반영한 뒤 바뀐 영화가 있으면 그 키만 (기록이 없으면 전체) 다시 넣는다"""
+        version = self._version.current()
+        if self._built and version != self._synced:
+            movie_ids = self._version.changes(self._synced, version)
+            if movie_ids is None:
+                self._built = False
+            else:
+                self._reindex(movie_ids)
+        if not self._built:
+            self._build()
+        self._synced = version
+
+    @staticmethod
+    def _insert(keys, ids, key, movie_id):
+        index = bisect.bisect_left(keys, key)
+        while index < len(keys) and keys[index] == key and ids[index] < movie_id:
+            index += 1
+        keys.insert(index, key)
+        ids.insert(index, movie_id)
+
+    @staticmethod
+    def _delete(keys, ids, key, movie_id):
+        index = bisect.bisect_left(keys, key)
+        while index < len(keys) and keys[index] == key:
+            if ids[index] == movie_id:
+                del keys[index]
+                del ids[index]
+                return
+            index += 1
+
+    def _remove(self, movie_id):
+        if movie_id in self._movies:
+            for key_index, prefix, rank in self._ranked_entries(movie_id):
+                ranks = self._ranked[key_index][prefix]
+                del ranks[bisect.bisect_left(ranks, rank)]
+                if not ranks:
+                    del self._ranked[key_index][prefix]
+        for jamo_key, choseong_key in self._movie_keys.pop(movie_id, []):
+            self._delete(self._jamo_keys, self._jamo_ids, jamo_key, movie_id)
+            self._delete(self._choseong_keys, self._choseong_ids, choseong_key, movie_id)
+        self._movies.pop(movie_id, None)
+        self._title_keys.pop(movie_id, None)
+
+    def _reindex(self, movie_ids):
+        """저장/삭제된 영화들의 키만 다시 넣는다"""
+        if not movie_ids:
+            return
+
+        movies = {movie['id']: movie for movie in Movie.objects.filter(pk__in=movie_ids).values(*self.fields)}
+        for movie_id in movie_ids:
+            self._remove(movie_id)
+            movie = movies.get(movie_id)
+            if movie is None:
+                continue
+            keys = self._add(movie)
+            for jamo_key, choseong_key in keys:
+                self._insert(self._jamo_keys, self._jamo_ids, jamo_key, movie_id)
+                self._insert(self._choseong_keys, self._choseong_ids, choseong_key, movie_id)
+            for key_index, prefix, rank in self._ranked_entries(movie_id):
+                bisect.insort(self._ranked[key_index].setdefault(prefix, []), rank)
+
+    def update_movies(self, movie_ids):
+        """저장/삭제된 영화들을 기록 (각 프로세스가 다음 조회 때 그 영화의 키만 다시 넣는다)"""
+        self._version.bump(movie_ids)
+
+    def invalidate(self):
+        """모든 프로세스가 다음 조회 때 색인을 다시 만들도록 표시"""
+        self._version.bump()
+
+    def suggest(self, query, limit=10):
+        """
+        접두어가 일치하는 영화 목록
+
+        초성만 입력하면("ㅎㄹㅍㅌ") 초성 색인, 그 외에는 낱자 색인에서 찾으므로
+        입력 중인 음절("해리ㅍ")도 매칭된다. 제목 맨 앞이 일치하는 영화를 먼저, 그다음 평점 순으로 정렬한다.
+        짧은 접두어는 미리 정렬한 목록에서, 긴 접두어는 일치하는 키 전체를 정렬해서 고르므로
+        키 순서 때문에 빠지는 영화가 없다.
+        """
+        query = normalize(query)
+        if not query:
+            return []
+
+        with self._lock:
+            self._ensure_built()
+
+            if is_choseong_query(query):
+                keys, ids, prefix, key_index = self._choseong_keys, self._choseong_ids, query, 1
+            else:
+                keys, ids, prefix, key_index = self._jamo_keys, self._jamo_ids, to_jamo(query), 0
+
+            if len(prefix) <= self.short_prefix_length:
+                ranked = self._ranked[key_index].get(prefix, [])
+                return [self._movies[movie_id] for _, _, movie_id in ranked[:limit]]
+
+            matched_ids = set()
+            index = bisect.bisect_left(keys, prefix)
+            while index < len(keys) and keys[index].startswith(prefix):
+                matched_ids.add(ids[index])
+                index += 1
+
+            ranked = heapq.nsmallest(limit, (self._rank(movie_id, key_index, prefix) for movie_id in matched_ids))
+            return [self._movies[movie_id] for _, _, movie_id in ranked]
+
+
+title_suggest_index = TitleSuggestIndex()
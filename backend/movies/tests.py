@@ -1,3 +1,950 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from urllib.parse import urlparse, parse_qs
 
-# Create your tests here.
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import numpy as np
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from accounts.models import User, Follow, MovieLike, ReviewLike
+from .counters import reconcile_counters
+from .ingestion import TMDBClient, TMDBIngestor, IngestionCheckpoint
+from .models import Movie, Genre, MovieProvider, Review, Comment, SimilarMovie
+from .recommendation import (
+    MovieGenreMatrix, UserPreferenceMatrix, aggregate_genre_preferences, get_genre_preferences,
+    invalidate_genre_preferences, movie_genre_matrix,
+)
+from .search import IContainsSearchBackend, SQLiteFTS5SearchBackend, get_search_backend, ngrams
+from .serializers import CommentSerializer, ReviewSerializer, comment_tree
+from .suggest import TitleSuggestIndex, title_suggest_index
+from . import views
+from .views import MovieRecommendationService, calculate_user_similarity, movie_like
+
+
+def create_movie(**kwargs):
+    data = {
+        "title": "영화",
+        "original_title": "Movie",
+        "adult": False,
+        "budget": 0,
+        "tmdb_id": 1,
+        "origin_country": "KR",
+        "runtime": 120,
+        "release_date": date(2020, 1, 1),
+        "vote_average": 7.0,
+        "poster_path": "/poster.jpg",
+    }
+    data.update(kwargs)
+    return Movie.objects.create(**data)
+
+
+class MovieListQueryCountTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="viewer", password="pw", nickname="viewer")
+        cls.other = User.objects.create_user(username="other", password="pw", nickname="other")
+        cls.action = Genre.objects.create(id=1, name="액션", tmdb_id=28)
+        cls.drama = Genre.objects.create(id=7, name="드라마", tmdb_id=18)
+
+        cls.movies = []
+        for i in range(25):
+            movie = create_movie(title=f"테스트 영화 {i}", tmdb_id=i, release_date=date(2000 + i % 20, 1, 1))
+            movie.genres.add(cls.action, cls.drama)
+            Review.objects.create(user=cls.other, movie=movie, rating=4)
+            Review.objects.create(user=cls.user, movie=movie, rating=3)
+            if i % 2 == 0:
+                MovieLike.objects.create(user=cls.user, movie=movie)
+            cls.movies.append(movie)
+        # ORM으로 직접 만든 리뷰/좋아요는 집계 컬럼에 반영되지 않으므로 보정
+        call_command('reconcile_counters', stdout=StringIO())
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assert_page(self, url):
+        # 페이지 카운트 + 영화 목록 + 장르 prefetch
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        results = response.data["results"]
+        self.assertEqual(len(results), 20)
+        for item in results:
+            movie_index = int(item["title"].rsplit(" ", 1)[1])
+            self.assertEqual(item["average_rating"], 3.5)
+            self.assertEqual(item["is_liked"], movie_index % 2 == 0)
+            self.assertEqual(len(item["genres"]), 2)
+
+    def test_list_view(self):
+        self.assert_page("/api/v1/movies/list/?ordering=top")
+
+    def test_genre_list_view(self):
+        self.assert_page("/api/v1/movies/list/action/")
+
+    def test_search_view(self):
+        self.assert_page("/api/v1/movies/search/?query=테스트")
+
+    def test_anonymous_user_is_never_liked(self):
+        self.client.force_authenticate(None)
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/v1/movies/list/")
+        self.assertFalse(any(item["is_liked"] for item in response.data["results"]))
+
+
+class MovieLikeToggleTest(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="fan", password="pw", nickname="fan")
+        self.movie = create_movie()
+        self.factory = APIRequestFactory()
+
+    def request(self, method):
+        request = getattr(self.factory, method)(f"/api/v1/movies/{self.movie.pk}/like/")
+        force_authenticate(request, user=self.user)
+        try:
+            return movie_like(request, pk=self.movie.pk)
+        finally:
+            connection.close()  # 스레드마다 열린 DB 연결 정리
+
+    def test_parallel_likes_create_one_row(self):
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            responses = list(pool.map(lambda _: self.request("post"), range(100)))
+
+        self.assertEqual(sorted(response.status_code for response in responses), [200] * 99 + [201])
+        self.assertTrue(all(response.data["like_count"] == 1 for response in responses))
+        self.assertEqual(MovieLike.objects.filter(user=self.user, movie=self.movie).count(), 1)
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.like_count, 1)
+
+    def test_unlike_is_idempotent(self):
+        self.request("post")
+        for _ in range(2):
+            response = self.request("delete")
+            self.assertEqual((response.status_code, response.data["like_count"]), (200, 0))
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.like_count, 0)
+
+
+class CounterColumnTest(TestCase):
+    def setUp(self):
+        self.critic = User.objects.create_user(username="critic", password="pw", nickname="critic")
+        self.fan = User.objects.create_user(username="fan", password="pw", nickname="fan")
+        self.movie = create_movie()
+        self.client = APIClient()
+
+    def as_user(self, user):
+        self.client.force_authenticate(user)
+        return self.client
+
+    def assert_movie_counters(self, review_count, rating_sum):
+        self.movie.refresh_from_db()
+        self.assertEqual((self.movie.review_count, self.movie.rating_sum), (review_count, rating_sum))
+
+    def assert_no_drift(self):
+        drift = reconcile_counters(dry_run=True)
+        self.assertEqual({name: count for name, count in drift.items() if count}, {})
+
+    def test_review_create_update_delete(self):
+        url = f"/api/v1/movies/{self.movie.pk}/review/"
+        response = self.as_user(self.critic).post(url, {"rating": 4, "comment": "재밌다"})
+        self.assertEqual(response.status_code, 201)
+        critic_review = response.data["id"]
+        response = self.as_user(self.fan).post(url, {"rating": 2})
+        fan_review = response.data["id"]
+        self.assert_movie_counters(2, 6)
+        self.assertEqual(self.movie.average_rating, 3.0)
+
+        # 같은 영화에 두 번째 리뷰는 거절되고 집계도 그대로
+        self.assertEqual(self.as_user(self.fan).post(url, {"rating": 5}).status_code, 400)
+        self.assert_movie_counters(2, 6)
+
+        update_url = f"/api/v1/movies/{self.movie.pk}/review/{critic_review}/"
+        self.as_user(self.critic).put(update_url, {"rating": 5, "comment": "다시 보니 더 재밌다"})
+        self.assert_movie_counters(2, 7)
+        self.as_user(self.critic).put(update_url, {"rating": 5, "comment": "평점은 그대로"})
+        self.assert_movie_counters(2, 7)
+
+        delete_url = f"/api/v1/movies/{self.movie.pk}/review/{fan_review}/delete/"
+        self.assertEqual(self.as_user(self.fan).delete(delete_url).status_code, 204)
+        self.assertEqual(self.as_user(self.fan).delete(delete_url).status_code, 404)
+        self.assert_movie_counters(1, 5)
+        self.assert_no_drift()
+
+    def stale_review(self, review):
+        """다른 요청이 먼저 바꾼 리뷰를 모르고 들어온 요청 (get_object_or_404가 예전 인스턴스를 돌려줌)"""
+        lookup = views.get_object_or_404
+
+        def stale_lookup(model, **kwargs):
+            return review if model is Review else lookup(model, **kwargs)
+        return patch.object(views, "get_object_or_404", side_effect=stale_lookup)
+
+    def test_concurrent_review_update_and_delete_keep_counters(self):
+        url = f"/api/v1/movies/{self.movie.pk}/review/"
+        review = Review.objects.get(pk=self.as_user(self.critic).post(url, {"rating": 4}).data["id"])
+        update_url = f"/api/v1/movies/{self.movie.pk}/review/{review.pk}/"
+        delete_url = f"/api/v1/movies/{self.movie.pk}/review/{review.pk}/delete/"
+
+        # 4점을 읽은 두 수정 요청: 이전 평점은 트랜잭션 안에서 다시 읽으므로 5 -> 3으로 계산된다
+        self.as_user(self.critic).put(update_url, {"rating": 5})
+        with self.stale_review(review):
+            self.assertEqual(self.as_user(self.critic).put(update_url, {"rating": 3}).status_code, 200)
+        self.assert_movie_counters(1, 3)
+
+        # 같은 리뷰를 두 번 지우면 행을 지운 요청만 집계를 줄인다
+        self.assertEqual(self.as_user(self.critic).delete(delete_url).status_code, 204)
+        with self.stale_review(review):
+            self.assertEqual(self.as_user(self.critic).delete(delete_url).status_code, 404)
+            self.assertEqual(self.as_user(self.critic).put(update_url, {"rating": 2}).status_code, 404)
+        self.assert_movie_counters(0, 0)
+        self.assertFalse(Review.objects.filter(pk=review.pk).exists())
+        self.assert_no_drift()
+
+    def test_review_and_comment_likes(self):
+        review = Review.objects.create(user=self.critic, movie=self.movie, rating=4)
+        comment = Comment.objects.create(user=self.critic, review=review, content="댓글")
+        for url in (f"/api/v1/movies/review/{review.pk}/like/", f"/api/v1/movies/comment/{comment.pk}/like/"):
+            with self.subTest(url=url):
+                # 같은 사용자가 두 번 눌러도 한 번만 센다
+                counts = [self.as_user(self.fan).post(url).data["like_count"] for _ in range(2)]
+                counts.append(self.as_user(self.critic).post(url).data["like_count"])
+                self.assertEqual(counts, [1, 1, 2])
+                counts = [self.as_user(self.fan).delete(url).data["like_count"] for _ in range(2)]
+                self.assertEqual(counts, [1, 1])
+
+        review.refresh_from_db()
+        comment.refresh_from_db()
+        self.assertEqual((review.like_count, comment.like_count), (1, 1))
+        # 리뷰는 ORM으로 직접 만들었으므로 영화 집계만 어긋나 있다
+        drift = reconcile_counters(dry_run=True)
+        self.assertEqual((drift["Review.like_count"], drift["Comment.like_count"]), (0, 0))
+        self.assertEqual(drift["Movie.review_count"], 1)
+
+    def test_reconcile_repairs_drift(self):
+        review = Review.objects.create(user=self.critic, movie=self.movie, rating=4)
+        comment = Comment.objects.create(user=self.critic, review=review, content="댓글")
+        MovieLike.objects.create(user=self.fan, movie=self.movie)
+        ReviewLike.objects.create(user=self.fan, review=review)
+        comment.likes.add(self.fan)
+        Follow.objects.create(follower=self.fan, following=self.critic)
+        Movie.objects.update(review_count=9, rating_sum=-1, like_count=3)
+        Review.objects.update(like_count=0)
+
+        output = StringIO()
+        call_command("reconcile_counters", "--dry-run", stdout=output)
+        self.assertIn("Movie.review_count: 1개 행 불일치", output.getvalue())
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.review_count, 9)
+
+        call_command("reconcile_counters", stdout=StringIO())
+        self.assert_movie_counters(1, 4)
+        self.assertEqual(self.movie.like_count, 1)
+        review.refresh_from_db()
+        comment.refresh_from_db()
+        self.critic.refresh_from_db()
+        self.fan.refresh_from_db()
+        self.assertEqual((review.like_count, comment.like_count), (1, 1))
+        self.assertEqual((self.critic.followers_count, self.fan.following_count), (1, 1))
+
+        output = StringIO()
+        call_command("reconcile_counters", stdout=output)
+        self.assertIn("모든 집계 컬럼이 일치합니다.", output.getvalue())
+
+
+class GenrePreferenceTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(username="critic", password="pw", nickname="critic")
+        self.other = User.objects.create_user(username="other", password="pw", nickname="other")
+        self.action = Genre.objects.create(name="액션", tmdb_id=28)
+        self.drama = Genre.objects.create(name="드라마", tmdb_id=18)
+        self.movies = [create_movie(title=f"영화 {i}", tmdb_id=i) for i in range(4)]
+        self.movies[0].genres.add(self.action, self.drama)
+        self.movies[1].genres.add(self.action)
+        self.movies[2].genres.add(self.drama)
+        # 장르 없는 영화의 리뷰는 선호도에 들어가지 않는다
+        for movie, rating in zip(self.movies, [5, 3, 2, 1]):
+            Review.objects.create(user=self.user, movie=movie, rating=rating)
+        Review.objects.create(user=self.other, movie=self.movies[1], rating=1)
+
+    def test_aggregate_groups_by_user_and_genre(self):
+        with self.assertNumQueries(1):
+            rows = aggregate_genre_preferences()
+        self.assertEqual(sorted(rows), sorted([
+            (self.user.id, "액션", 4.0, 2),
+            (self.user.id, "드라마", 3.5, 2),
+            (self.other.id, "액션", 1.0, 1),
+        ]))
+        self.assertEqual(aggregate_genre_preferences([self.other.id]), [(self.other.id, "액션", 1.0, 1)])
+
+    def test_preferences_are_cached_until_reviews_change(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(get_genre_preferences(self.user.id), {"액션": 4.0, "드라마": 3.5})
+        with self.assertNumQueries(0):
+            get_genre_preferences(self.user.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(user=self.user, movie=create_movie(tmdb_id=9), rating=4).movie.genres.add(self.drama)
+        self.assertEqual(get_genre_preferences(self.user.id), {"액션": 4.0, "드라마": 11 / 3})
+        # 장르가 있는 리뷰가 없으면 None
+        self.assertIsNone(get_genre_preferences(User.objects.create_user(username="new", password="pw").id))
+
+    def test_late_write_after_invalidation_is_not_served(self):
+        stale = {"액션": 0.0}
+        key = f"genre_preferences:0:{self.user.id}:0"
+        invalidate_genre_preferences(self.user.id)
+        # 무효화 전에 계산을 시작한 요청이 이전 키로 늦게 저장해도 새 키에는 영향이 없다
+        cache.set(key, stale)
+        self.assertEqual(get_genre_preferences(self.user.id), {"액션": 4.0, "드라마": 3.5})
+
+        # 영화 장르가 바뀌면 세대 번호를 올려 모든 사용자의 캐시를 버린다
+        get_genre_preferences(self.other.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.movies[1].genres.remove(self.action)
+        self.assertIsNone(get_genre_preferences(self.other.id))
+
+
+def loop_recommendations(user, top_k):
+    """행렬 도입 전의 건별 코사인 유사도 추천 (영화 순서대로 계산 후 안정 정렬)"""
+    preferences = get_genre_preferences(user.id)
+    all_genres = list(Genre.objects.values_list("name", flat=True).distinct())
+    user_vector = np.array([preferences.get(genre, 0) for genre in all_genres], dtype=float)
+    rated_ids = Review.objects.filter(user=user).values_list("movie_id", flat=True)
+    recommendations = []
+    for movie in Movie.objects.prefetch_related("genres").exclude(id__in=rated_ids):
+        movie_genres = {genre.name for genre in movie.genres.all()}
+        movie_vector = np.array([1 if genre in movie_genres else 0 for genre in all_genres], dtype=float)
+        if movie_vector.sum() > 0:
+            similarity = user_vector @ movie_vector / (np.linalg.norm(user_vector) * np.linalg.norm(movie_vector))
+            recommendations.append((movie.id, similarity))
+    recommendations.sort(key=lambda item: item[1], reverse=True)
+    return recommendations[:top_k]
+
+
+class MovieRecommendationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(username="critic", password="pw", nickname="critic")
+        with self.captureOnCommitCallbacks(execute=True):
+            action = Genre.objects.create(name="액션", tmdb_id=28)
+            drama = Genre.objects.create(name="드라마", tmdb_id=18)
+            comedy = Genre.objects.create(name="코미디", tmdb_id=35)
+            # 같은 장르 조합의 영화가 여럿이라 점수가 같은 영화가 많다 (동점은 id 순서)
+            genre_sets = [
+                [action], [drama], [action, drama], [comedy], [action], [action, drama],
+                [], [drama, comedy], [action, drama, comedy], [drama], [action, comedy], [action, drama],
+            ]
+            self.movies = []
+            for i, genres in enumerate(genre_sets):
+                movie = create_movie(title=f"영화 {i}", tmdb_id=i)
+                movie.genres.add(*genres)
+                self.movies.append(movie)
+            rated = create_movie(title="본 영화", tmdb_id=100)
+            rated.genres.add(action, drama)
+            Review.objects.create(user=self.user, movie=rated, rating=4)
+            disliked = create_movie(title="별로인 영화", tmdb_id=101)
+            disliked.genres.add(comedy)
+            Review.objects.create(user=self.user, movie=disliked, rating=2)
+
+    def recommend(self, top_k):
+        return [
+            (item["movie"].id, item["similarity_score"])
+            for item in MovieRecommendationService.get_movie_recommendations(self.user, top_k=top_k)
+        ]
+
+    def assert_matches_loop(self, top_k):
+        expected = loop_recommendations(self.user, top_k)
+        actual = self.recommend(top_k)
+        self.assertEqual([movie_id for movie_id, _ in actual], [movie_id for movie_id, _ in expected])
+        for (_, score), (_, expected_score) in zip(actual, expected):
+            self.assertAlmostEqual(score, expected_score, places=12)
+
+    def test_matrix_ranking_matches_loop(self):
+        for top_k in (1, 3, 5, 20):
+            with self.subTest(top_k=top_k):
+                self.assert_matches_loop(top_k)
+
+    def test_other_process_matrix_follows_shared_version(self):
+        # 다른 워커 프로세스의 행렬 (이 프로세스의 시그널은 공유 캐시의 버전 번호만 올린다)
+        other_process = MovieGenreMatrix()
+        other_process.score({"액션": 1.0})
+        with self.captureOnCommitCallbacks(execute=True):
+            new_movie = create_movie(title="새 영화", tmdb_id=200)
+            new_movie.genres.add(Genre.objects.get(name="액션"))
+            self.movies[0].genres.clear()
+
+        with self.assertNumQueries(2):
+            movie_ids, scores, mask = other_process.score({"액션": 1.0})
+        candidates = set(movie_ids[mask].tolist())
+        self.assertIn(new_movie.id, candidates)
+        self.assertNotIn(self.movies[0].id, candidates)
+        self.assert_matches_loop(20)
+
+        # 장르가 새로 생기면 (행렬에 열이 없으니) 전체를 다시 만든다
+        with self.captureOnCommitCallbacks(execute=True):
+            Genre.objects.create(name="공포", tmdb_id=27)
+        other_process.score({"액션": 1.0})
+        self.assertIn("공포", other_process.genres)
+
+    def test_other_process_user_matrix_follows_reviews(self):
+        other_process = UserPreferenceMatrix()
+        fan = User.objects.create_user(username="fan", password="pw", nickname="fan")
+        other_process.similarity({"액션": 4.0})
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(user=fan, movie=self.movies[0], rating=5)
+
+        # 리뷰가 바뀐 사용자 한 명만 다시 집계
+        with self.assertNumQueries(1):
+            user_ids, scores = other_process.similarity({"액션": 4.0})
+        self.assertEqual(other_process.preferences_of(fan.id), {"액션": 5.0})
+        self.assertEqual(sorted(user_ids.tolist()), [self.user.id, fan.id])
+        for user_id, score in zip(user_ids.tolist(), scores):
+            expected = calculate_user_similarity({"액션": 4.0}, get_genre_preferences(user_id))
+            self.assertAlmostEqual(score, expected)
+
+    def test_similar_users_endpoint_reads_follower_column(self):
+        twin = User.objects.create_user(username="twin", password="pw", nickname="twin")
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(user=twin, movie=self.movies[2], rating=4)
+        User.objects.filter(pk=twin.pk).update(followers_count=7)
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get("/api/v1/movies/user/similar-users/", HTTP_HOST="localhost")
+        self.assertEqual(response.status_code, 200)
+        [similar] = response.json()["similar_users"]
+        self.assertEqual((similar["id"], similar["followers_count"]), (twin.id, 7))
+
+    def test_similar_users_endpoint(self):
+        twin = User.objects.create_user(username="twin", password="pw", nickname="twin")
+        casual = User.objects.create_user(username="casual", password="pw", nickname="")
+        rival = User.objects.create_user(username="rival", password="pw", nickname="rival")
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(user=twin, movie=self.movies[2], rating=4)
+            Review.objects.create(user=twin, movie=self.movies[5], rating=4)
+            Review.objects.create(user=casual, movie=self.movies[0], rating=2)
+            Review.objects.create(user=rival, movie=self.movies[3], rating=5)  # 코미디 2점 vs 5점: 40%
+        Follow.objects.create(follower=self.user, following=twin)
+        User.objects.filter(pk=twin.pk).update(followers_count=3)
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = "/api/v1/movies/user/similar-users/"
+        client.get(url, HTTP_HOST="localhost")  # 선호도 캐시와 행렬 준비
+        with self.assertNumQueries(2):  # 사용자 + 리뷰 수, 팔로우 여부
+            response = client.get(url, HTTP_HOST="localhost")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["total_found"], 2)
+        expected = [
+            (twin.id, "twin", 100.0, ["액션", "드라마"], 3, 2, True),
+            (casual.id, "casual", 60.0, ["액션"], 0, 1, False),
+        ]
+        self.assertEqual([
+            (user["id"], user["nickname"], user["similarity_score"], user["common_genres"],
+             user["followers_count"], user["reviews_count"], user["is_following"])
+            for user in data["similar_users"]
+        ], expected)
+        for user in data["similar_users"]:
+            expected_score = calculate_user_similarity(get_genre_preferences(self.user.id), get_genre_preferences(user["id"]))
+            self.assertEqual(user["similarity_score"], round(expected_score * 100, 1))
+
+
+def loop_similar_movies(target, top_n):
+    """테이블 도입 전의 건별 코사인 유사도 계산 (유사도가 0보다 큰 영화, 영화 순서대로 계산 후 안정 정렬)"""
+    all_genres = list(Genre.objects.values_list("name", flat=True).distinct())
+    target_genres = {genre.name for genre in target.genres.all()}
+    target_vector = np.array([1 if genre in target_genres else 0 for genre in all_genres], dtype=float)
+    similar = []
+    for movie in Movie.objects.prefetch_related("genres").exclude(id=target.id):
+        movie_genres = {genre.name for genre in movie.genres.all()}
+        movie_vector = np.array([1 if genre in movie_genres else 0 for genre in all_genres], dtype=float)
+        if movie_vector.sum() > 0:
+            similarity = target_vector @ movie_vector / (np.linalg.norm(target_vector) * np.linalg.norm(movie_vector))
+            if similarity > 0:
+                similar.append((movie.id, similarity))
+    similar.sort(key=lambda item: item[1], reverse=True)
+    return similar[:top_n]
+
+
+class SimilarMovieTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.action = Genre.objects.create(name="액션", tmdb_id=28)
+            self.drama = Genre.objects.create(name="드라마", tmdb_id=18)
+            self.comedy = Genre.objects.create(name="코미디", tmdb_id=35)
+            genre_sets = [
+                [self.action, self.drama], [self.action], [self.drama], [self.action, self.drama],
+                [self.comedy], [self.action, self.comedy], [], [self.action, self.drama, self.comedy],
+                [self.action], [self.drama, self.comedy],
+            ]
+            self.movies = []
+            for i, genres in enumerate(genre_sets):
+                movie = create_movie(title=f"영화 {i}", tmdb_id=i)
+                movie.genres.add(*genres)
+                self.movies.append(movie)
+
+    def stored(self, movie):
+        return list(SimilarMovie.objects.filter(movie=movie).values_list("similar_movie_id", "similarity_score"))
+
+    def similar_ids(self, movie):
+        response = self.client.get(f"/api/v1/movies/movies/{movie.id}/similar/")
+        self.assertEqual(response.status_code, 200)
+        return [item["id"] for item in response.data["similar_movies"]]
+
+    def assert_matches_loop(self, scored, movie, top_n):
+        expected = loop_similar_movies(movie, top_n)
+        self.assertEqual([movie_id for movie_id, _ in scored], [movie_id for movie_id, _ in expected])
+        for (_, score), (_, expected_score) in zip(scored, expected):
+            self.assertAlmostEqual(score, expected_score, places=12)
+
+    def test_build_stores_loop_ranking(self):
+        call_command("build_similar_movies", "--top-n", "4", "--block-size", "3", stdout=StringIO())
+        for movie in self.movies:
+            with self.subTest(movie=movie.title):
+                if movie.genres.exists():
+                    self.assert_matches_loop(self.stored(movie), movie, 4)
+                else:
+                    self.assertEqual(self.stored(movie), [])
+
+    def test_endpoint_reads_stored_rows(self):
+        call_command("build_similar_movies", stdout=StringIO())
+        target = self.movies[0]
+        stored_ids = [movie_id for movie_id, _ in self.stored(target)]
+        # 대상 영화 + 장르 / 유사 영화 id / 유사 영화 + 장르
+        with self.assertNumQueries(5):
+            self.assertEqual(self.similar_ids(target), stored_ids[:10])
+
+        # 저장된 순위를 그대로 쓴다 (행렬로 다시 계산하지 않는다)
+        SimilarMovie.objects.filter(movie=target, rank=0).update(similar_movie=self.movies[4])
+        self.assertEqual(self.similar_ids(target)[0], self.movies[4].id)
+
+    def test_missing_rows_fall_back_to_matrix(self):
+        call_command("build_similar_movies", stdout=StringIO())
+        with self.captureOnCommitCallbacks(execute=True):
+            new_movie = create_movie(title="새 영화", tmdb_id=100)
+            new_movie.genres.add(self.action, self.drama)
+        self.assertEqual(self.stored(new_movie), [])
+        self.assert_matches_loop(movie_genre_matrix.similar_to(new_movie.id, 10), new_movie, 10)
+        self.assertEqual(self.similar_ids(new_movie), [movie_id for movie_id, _ in loop_similar_movies(new_movie, 10)])
+
+    def test_genre_change_drops_stored_rows(self):
+        call_command("build_similar_movies", stdout=StringIO())
+        target = self.movies[1]
+        self.assertNotEqual(self.stored(target), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            target.genres.set([self.comedy])
+        self.assertEqual(self.stored(target), [])
+        # 다음 build_similar_movies 전까지는 바뀐 장르로 행렬에서 계산
+        self.assertEqual(self.similar_ids(target), [movie_id for movie_id, _ in loop_similar_movies(target, 10)])
+
+        # 장르 쪽에서 바꿔도 (genre.movie_set) 그 영화의 행을 지운다
+        other = self.movies[2]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.comedy.movie_set.add(other)
+        self.assertEqual(self.stored(other), [])
+        self.assertEqual(self.similar_ids(other), [movie_id for movie_id, _ in loop_similar_movies(other, 10)])
+
+
+class MovieSearchTest(TestCase):
+    def setUp(self):
+        get_search_backend.cache_clear()
+        self.addCleanup(get_search_backend.cache_clear)
+        self.in_overview = create_movie(
+            title="어느 가족", original_title="Shoplifters", tmdb_id=1, release_date=date(2018, 1, 1),
+            overview="기생충 같은 삶을 사는 가족 이야기",
+        )
+        self.in_title = create_movie(
+            title="기생충", original_title="Parasite", tmdb_id=2, release_date=date(2019, 1, 1),
+            overview="반지하에 사는 가족",
+        )
+        self.in_tagline = create_movie(
+            title="설국열차", original_title="Snowpiercer", tmdb_id=3, release_date=date(2013, 1, 1),
+            tagline="기생충의 반란",
+        )
+        self.other = create_movie(title="괴물", original_title="The Host", tmdb_id=4, release_date=date(2006, 1, 1))
+
+    def search(self, query, backend=None):
+        backend = backend or get_search_backend()
+        return [movie.title for movie in backend.search(Movie.objects.all(), query)]
+
+    def test_bm25_ranks_title_over_tagline_over_overview(self):
+        self.assertIsInstance(get_search_backend(), SQLiteFTS5SearchBackend)
+        self.assertEqual(self.search("기생충"), ["기생충", "설국열차", "어느 가족"])
+        self.assertEqual(self.search("가족"), ["어느 가족", "기생충"])
+
+    def test_korean_bigrams_match_inside_words(self):
+        self.assertEqual(ngrams("기생충 Parasite"), "기생 생충 pa ar ra as si it te")
+        self.assertEqual(self.search("생충"), ["기생충", "설국열차", "어느 가족"])
+        self.assertEqual(self.search("국열"), ["설국열차"])
+        self.assertEqual(self.search("arasit"), ["기생충"])
+        # 단어끼리는 AND, 한 글자 단어는 접두어 검색
+        self.assertEqual(self.search("반지하 가족"), ["기생충"])
+        self.assertEqual(self.search("the h"), ["괴물"])
+        self.assertEqual(self.search("없는영화"), [])
+
+    def test_index_follows_movie_changes(self):
+        self.in_title.title = "살인의 추억"
+        self.in_title.save()
+        self.assertEqual(self.search("살인"), ["살인의 추억"])
+        self.assertEqual(self.search("기생충"), ["설국열차", "어느 가족"])
+        self.in_tagline.delete()
+        self.assertEqual(self.search("기생충"), ["어느 가족"])
+
+        # rebuild_search_index로 다시 만들어도 결과가 같다
+        call_command("rebuild_search_index", stdout=StringIO())
+        self.assertEqual(self.search("기생충"), ["어느 가족"])
+        self.assertEqual(self.search("살인"), ["살인의 추억"])
+
+    @override_settings(MOVIE_SEARCH_BACKEND="movies.search.IContainsSearchBackend")
+    def test_icontains_fallback(self):
+        # setUp에서 영화를 저장할 때 만든 FTS5 백엔드를 버리고 설정에서 다시 고른다
+        get_search_backend.cache_clear()
+        backend = get_search_backend()
+        self.assertIsInstance(backend, IContainsSearchBackend)
+        # 부분 문자열 검색, 관련도 대신 최신 개봉작부터
+        self.assertEqual(self.search("생충"), ["기생충", "어느 가족", "설국열차"])
+        self.assertEqual(self.search("HOST"), ["괴물"])
+
+        response = APIClient().get("/api/v1/movies/search/", {"query": "기생충"})
+        self.assertEqual([item["title"] for item in response.data["results"]], ["기생충", "어느 가족", "설국열차"])
+
+
+class MovieSuggestTest(TestCase):
+    def setUp(self):
+        title_suggest_index.invalidate()
+        self.addCleanup(title_suggest_index.invalidate)
+        create_movie(title="해리 포터와 마법사의 돌", original_title="Harry Potter and the Philosopher's Stone", tmdb_id=1, vote_average=7.9)
+        create_movie(title="기생충", original_title="Parasite", tmdb_id=2, vote_average=8.5)
+        create_movie(title="닭강정", original_title="Chicken Nugget", tmdb_id=3, vote_average=6.0)
+        self.client = APIClient()
+
+    def suggest(self, query):
+        return [item["title"] for item in title_suggest_index.suggest(query)]
+
+    def test_prefix_jamo_and_choseong(self):
+        self.assertEqual(self.suggest("해리"), ["해리 포터와 마법사의 돌"])
+        self.assertEqual(self.suggest("해리ㅍ"), ["해리 포터와 마법사의 돌"])
+        self.assertEqual(self.suggest("ㄱㅅㅊ"), ["기생충"])
+        self.assertEqual(self.suggest("달ㄱ"), ["닭강정"])
+        self.assertEqual(self.suggest("para"), ["기생충"])
+        self.assertEqual(self.suggest("potter"), ["해리 포터와 마법사의 돌"])
+        self.assertEqual(self.suggest("없는제목"), [])
+
+    def test_short_and_long_prefixes_rank_every_match(self):
+        # 키 순서로 앞에 오는 평점 낮은 영화가 많아도 뒤쪽의 평점 높은 영화를 먼저 보여 준다
+        with self.captureOnCommitCallbacks(execute=True):
+            Movie.objects.bulk_create([
+                Movie(title=f"하하 {i:03d}", original_title=f"Haha {i:03d}", tmdb_id=100 + i, adult=False, budget=0,
+                      origin_country="KR", runtime=100, release_date=date(2020, 1, 1), vote_average=5.0)
+                for i in range(250)
+            ])
+            popular = create_movie(title="하하 호호", original_title="Haha Hoho", tmdb_id=999, vote_average=9.0)
+        title_suggest_index.invalidate()
+        self.assertEqual(self.suggest("ㅎ")[:3], ["하하 호호", "해리 포터와 마법사의 돌", "하하 000"])
+        self.assertEqual(self.suggest("하하")[:2], ["하하 호호", "하하 000"])
+        self.assertEqual(self.suggest("ha")[:2], ["하하 호호", "해리 포터와 마법사의 돌"])
+        # 단어 중간("호호")부터 일치하는 영화는 제목 맨 앞부터 일치하는 영화 뒤에
+        self.assertEqual(self.suggest("ㅎㅎ")[:2], ["하하 호호", "하하 000"])
+
+        # 평점이 바뀌면 (다시 넣은) 미리 만든 순위 목록에도 반영된다
+        with self.captureOnCommitCallbacks(execute=True):
+            popular.vote_average = 1.0
+            popular.save()
+        self.assertEqual(self.suggest("ㅎ")[:2], ["해리 포터와 마법사의 돌", "하하 000"])
+        self.assertEqual(self.suggest("하하")[:1], ["하하 000"])
+        self.assertEqual(len(self.suggest("ㅎ")), 10)
+
+    def test_endpoint_does_not_query_database(self):
+        title_suggest_index.suggest("warm up")
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/v1/movies/suggest/", {"query": "기생"}, HTTP_AUTHORIZATION="Token x")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["title"] for item in response.data["results"]], ["기생충"])
+
+    def test_index_follows_movie_changes(self):
+        title_suggest_index.suggest("warm up")
+        with self.captureOnCommitCallbacks(execute=True):
+            movie = create_movie(title="기생수", original_title="Parasyte", tmdb_id=4, vote_average=6.5)
+        self.assertEqual(self.suggest("기생"), ["기생충", "기생수"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            movie.title = "기억의 밤"
+            movie.save()
+        self.assertEqual(self.suggest("기생"), ["기생충"])
+        self.assertEqual(self.suggest("ㄱㅇ"), ["기억의 밤"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            movie.delete()
+        self.assertEqual(self.suggest("ㄱㅇ"), [])
+
+    def test_other_process_index_follows_shared_version(self):
+        # 다른 워커 프로세스의 색인 (이 프로세스의 시그널은 공유 캐시의 버전 번호만 올린다)
+        other_process = TitleSuggestIndex()
+        other_process.suggest("warm up")
+        with self.captureOnCommitCallbacks(execute=True):
+            create_movie(title="기생수", original_title="Parasyte", tmdb_id=4, vote_average=6.5)
+        # 바뀐 영화 한 편만 다시 읽는다
+        with self.assertNumQueries(1):
+            titles = [item["title"] for item in other_process.suggest("기생")]
+        self.assertEqual(titles, ["기생충", "기생수"])
+
+        # 관리 명령으로 바꾼 데이터는 rebuild_search_index가 전체 재생성을 알린다
+        Movie.objects.filter(title="기생수").update(title="기억의 밤")
+        call_command("rebuild_search_index", stdout=StringIO())
+        self.assertEqual([item["title"] for item in other_process.suggest("기생")], ["기생충"])
+
+
+
+class ReviewCommentTreeTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="viewer", password="pw", nickname="viewer")
+        cls.review = Review.objects.create(user=cls.user, movie=create_movie(), rating=4)
+        parents = []
+        for i in range(30):
+            parent = parents[i // 3 - 1] if i >= 3 else None
+            comment = Comment.objects.create(user=cls.user, review=cls.review, parent_comment=parent, content=f"댓글 {i}")
+            if i % 4 == 0:
+                comment.likes.add(cls.user)
+            parents.append(comment)
+
+    def setUp(self):
+        request = APIRequestFactory().get("/")
+        force_authenticate(request, user=self.user)
+        self.context = {"request": Request(request)}
+
+    def test_comments_loaded_in_constant_queries(self):
+        # 댓글 전체 + 좋아요한 댓글 id
+        with self.assertNumQueries(2):
+            roots, context = comment_tree(self.review.pk, self.context)
+            data = CommentSerializer(roots, many=True, context=context).data
+
+        def walk(comments):
+            for comment in comments:
+                index = int(comment["content"].split()[1])
+                self.assertEqual(comment["is_liked"], index % 4 == 0)
+                yield index
+                yield from walk(comment["replies"])
+
+        self.assertEqual([c["content"] for c in data], ["댓글 0", "댓글 1", "댓글 2"])
+        self.assertEqual(sorted(walk(data)), list(range(30)))
+        self.assertEqual([c["content"] for c in data[0]["replies"]], ["댓글 3", "댓글 4", "댓글 5"])
+
+    def test_review_serializer_embeds_tree(self):
+        roots, context = comment_tree(self.review.pk, self.context)
+        expected = CommentSerializer(roots, many=True, context=context).data
+        self.assertEqual(ReviewSerializer(self.review, context=self.context).data["comments"], expected)
+
+
+class ReviewCommentThreadTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="viewer", password="pw", nickname="viewer")
+        cls.review = Review.objects.create(user=cls.user, movie=create_movie(), rating=4)
+        cls.roots = [
+            Comment.objects.create(user=cls.user, review=cls.review, content=f"댓글 {i}") for i in range(25)
+        ]
+        cls.replies = [
+            Comment.objects.create(user=cls.user, review=cls.review, parent_comment=cls.roots[0], content=f"답글 {i}")
+            for i in range(5)
+        ]
+        Comment.objects.create(user=cls.user, review=cls.review, parent_comment=cls.replies[0], content="답글의 답글")
+        for comment in cls.roots[::4] + cls.replies[::2]:
+            comment.likes.add(cls.user)
+        # 같은 시각에 작성된 댓글도 id 순으로 빠짐없이 나뉘는지 확인
+        Comment.objects.update(created_at=cls.roots[0].created_at)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def collect(self, url):
+        contents = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            contents.extend(item["content"] for item in response.data["results"])
+            url = response.data["next"]
+        return contents
+
+    def test_first_page_with_reply_preview(self):
+        # 리뷰 + 댓글 페이지 + 대댓글 미리보기 + 좋아요한 댓글 id
+        with self.assertNumQueries(4):
+            response = self.client.get(f"/api/v1/movies/review/{self.review.pk}/comments/?page_size=10")
+
+        results = response.data["results"]
+        self.assertEqual(len(results), 10)
+        self.assertIsNotNone(response.data["next"])
+        first = results[0]
+        self.assertEqual((first["content"], first["reply_count"], first["is_liked"]), ("댓글 0", 5, True))
+        self.assertEqual([reply["content"] for reply in first["replies"]], ["답글 0", "답글 1", "답글 2"])
+        self.assertEqual([reply["is_liked"] for reply in first["replies"]], [True, False, True])
+        self.assertEqual(first["replies"][0]["reply_count"], 1)
+        self.assertEqual(first["replies"][0]["replies"], [])
+        self.assertEqual([item["is_liked"] for item in results[1:5]], [False, False, False, True])
+
+    def test_cursor_walks_every_comment_once(self):
+        contents = self.collect(f"/api/v1/movies/review/{self.review.pk}/comments/?page_size=7")
+        self.assertEqual(contents, [f"댓글 {i}" for i in range(25)])
+
+    def test_replies_endpoint(self):
+        contents = self.collect(f"/api/v1/movies/comment/{self.roots[0].pk}/replies/?page_size=2")
+        self.assertEqual(contents, [f"답글 {i}" for i in range(5)])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(f"/api/v1/movies/review/{self.review.pk}/comments/?cursor=invalid")
+        self.assertEqual(response.status_code, 404)
+
+
+class StubTMDBHandler(BaseHTTPRequestHandler):
+    """TMDB API 흉내 (페이지마다 영화 2편, tmdb_id = 페이지 * 100 + 순번)"""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.server.requests.append(url.path)
+        parts = url.path.strip("/").split("/")
+
+        if url.path in self.server.fail_once:
+            self.server.fail_once.remove(url.path)
+            return self.send_json({}, status=503)
+
+        if parts == ["movie", "top_rated"]:
+            page = int(parse_qs(url.query)["page"][0])
+            return self.send_json({
+                "page": page,
+                "results": [{"id": page * 100 + i, "vote_average": self.server.vote_average} for i in range(2)],
+            })
+        if len(parts) == 2:
+            tmdb_id = int(parts[1])
+            return self.send_json({
+                "title": f"수집 영화 {tmdb_id}",
+                "original_title": f"Movie {tmdb_id}",
+                "adult": False,
+                "budget": 0,
+                "origin_country": ["KR"],
+                "runtime": 100,
+                "release_date": "2020-01-01",
+                "vote_average": self.server.vote_average,
+                "poster_path": "/poster.jpg",
+                "genres": [{"id": 28}, {"id": 18}, {"id": 9999}],
+            })
+        if parts[2:] == ["watch", "providers"]:
+            providers = [{"provider_id": provider_id} for provider_id in self.server.provider_ids]
+            return self.send_json({"results": {"KR": {"flatrate": providers, "rent": providers[:1]}}})
+        self.send_json({}, status=404)
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TMDBIngestionTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubTMDBHandler)
+        cls.server.requests = []
+        cls.server.fail_once = set()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.requests.clear()
+        self.server.fail_once.clear()
+        self.server.vote_average = 7.5
+        self.server.provider_ids = [8]
+        Genre.objects.create(name="액션", tmdb_id=28)
+        Genre.objects.create(name="드라마", tmdb_id=18)
+        MovieProvider.objects.create(name="Netflix", tmdb_id=8, logo_path="/netflix.jpg")
+        MovieProvider.objects.create(name="Watcha", tmdb_id=97, logo_path="/watcha.jpg")
+        self.checkpoint_path = os.path.join(tempfile.mkdtemp(), "checkpoint.json")
+
+    def ingestor(self, **kwargs):
+        client = TMDBClient(base_url=self.base_url, rate=0, retries=2, backoff_factor=0)
+        self.addCleanup(client.close)
+        return TMDBIngestor(client=client, workers=4, checkpoint=IngestionCheckpoint(self.checkpoint_path), **kwargs)
+
+    def test_ingest_pages_with_relations(self):
+        stats = self.ingestor().run(range(1, 3))
+
+        self.assertEqual(stats, {"saved": 4, "updated": 0, "skipped": 0, "failed": 0, "pages": 2})
+        self.assertEqual(sorted(Movie.objects.values_list("tmdb_id", flat=True)), [100, 101, 200, 201])
+        movie = Movie.objects.get(tmdb_id=101)
+        self.assertEqual(movie.origin_country, "KR")
+        self.assertEqual(sorted(movie.genres.values_list("tmdb_id", flat=True)), [18, 28])
+        self.assertEqual(list(movie.providers.values_list("tmdb_id", flat=True)), [8])
+
+        # 이미 있는 영화는 상세 요청 없이 건너뛴다
+        self.server.requests.clear()
+        IngestionCheckpoint(self.checkpoint_path).clear()
+        stats = self.ingestor().run(range(1, 3))
+        self.assertEqual(stats["skipped"], 4)
+        self.assertEqual(self.server.requests, ["/movie/top_rated", "/movie/top_rated"])
+
+    def test_retries_server_errors(self):
+        self.server.fail_once.update({"/movie/top_rated", "/movie/100"})
+        stats = self.ingestor().run([1])
+        self.assertEqual(stats["saved"], 2)
+        self.assertEqual(self.server.requests.count("/movie/100"), 2)
+
+    def test_resume_from_checkpoint(self):
+        with open(self.checkpoint_path, "w") as f:
+            json.dump({"completed_pages": [1], "saved": 2}, f)
+
+        stats = self.ingestor().run(range(1, 3))
+
+        self.assertEqual(stats["saved"], 2)
+        self.assertNotIn("/movie/100", self.server.requests)
+        self.assertEqual(sorted(Movie.objects.values_list("tmdb_id", flat=True)), [200, 201])
+        with open(self.checkpoint_path) as f:
+            self.assertEqual(json.load(f), {"completed_pages": [1, 2], "saved": 4})
+
+    def test_upsert_updates_changed_movies(self):
+        self.ingestor().run([1])
+        IngestionCheckpoint(self.checkpoint_path).clear()
+
+        # 바뀐 것이 없으면 아무것도 갱신하지 않는다
+        stats = self.ingestor(upsert=True).run([1])
+        self.assertEqual((stats["updated"], stats["skipped"]), (0, 2))
+        IngestionCheckpoint(self.checkpoint_path).clear()
+
+        self.server.vote_average = 8.1
+        self.server.provider_ids = [97, 12345]
+        self.server.requests.clear()
+        stats = self.ingestor(upsert=True).run([1])
+
+        self.assertEqual((stats["saved"], stats["updated"]), (0, 2))
+        self.assertNotIn("/movie/100", self.server.requests)
+        for movie in Movie.objects.all():
+            self.assertEqual(movie.vote_average, 8.1)
+            self.assertEqual(list(movie.providers.values_list("tmdb_id", flat=True)), [97])
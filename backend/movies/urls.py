@@ -28,6 +28,7 @@ urlpatterns = [
     path('<int:movie_pk>/review/<int:review_pk>/', views.update_review),  
     path('<int:movie_pk>/review/<int:review_pk>/delete/', views.delete_review),  
     path("search/", view=views.MovieSearchView.as_view()),
+    path("suggest/", view=views.suggest_movies),
 
     # Comment URLs
     path('review/<int:review_pk>/comments/', views.get_review_comments),
@@ -36,6 +37,7 @@ urlpatterns = [
     path('review/<int:review_pk>/', views.get_review_detail, name='review_detail'),
 
     path('comment/<int:comment_pk>/reply/', views.create_reply),
+    path('comment/<int:comment_pk>/replies/', views.get_comment_replies),
     path('comment/<int:comment_pk>/', views.update_comment),
     path('comment/<int:comment_pk>/delete/', views.delete_comment),
     path('comment/<int:comment_pk>/like/', views.comment_like),
@@ -4,17 +4,23 @@ import requests
 from .serializers import (
     MovieListSerializer, MovieCreateSerializer, MovieDetailSerializer, 
     ReviewSerializer, ReviewCreateSerializer, 
-    CommentSerializer, CommentCreateSerializer
+    CommentSerializer, CommentCreateSerializer, CommentThreadSerializer, comment_thread_context
 )
+from .pagination import CreatedAtCursorPagination
+from .counters import insert_once
 from .models import Movie, Genre, MovieProvider, Review, Comment
+from .ingestion import TMDBIngestor
+from .search import get_search_backend
+from .suggest import title_suggest_index
 import json
 from .models import Genre
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from rest_framework.exceptions import ValidationError
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, authentication_classes
 from rest_framework.generics import ListAPIView, RetrieveAPIView
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import F
 from datetime import datetime
 from accounts.models import MovieLike, ReviewLike
 
@@ -24,88 +30,17 @@ from accounts.models import MovieLike, ReviewLike
 ## DATA COLLECT
 @api_view(["POST"])
 def movie_collect(request):
-    # url = "https://api.themoviedb.org/3/genre/movie/list?language=ko"
-
-    saved = 0
-    for page_idx in range(1, 26):
-        list_url = f"https://api.themoviedb.org/3/movie/top_rated?language=ko-KR&page={page_idx}"
-
-        headers = {
-            "accept": "application/json",
-            "Authorization": f"Bearer {settings.TMDB_API_KEY}",
-        }
-        response = requests.get(list_url, headers=headers)
-        if response.status_code == 200:
-            data = response.json()
-            movies = data.get("results", [])
-
-            for movie in movies:
-                tmdb_id = movie["id"]
-
-                if not Movie.objects.filter(tmdb_id=tmdb_id).exists():
-                    detail_url = (
-                        f"https://api.themoviedb.org/3/movie/{tmdb_id}?language=ko-KR"
-                    )
-                    detail_response = requests.get(detail_url, headers=headers)
-
-                    if detail_response.status_code == 200:
-                        detail_data = detail_response.json()
-                    else:
-                        continue
-
-                    provider_url = (
-                        f"https://api.themoviedb.org/3/movie/{tmdb_id}/watch/providers"
-                    )
-                    provider_response = requests.get(provider_url, headers=headers)
-                    if provider_response.status_code == 200:
-                        provider_data = provider_response.json()
-                    else:
-                        provider_data = {}
-
-                    serializer = MovieCreateSerializer(
-                        data={
-                            "tmdb_id": tmdb_id,
-                            "title": detail_data.get("title", ""),
-                            "original_title": detail_data.get("original_title", ""),
-                            "overview": detail_data.get("overview", ""),
-                            "adult": detail_data.get("adult", False),
-                            "budget": detail_data.get("budget", 0),
-                            "origin_country": detail_data.get(
-                                "origin_country", "UNKNOWN"
-                            )[0],
-                            "runtime": detail_data.get("runtime", 0),
-                            "release_date": detail_data.get(
-                                "release_date", "1900-01-01"
-                            ),
-                            "tagline": detail_data.get("tagline", ""),
-                            "vote_average": detail_data.get("vote_average", 0.0),
-                            "poster_path": detail_data.get("poster_path", ""),
-                        }
-                    )
-                    if serializer.is_valid():
-                        cur_movie = serializer.save()
-                        saved += 1
-                        for option_type in ["buy", "flatrate", "rent"]:
-                            provider_list = (
-                                provider_data.get("results")
-                                .get("KR", {})
-                                .get(option_type, [])
-                            )
-                            for provider in provider_list:
-                                cur_movie.providers.add(
-                                    MovieProvider.objects.get(
-                                        tmdb_id=provider["provider_id"]
-                                    )
-                                )
-                        for genre in detail_data.get("genres", []):
-                            cur_movie.genres.add(Genre.objects.get(tmdb_id=genre["id"]))
-                    else:
-                        print(serializer.errors)
+    """TMDB top rated 1~25페이지 수집 (대량 수집은 collect_movies 커맨드 사용)"""
+    ingestor = TMDBIngestor()
+    try:
+        stats = ingestor.run(range(1, 26))
+    finally:
+        ingestor.client.close()
 
     context = {
-        "result": f"{saved} movies saved",
-        "message": serializer.errors,
-        "data": provider_data,
+        "result": f"{stats['saved']} movies saved",
+        "stats": stats,
+        "errors": ingestor.errors,
     }
     return Response(context, status.HTTP_200_OK)
 
@@ -127,7 +62,7 @@ class MovieListView(ListAPIView):
         ordering = self.request.query_params.get('ordering', 'latest')
         year = self.request.query_params.get('year', None)
 
-        queryset = Movie.objects.all()
+        queryset = Movie.objects.with_list_info(self.request.user)
 
         # 연도 필터
         if year:
@@ -181,9 +116,7 @@ class MovieGenreListView(ListAPIView):
         if genre_id is None:
             return Movie.objects.none()
 
-        genre = Genre.objects.get(id=genre_id)
-
-        queryset = Movie.objects.filter(genres=genre)
+        queryset = Movie.objects.with_list_info(self.request.user).filter(genres__id=genre_id)
 
         # 연도 필터링
         if year:
@@ -222,9 +155,28 @@ class MovieSearchView(ListAPIView):
         if len(query) < 2:
             raise ValidationError("검색어는 최소 2자 이상이어야 합니다.")
 
-        return Movie.objects.filter(
-            Q(title__icontains=query) | Q(original_title__icontains=query) | Q(overview__icontains=query) | Q(tagline__icontains=query)
-            ).order_by('-release_date')
+        # 관련도 순 정렬 (SQLite는 FTS5 bm25, 그 외 DB는 MOVIE_SEARCH_BACKEND 설정)
+        return get_search_backend().search(Movie.objects.with_list_info(self.request.user), query)
+
+@api_view(["GET"])
+@authentication_classes([])
+@permission_classes([permissions.AllowAny])
+def suggest_movies(request):
+    """
+    검색창 자동완성 (제목/원제 접두어, 한글 초성·입력 중인 음절 포함)
+
+    메모리 색인에서만 찾으므로 DB를 조회하지 않는다. 토큰 인증도 DB 조회라 인증 없이 연다.
+    """
+    query = request.query_params.get('query', '').strip()
+    try:
+        limit = min(max(int(request.query_params.get('limit', 10)), 1), 20)
+    except ValueError:
+        limit = 10
+
+    return Response({
+        'query': query,
+        'results': title_suggest_index.suggest(query, limit),
+    })
 
 @api_view(["POST", "DELETE"])
 @permission_classes([permissions.IsAuthenticated])
@@ -232,12 +184,24 @@ def movie_like(request, pk):
     movie = get_object_or_404(Movie, pk=pk)
     user = request.user
 
+    # 같은 요청이 여러 번(동시에) 와도 결과는 한 번 한 것과 같다. 카운터는 실제로 행을 만든/지운 요청만 바꾼다
     if request.method == "POST":
-        MovieLike.objects.create(user=user, movie=movie)
-        return Response({"detail": "liked"},status=status.HTTP_201_CREATED)
+        with transaction.atomic():
+            created = insert_once(MovieLike, user=user, movie=movie)
+            if created:
+                Movie.objects.filter(pk=movie.pk).update(like_count=F('like_count') + 1)
+        movie.refresh_from_db(fields=['like_count'])
+        return Response(
+            {"detail": "liked", "is_liked": True, "like_count": movie.like_count},
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
     elif request.method == "DELETE":
-        MovieLike.objects.filter(user=user, movie=movie).delete()
-        return Response({"detail": "unliked"},status=status.HTTP_204_NO_CONTENT)
+        with transaction.atomic():
+            deleted_count, _ = MovieLike.objects.filter(user=user, movie=movie).delete()
+            if deleted_count:
+                Movie.objects.filter(pk=movie.pk).update(like_count=F('like_count') - deleted_count)
+        movie.refresh_from_db(fields=['like_count'])
+        return Response({"detail": "unliked", "is_liked": False, "like_count": movie.like_count}, status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
@@ -255,8 +219,13 @@ def create_review(request, pk):
 
     serializer = ReviewCreateSerializer(data=request.data)
     if serializer.is_valid():
-        # user와 movie를 자동으로 설정
-        review = serializer.save(user=request.user, movie=movie)
+        with transaction.atomic():
+            # user와 movie를 자동으로 설정
+            review = serializer.save(user=request.user, movie=movie)
+            Movie.objects.filter(pk=movie.pk).update(
+                review_count=F('review_count') + 1,
+                rating_sum=F('rating_sum') + review.rating
+            )
 
         # 생성된 리뷰를 다시 직렬화해서 반환 (모든 필드 포함)
         response_serializer = ReviewCreateSerializer(review)
@@ -290,7 +259,18 @@ def update_review(request, movie_pk, review_pk):
 
     serializer = ReviewCreateSerializer(review, data=request.data)
     if serializer.is_valid():
-        serializer.save()
+        with transaction.atomic():
+            # 동시에 들어온 수정/삭제가 있어도 집계가 맞도록 트랜잭션 안에서 행을 잠그고 이전 평점을 다시 읽는다
+            old_rating = (
+                Review.objects.select_for_update().filter(pk=review.pk).values_list('rating', flat=True).first()
+            )
+            if old_rating is None:
+                return Response({"detail": "리뷰가 존재하지 않습니다."}, status=status.HTTP_404_NOT_FOUND)
+            review = serializer.save()
+            if review.rating != old_rating:
+                Movie.objects.filter(pk=movie.pk).update(
+                    rating_sum=F('rating_sum') + (review.rating - old_rating)
+                )
         return Response(serializer.data, status=status.HTTP_200_OK)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -302,7 +282,17 @@ def delete_review(request, movie_pk, review_pk):
     movie = get_object_or_404(Movie, pk=movie_pk)
     review = get_object_or_404(Review, pk=review_pk, user=request.user, movie=movie)
 
-    review.delete()
+    # 같은 요청이 동시에 와도 실제로 행을 지운 요청만 집계를 바꾼다 (좋아요 토글과 같은 방식)
+    with transaction.atomic():
+        rating = Review.objects.select_for_update().filter(pk=review.pk).values_list('rating', flat=True).first()
+        _, deleted = Review.objects.filter(pk=review.pk).delete()
+        if deleted.get(Review._meta.label):
+            Movie.objects.filter(pk=movie.pk).update(
+                review_count=F('review_count') - 1,
+                rating_sum=F('rating_sum') - rating
+            )
+        else:
+            return Response({"detail": "리뷰가 존재하지 않습니다."}, status=status.HTTP_404_NOT_FOUND)
     return Response(
         {"detail": "리뷰가 삭제되었습니다."}, 
         status=status.HTTP_204_NO_CONTENT
@@ -347,14 +337,35 @@ def create_reply(request, comment_pk):
 
 @api_view(['GET'])
 def get_review_comments(request, review_pk):
-    """리뷰의 모든 댓글 조회 (대댓글 포함)"""
+    """
+    리뷰의 최상위 댓글 조회 ((created_at, id) 커서 페이지네이션)
+
+    댓글마다 reply_count와 처음 몇 개의 대댓글을 담고, 나머지 대댓글은 get_comment_replies로 펼친다.
+    """
     review = get_object_or_404(Review, pk=review_pk)
 
-    # 최상위 댓글만 가져옴 (대댓글은 CommentSerializer에서 처리)
-    comments = Comment.objects.filter(review=review, parent_comment=None).order_by('created_at')
-    serializer = CommentSerializer(comments, many=True, context={'request': request})
+    paginator = CreatedAtCursorPagination()
+    comments = paginator.paginate_queryset(
+        Comment.objects.filter(review=review, parent_comment=None).with_thread_info(), request
+    )
+    context = comment_thread_context(comments, {'request': request})
+    serializer = CommentThreadSerializer(comments, many=True, context=context)
+
+    return paginator.get_paginated_response(serializer.data)
 
-    return Response(serializer.data, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+def get_comment_replies(request, comment_pk):
+    """댓글의 대댓글 조회 ((created_at, id) 커서 페이지네이션)"""
+    comment = get_object_or_404(Comment, pk=comment_pk)
+
+    paginator = CreatedAtCursorPagination()
+    replies = paginator.paginate_queryset(comment.replies.with_thread_info(), request)
+    # 대댓글의 대댓글은 reply_count만 주고 미리보기는 생략
+    context = comment_thread_context(replies, {'request': request}, preview_size=0)
+    serializer = CommentThreadSerializer(replies, many=True, context=context)
+
+    return paginator.get_paginated_response(serializer.data)
 
 
 @api_view(['PUT'])
@@ -394,14 +405,22 @@ def comment_like(request, comment_pk):
 
     if request.method == 'POST':
         # 좋아요 추가
-        comment.likes.add(user)
+        with transaction.atomic():
+            created = insert_once(Comment.likes.through, comment=comment, user=user)
+            if created:
+                Comment.objects.filter(pk=comment.pk).update(like_count=F('like_count') + 1)
+        comment.refresh_from_db(fields=['like_count'])
         return Response(
             {"detail": "댓글에 좋아요를 표시했습니다.", "like_count": comment.like_count}, 
             status=status.HTTP_200_OK
         )
     elif request.method == 'DELETE':
         # 좋아요 취소
-        comment.likes.remove(user)
+        with transaction.atomic():
+            deleted_count, _ = Comment.likes.through.objects.filter(comment=comment, user=user).delete()
+            if deleted_count:
+                Comment.objects.filter(pk=comment.pk).update(like_count=F('like_count') - deleted_count)
+        comment.refresh_from_db(fields=['like_count'])
         return Response(
             {"detail": "댓글 좋아요를 취소했습니다.", "like_count": comment.like_count}, 
             status=status.HTTP_200_OK
@@ -416,10 +435,11 @@ def review_like(request, review_pk):
 
     if request.method == 'POST':
         # 이미 좋아요 했는지 확인
-        review_like, created = ReviewLike.objects.get_or_create(
-            user=user, 
-            review=review
-        )
+        with transaction.atomic():
+            created = insert_once(ReviewLike, user=user, review=review)
+            if created:
+                Review.objects.filter(pk=review.pk).update(like_count=F('like_count') + 1)
+        review.refresh_from_db(fields=['like_count'])
         
         if created:
             return Response({
@@ -436,10 +456,14 @@ def review_like(request, review_pk):
             
     elif request.method == 'DELETE':
         # 좋아요 취소
-        deleted_count, _ = ReviewLike.objects.filter(
-            user=user, 
-            review=review
-        ).delete()
+        with transaction.atomic():
+            deleted_count, _ = ReviewLike.objects.filter(
+                user=user, 
+                review=review
+            ).delete()
+            if deleted_count:
+                Review.objects.filter(pk=review.pk).update(like_count=F('like_count') - deleted_count)
+        review.refresh_from_db(fields=['like_count'])
         
         if deleted_count > 0:
             return Response({
@@ -499,13 +523,14 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from django.db.models import Avg, Count
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
 import pandas as pd
-from collections import defaultdict
 
-from .models import Movie, Review, Genre
+from .models import Movie, Review, Genre, SimilarMovie
 from .serializers import MovieListSerializer
+from .recommendation import (
+    movie_genre_matrix, user_preference_matrix, top_k_rows, get_genre_preferences,
+    SIMILAR_MOVIES_TOP_N
+)
 
 class MovieRecommendationService:
     """
@@ -520,47 +545,16 @@ class MovieRecommendationService:
         """
         print(f"👤 사용자 {user.id}의 장르 선호도 계산 중...")
         
-        # 사용자의 모든 리뷰 가져오기
-        user_reviews = Review.objects.filter(user=user).select_related('movie').prefetch_related('movie__genres')
+        # 리뷰 ⋈ 영화 장르를 DB에서 장르별로 평균 (사용자별 캐시)
+        genre_preferences = get_genre_preferences(user.id)
         
-        if not user_reviews.exists():
+        if not genre_preferences:
             print("❌ 사용자 리뷰가 없어 추천할 수 없습니다.")
             return None
         
-        # 장르별 점수 누적
-        genre_scores = defaultdict(list)
-        
-        for review in user_reviews:
-            movie_genres = review.movie.genres.all()
-            rating = review.rating
-            
-            for genre in movie_genres:
-                genre_scores[genre.name].append(rating)
-        
-        # 장르별 평균 평점 계산 (선호도)
-        genre_preferences = {}
-        for genre_name, ratings in genre_scores.items():
-            genre_preferences[genre_name] = np.mean(ratings)
-        
         print(f"✅ 장르 선호도 계산 완료: {len(genre_preferences)}개 장르")
         return genre_preferences
     
-    @staticmethod
-    def create_movie_genre_vector(movie, all_genres):
-        """
-        영화의 장르 벡터 생성 (원핫 인코딩 방식)
-        """
-        movie_genres = set(genre.name for genre in movie.genres.all())
-        return [1 if genre in movie_genres else 0 for genre in all_genres]
-    
-    @staticmethod
-    def create_user_preference_vector(user_preferences, all_genres):
-        """
-        사용자 선호도 벡터 생성
-        """
-        # 선호도가 없는 장르는 0으로 설정
-        return [user_preferences.get(genre, 0) for genre in all_genres]
-    
     @classmethod
     def get_movie_recommendations(cls, user, exclude_rated=True, top_k=10):
         """
@@ -581,48 +575,33 @@ class MovieRecommendationService:
         if not user_preferences:
             return []
         
-        # 2. 모든 장르 목록 가져오기
-        all_genres = list(Genre.objects.values_list('name', flat=True).distinct())
-        print(f"🎬 전체 장르 수: {len(all_genres)}")
-        
-        # 3. 후보 영화 선택
-        candidate_movies = Movie.objects.prefetch_related('genres').all()
-        
+        # 2. 이미 평가한 영화 제외
+        exclude_ids = ()
         if exclude_rated:
-            # 이미 평가한 영화 제외
-            rated_movie_ids = Review.objects.filter(user=user).values_list('movie_id', flat=True)
-            candidate_movies = candidate_movies.exclude(id__in=rated_movie_ids)
-        
-        print(f"📝 후보 영화 수: {candidate_movies.count()}")
-        
-        # 4. 사용자 선호도 벡터 생성
-        user_vector = cls.create_user_preference_vector(user_preferences, all_genres)
-        user_vector = np.array(user_vector).reshape(1, -1)
-        
-        # 5. 각 영화와의 코사인 유사도 계산
-        recommendations = []
-        
-        for movie in candidate_movies:
-            # 영화 장르 벡터 생성
-            movie_vector = cls.create_movie_genre_vector(movie, all_genres)
-            movie_vector = np.array(movie_vector).reshape(1, -1)
-            
-            # 코사인 유사도 계산
-            if np.sum(movie_vector) > 0:  # 장르 정보가 있는 영화만
-                similarity = cosine_similarity(user_vector, movie_vector)[0][0]
-                
-                recommendations.append({
-                    'movie': movie,
-                    'similarity_score': similarity,
-                    'user_genre_match': cls.get_genre_match_info(movie, user_preferences)
-                })
-        
-        # 6. 유사도 점수로 정렬
-        recommendations.sort(key=lambda x: x['similarity_score'], reverse=True)
+            exclude_ids = Review.objects.filter(user=user).values_list('movie_id', flat=True)
+        
+        # 3. 미리 만들어 둔 영화×장르 행렬로 모든 후보 영화의 유사도를 한 번에 계산
+        movie_ids, scores, candidate_mask = movie_genre_matrix.score(user_preferences, exclude_ids=exclude_ids)
+        print(f"📝 후보 영화 수: {int(candidate_mask.sum())}")
+        
+        # 4. 상위 k개 선택
+        top_rows = top_k_rows(scores, candidate_mask, top_k)
+        top_ids = [int(movie_ids[row]) for row in top_rows]
+        movies = Movie.objects.with_list_info().in_bulk(top_ids)
+        
+        recommendations = [
+            {
+                'movie': movies[movie_id],
+                'similarity_score': float(scores[row]),
+                'user_genre_match': cls.get_genre_match_info(movies[movie_id], user_preferences)
+            }
+            for movie_id, row in zip(top_ids, top_rows)
+            if movie_id in movies
+        ]
         
-        print(f"✅ 추천 완료: {len(recommendations)}개 영화 중 상위 {top_k}개 선택")
+        print(f"✅ 추천 완료: {int(candidate_mask.sum())}개 영화 중 상위 {top_k}개 선택")
         
-        return recommendations[:top_k]
+        return recommendations
     
     @staticmethod
     def get_genre_match_info(movie, user_preferences):
@@ -727,7 +706,7 @@ def get_similar_movies(request, movie_id):
     특정 영화와 유사한 영화들 추천 (장르 기반)
     """
     try:
-        target_movie = Movie.objects.get(id=movie_id)
+        target_movie = Movie.objects.with_list_info().get(id=movie_id)
         target_genres = set(genre.name for genre in target_movie.genres.all())
         
         if not target_genres:
@@ -736,31 +715,28 @@ def get_similar_movies(request, movie_id):
                 'similar_movies': []
             }, status=status.HTTP_200_OK)
         
-        # 모든 장르 목록
-        all_genres = list(Genre.objects.values_list('name', flat=True).distinct())
-        
-        # 타겟 영화 장르 벡터
-        target_vector = np.array([1 if genre in target_genres else 0 for genre in all_genres]).reshape(1, -1)
+        # 미리 계산된 유사 영화 테이블에서 조회
+        scored = list(
+            SimilarMovie.objects
+            .filter(movie=target_movie)
+            .values_list('similar_movie_id', 'similarity_score')
+        )
         
-        # 다른 영화들과 비교
-        similar_movies = []
-        other_movies = Movie.objects.exclude(id=movie_id).prefetch_related('genres')
+        if not scored:
+            # 아직 테이블에 없는 영화는 장르 행렬로 바로 계산
+            scored = movie_genre_matrix.similar_to(target_movie.id, SIMILAR_MOVIES_TOP_N)
         
-        for movie in other_movies:
-            movie_genres = set(genre.name for genre in movie.genres.all())
-            if movie_genres:  # 장르 정보가 있는 경우만
-                movie_vector = np.array([1 if genre in movie_genres else 0 for genre in all_genres]).reshape(1, -1)
-                similarity = cosine_similarity(target_vector, movie_vector)[0][0]
-                
-                if similarity > 0:  # 유사도가 0보다 큰 경우만
-                    similar_movies.append({
-                        'movie': movie,
-                        'similarity_score': similarity,
-                        'common_genres': list(target_genres.intersection(movie_genres))
-                    })
+        movies = Movie.objects.with_list_info().in_bulk([similar_id for similar_id, _ in scored])
+        neighbors = [(movies[similar_id], score) for similar_id, score in scored if similar_id in movies]
         
-        # 유사도순 정렬
-        similar_movies.sort(key=lambda x: x['similarity_score'], reverse=True)
+        similar_movies = [
+            {
+                'movie': movie,
+                'similarity_score': score,
+                'common_genres': list(target_genres.intersection(genre.name for genre in movie.genres.all()))
+            }
+            for movie, score in neighbors
+        ]
         
         # 상위 10개만 반환
         top_similar = similar_movies[:10]
@@ -807,46 +783,48 @@ def get_similar_users(request):
                 'similar_users': []
             }, status=status.HTTP_200_OK)
         
-        # 다른 사용자들의 선호도 계산
-        from accounts.models import User
-        all_users = User.objects.exclude(id=current_user.id)
-        similar_users = []
-        
-        for user in all_users:
-            user_preferences = MovieRecommendationService.get_user_genre_preferences(user)
-            if user_preferences:
-                # 코사인 유사도 계산
-                similarity = calculate_user_similarity(current_preferences, user_preferences)
-                if similarity > 0.5:  # 50% 이상 유사한 사용자만
-                    similar_users.append({
-                        'user': user,
-                        'similarity_score': similarity,
-                        'common_genres': get_common_genres(current_preferences, user_preferences)
-                    })
-        
-        # 유사도순 정렬
-        similar_users.sort(key=lambda x: x['similarity_score'], reverse=True)
-        
-        # 상위 3명만 반환
-        top_similar = similar_users[:3]
+        # 사용자×장르 행렬로 모든 사용자와의 유사도를 한 번에 계산
+        user_ids, scores = user_preference_matrix.similarity(current_preferences)
+        mask = (scores > 0.5) & (user_ids != current_user.id)  # 50% 이상 유사한 사용자만
+        
+        # 유사도순 정렬, 상위 3명만 반환
+        top_rows = top_k_rows(scores, mask, 3)
+        top_ids = [int(user_ids[row]) for row in top_rows]
+        
+        from accounts.models import User, Follow
+        # 팔로워 수는 집계 컬럼(User.followers_count)에서 읽는다
+        users = (
+            User.objects
+            .filter(id__in=top_ids)
+            .annotate(reviews_count=Count('review'))
+            .in_bulk()
+        )
+        following_ids = set(
+            Follow.objects
+            .filter(follower=current_user, following_id__in=top_ids)
+            .values_list('following_id', flat=True)
+        )
         
         result_data = []
-        for sim_user in top_similar:
+        for user_id, row in zip(top_ids, top_rows):
+            user = users.get(user_id)
+            if user is None:
+                continue
             user_data = {
-                'id': sim_user['user'].id,
-                'nickname': sim_user['user'].nickname or sim_user['user'].username,
-                'profile_image': sim_user['user'].profile_image.url if sim_user['user'].profile_image else None,
-                'similarity_score': round(sim_user['similarity_score'] * 100, 1),
-                'common_genres': sim_user['common_genres'],
-                'followers_count': sim_user['user'].followers.count(),
-                'reviews_count': Review.objects.filter(user=sim_user['user']).count(),
-                'is_following': current_user.following.filter(id=sim_user['user'].id).exists()
+                'id': user.id,
+                'nickname': user.nickname or user.username,
+                'profile_image': user.profile_image.url if user.profile_image else None,
+                'similarity_score': round(float(scores[row]) * 100, 1),
+                'common_genres': user_preference_matrix.common_genres(user.id, current_preferences),
+                'followers_count': user.followers_count,
+                'reviews_count': user.reviews_count,
+                'is_following': user.id in following_ids
             }
             result_data.append(user_data)
         
         return Response({
             'similar_users': result_data,
-            'total_found': len(similar_users)
+            'total_found': int(mask.sum())
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -870,11 +848,6 @@ def calculate_user_similarity(prefs1, prefs2):
     
     return similarity_sum / len(common_genres)
 
-def get_common_genres(prefs1, prefs2):
-    """공통 관심 장르 반환"""
-    common_genres = set(prefs1.keys()) & set(prefs2.keys())
-    return list(common_genres)
-
 
 
 ## provider DB 수집을 위해 작동하였습니다.
@@ -0,0 +1,178 @@
+"""
+runserver와 daphne 워커(supervisord fcgi-program과 같은 소켓 공유 방식)의 처리량 비교
+
+backend 디렉토리에서 실행:
+    python ../deploy/loadtest.py                       # runserver vs daphne 워커 CPU 수만큼
+    python ../deploy/loadtest.py --workers 8 --duration 20
+    python ../deploy/loadtest.py --target http://127.0.0.1/api/v1/movies/list/   # 이미 떠 있는 서버만 측정
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+DEFAULT_PATH = '/api/v1/movies/list/'
+
+
+def client_worker(url, threads, duration, results):
+    """한 클라이언트 프로세스: keep-alive 연결을 쓰는 스레드 여러 개로 요청"""
+    parts = urlsplit(url)
+    path = parts.path + (f'?{parts.query}' if parts.query else '')
+    deadline = time.monotonic() + duration
+    counts = [[0, 0] for _ in range(threads)]  # [성공, 실패]
+
+    def run(count):
+        connection = None
+        while time.monotonic() < deadline:
+            try:
+                if connection is None:
+                    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+                connection.request('GET', path)
+                response = connection.getresponse()
+                response.read()
+                count[0 if response.status == 200 else 1] += 1
+                if response.getheader('Connection', '').lower() == 'close':
+                    connection.close()
+                    connection = None
+            except (OSError, http.client.HTTPException):
+                count[1] += 1
+                if connection is not None:
+                    connection.close()
+                connection = None
+
+    pool = [threading.Thread(target=run, args=(count,)) for count in counts]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    results.put((sum(c[0] for c in counts), sum(c[1] for c in counts)))
+
+
+def measure(url, concurrency, duration, client_processes):
+    """동시 연결 concurrency개로 duration초 동안 요청하고 (초당 성공 요청 수, 실패 수) 반환"""
+    results = multiprocessing.Queue()
+    per_process = max(concurrency // client_processes, 1)
+    processes = [
+        multiprocessing.Process(target=client_worker, args=(url, per_process, duration, results))
+        for _ in range(client_processes)
+    ]
+    started = time.monotonic()
+    for process in processes:
+        process.start()
+    totals = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.monotonic() - started
+    ok = sum(t[0] for t in totals)
+    failed = sum(t[1] for t in totals)
+    return ok / elapsed, failed
+
+
+def wait_until_ready(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    parts = urlsplit(url)
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=5)
+            connection.request('GET', parts.path)
+            connection.getresponse().read()
+            connection.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'서버가 {timeout}초 안에 뜨지 않았습니다: {url}')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_runserver(port):
+    process = subprocess.Popen(
+        [sys.executable, 'manage.py', 'runserver', '--noreload', f'127.0.0.1:{port}'],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    return [process], None
+
+
+def start_daphne_workers(port, workers):
+    """supervisord fcgi-program처럼 소켓 하나를 열어 두고 워커들에게 fd로 넘긴다"""
+    listener = socket.socket()
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind(('127.0.0.1', port))
+    listener.listen(1024)
+    fd = listener.fileno()
+    processes = []
+    for worker_id in range(workers):
+        env = dict(os.environ, CHAT_WORKER_ID=str(worker_id))
+        processes.append(subprocess.Popen(
+            [sys.executable, '-m', 'flix_n_chill.serve', '--fd', str(fd), 'flix_n_chill.asgi:application'],
+            pass_fds=[fd], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        ))
+    return processes, listener
+
+
+def stop(processes, listener):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    if listener is not None:
+        listener.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='runserver 대비 daphne 워커 처리량 측정')
+    parser.add_argument('--path', default=DEFAULT_PATH, help=f'요청 경로 (기본 {DEFAULT_PATH})')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='daphne 워커 수 (기본 CPU 수)')
+    parser.add_argument('--concurrency', type=int, default=32, help='동시 연결 수 (기본 32)')
+    parser.add_argument('--duration', type=float, default=10, help='측정 시간(초) (기본 10)')
+    parser.add_argument('--client-processes', type=int, default=min(4, os.cpu_count() or 1),
+                        help='부하 생성 프로세스 수 (기본 min(4, CPU 수))')
+    parser.add_argument('--target', help='이미 떠 있는 서버 URL만 측정 (서버를 직접 띄우지 않음)')
+    args = parser.parse_args()
+
+    if args.target:
+        rate, failed = measure(args.target, args.concurrency, args.duration, args.client_processes)
+        print(f'{args.target}: {rate:,.1f} req/s (실패 {failed}건)')
+        return
+
+    if not os.path.exists('manage.py'):
+        parser.error('backend 디렉토리에서 실행하세요 (manage.py가 있는 곳)')
+
+    rates = {}
+    servers = [
+        ('runserver', start_runserver),
+        (f'daphne x{args.workers}', lambda port: start_daphne_workers(port, args.workers)),
+    ]
+    for name, start in servers:
+        port = free_port()
+        url = f'http://127.0.0.1:{port}{args.path}'
+        processes, listener = start(port)
+        try:
+            wait_until_ready(url)
+            # 워커별 첫 요청(캐시 로드 등)은 측정에서 제외
+            measure(url, args.concurrency, min(2, args.duration), args.client_processes)
+            rate, failed = measure(url, args.concurrency, args.duration, args.client_processes)
+        finally:
+            stop(processes, listener)
+        rates[name] = rate
+        print(f'{name:>12}: {rate:,.1f} req/s (실패 {failed}건)')
+
+    baseline, candidate = rates.values()
+    print(f'runserver 대비 {candidate / baseline:.2f}배 (CPU {os.cpu_count()}개)')
+
+
+if __name__ == '__main__':
+    main()
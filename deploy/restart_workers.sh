@@ -0,0 +1,20 @@
+#!/bin/bash
+
+# daphne 워커 무중단 재시작 (컨테이너 안에서 실행)
+# 워커를 하나씩 재시작하므로 나머지 워커가 같은 소켓으로 계속 요청을 받는다.
+# 사용법: deploy/restart_workers.sh [asgi_http|asgi_ws ...]  (기본: 둘 다)
+set -e
+
+GROUPS_TO_RESTART=${@:-asgi_http asgi_ws}
+DELAY=${RESTART_DELAY:-2}
+
+for group in $GROUPS_TO_RESTART; do
+    for process in $(supervisorctl status "$group:*" | awk '{print $1}'); do
+        echo "🔄 $process 재시작"
+        supervisorctl restart "$process"
+        # 새 워커가 요청을 받을 준비가 될 때까지 잠시 대기
+        sleep "$DELAY"
+    done
+done
+
+echo "✅ 워커 재시작 완료"
@@ -34,6 +34,11 @@ export const API_URLS = {
   REGISTRATION: getApiUrl(`${API_CONFIG.ENDPOINTS.ACCOUNTS}/registration/`),
   EMAIL_CHECK: getApiUrl(`${API_CONFIG.ENDPOINTS.AUTH}/email_check/`),
   USER_DETAIL: (userId) => getApiUrl(`${API_CONFIG.ENDPOINTS.AUTH}/${userId}/detail/`),
+  USER_FOLLOWERS: (userId) => getApiUrl(`${API_CONFIG.ENDPOINTS.AUTH}/${userId}/followers/`),
+  USER_FOLLOWING: (userId) => getApiUrl(`${API_CONFIG.ENDPOINTS.AUTH}/${userId}/following/`),
+  USER_REVIEWS: (userId) => getApiUrl(`${API_CONFIG.ENDPOINTS.AUTH}/${userId}/reviews/`),
+  USER_LIKED_MOVIES: (userId) => getApiUrl(`${API_CONFIG.ENDPOINTS.AUTH}/${userId}/liked-movies/`),
+  USER_ACTIVITIES: (userId) => getApiUrl(`${API_CONFIG.ENDPOINTS.AUTH}/${userId}/activities/`),
   
   // 영화
   MOVIES_BASE: getApiUrl(API_CONFIG.ENDPOINTS.MOVIES),
@@ -169,16 +169,18 @@ const getFollowList = async (userId, type = 'both') => {
   try {
     console.log(`🔄 ${type} 목록 로딩 시작:`, userId)
 
-    const response = await axios({
-      method: 'get',
-      url: `${BE_API_PATH}/auth/${userId}/detail/`,
-      headers: {
-        'Content-Type': 'application/json',
-        ...(token.value && { 'Authorization': `Token ${token.value}` })
-      }
-    })
+    // 팔로잉/팔로워 목록은 각각 커서 페이지네이션 ({ next, results }), 첫 페이지만 가져온다
+    const headers = {
+      'Content-Type': 'application/json',
+      ...(token.value && { 'Authorization': `Token ${token.value}` })
+    }
+    const [detailResponse, followingResponse, followersResponse] = await Promise.all([
+      axios({ method: 'get', url: `${BE_API_PATH}/auth/${userId}/detail/`, params: { fields: 'followers_count,following_count' }, headers }),
+      axios({ method: 'get', url: `${BE_API_PATH}/auth/${userId}/following/`, headers }),
+      axios({ method: 'get', url: `${BE_API_PATH}/auth/${userId}/followers/`, headers })
+    ])
 
-    const userData = response.data
+    const userData = detailResponse.data
     
     // 팔로잉/팔로워 목록 정규화
     const normalizeUser = (user) => ({
@@ -193,8 +195,10 @@ const getFollowList = async (userId, type = 'both') => {
     })
 
     const result = {
-      following: (userData.following || []).map(normalizeUser),
-      followers: (userData.followers || []).map(normalizeUser),
+      following: (followingResponse.data.results || []).map(normalizeUser),
+      followers: (followersResponse.data.results || []).map(normalizeUser),
+      following_next: followingResponse.data.next,
+      followers_next: followersResponse.data.next,
       total_following: userData.following_count || 0,
       total_followers: userData.followers_count || 0
     }
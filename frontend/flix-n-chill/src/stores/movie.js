@@ -391,8 +391,8 @@ async function toggleReviewLike(reviewId, currentlyLiked) {
     }
   }
 
-  // 리뷰의 모든 댓글 조회
-  const getReviewComments = async (reviewId) => {
+  // 리뷰의 댓글 조회 (커서 페이지네이션, { next, results } 반환)
+  const getReviewComments = async (reviewId, cursor = null) => {
     const userStore = useUserStore()
     const headers = {}
     if (userStore.token) {
@@ -403,6 +403,7 @@ async function toggleReviewLike(reviewId, currentlyLiked) {
       const response = await axios({
         method: 'get',
         url: `${BE_API_PATH}/api/v1/movies/review/${reviewId}/comments/`,
+        params: cursor ? { cursor } : {},
         headers,
       })
 
@@ -414,6 +415,30 @@ async function toggleReviewLike(reviewId, currentlyLiked) {
     }
   }
 
+  // 댓글의 대댓글 조회 (커서 페이지네이션, { next, results } 반환)
+  const getCommentReplies = async (commentId, cursor = null) => {
+    const userStore = useUserStore()
+    const headers = {}
+    if (userStore.token) {
+      headers['Authorization'] = `Token ${userStore.token}`
+    }
+
+    try {
+      const response = await axios({
+        method: 'get',
+        url: `${BE_API_PATH}/api/v1/movies/comment/${commentId}/replies/`,
+        params: cursor ? { cursor } : {},
+        headers,
+      })
+
+      console.log('✅ 대댓글 목록 조회 성공:', response.data)
+      return response.data
+    } catch (error) {
+      console.error('❌ 대댓글 목록 조회 실패:', error)
+      throw error
+    }
+  }
+
   // 댓글 삭제
   const deleteComment = async (commentId) => {
     const userStore = useUserStore()
@@ -478,6 +503,7 @@ async function toggleReviewLike(reviewId, currentlyLiked) {
     createComment,
     createReply,
     getReviewComments,
+    getCommentReplies,
     deleteComment,
     toggleCommentLike,
   }